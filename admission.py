@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Control de admisión para lanzamientos de Chrome
+Limita lanzamientos concurrentes y exige memoria y CPU disponibles;
+el exceso espera en una cola FIFO con posiciones notificadas
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+from stats_utils import percentile
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+MAX_CONCURRENT_LAUNCHES = int(os.getenv('MAX_CONCURRENT_LAUNCHES', 2))
+ADMISSION_MIN_AVAILABLE_MB = float(os.getenv('ADMISSION_MIN_AVAILABLE_MB', 400))
+ADMISSION_LAUNCH_RSS_MB = float(os.getenv('ADMISSION_LAUNCH_RSS_MB', 300))  # Memoria estimada por Chrome
+ADMISSION_MAX_LOAD = float(os.getenv('ADMISSION_MAX_LOAD', 2.0))  # Load average por CPU
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', 200))
+ADMISSION_MAX_QUEUED_PER_CLIENT = int(os.getenv('ADMISSION_MAX_QUEUED_PER_CLIENT', 3))
+ADMISSION_RECHECK_INTERVAL = float(os.getenv('ADMISSION_RECHECK_INTERVAL', 1.0))
+
+
+def _read_int(path):
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    return int(value) if value.isdigit() else None
+
+
+def available_memory_mb():
+    """Memoria disponible: límite del cgroup del contenedor si existe, si no MemAvailable"""
+    # cgroup v2 (y v1 como alternativa)
+    for limit_path, usage_path in (
+        ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory.current'),
+        ('/sys/fs/cgroup/memory/memory.limit_in_bytes', '/sys/fs/cgroup/memory/memory.usage_in_bytes')
+    ):
+        limit = _read_int(limit_path)
+        usage = _read_int(usage_path)
+        # v1 reporta un número enorme cuando no hay límite
+        if limit and usage is not None and limit < 1 << 60:
+            return (limit - usage) / 1048576
+
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def cpu_load():
+    """Load average de 1 minuto por CPU"""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except OSError:
+        return None
+
+
+class _Ticket:
+    __slots__ = ('session_id', 'client_id', 'launch', 'enqueued_at', 'position')
+
+    def __init__(self, session_id, client_id, launch):
+        self.session_id = session_id
+        self.client_id = client_id
+        self.launch = launch
+        self.enqueued_at = time.monotonic()
+        self.position = None
+
+
+class AdmissionController:
+    """
+    Cola de lanzamientos de Chrome atendida por un despachador.
+
+    Un lanzamiento se admite si hay cupo de concurrencia, la memoria
+    disponible (descontando la reservada por lanzamientos en curso) supera
+    el mínimo y la carga de CPU está bajo el máximo. `on_position(session_id,
+    position, depth)` se llama cada vez que cambia la posición de un ticket.
+    """
+
+    def __init__(self, on_position=None, max_concurrent=MAX_CONCURRENT_LAUNCHES,
+                 min_available_mb=ADMISSION_MIN_AVAILABLE_MB, launch_rss_mb=ADMISSION_LAUNCH_RSS_MB,
+                 max_load=ADMISSION_MAX_LOAD, max_queue=ADMISSION_MAX_QUEUE,
+                 max_queued_per_client=ADMISSION_MAX_QUEUED_PER_CLIENT,
+                 memory_probe=available_memory_mb, load_probe=cpu_load):
+        self.on_position = on_position
+        self.max_concurrent = max(1, max_concurrent)
+        self.min_available_mb = min_available_mb
+        self.launch_rss_mb = launch_rss_mb
+        self.max_load = max_load
+        self.max_queue = max_queue
+        self.max_queued_per_client = max_queued_per_client
+        self.memory_probe = memory_probe
+        self.load_probe = load_probe
+
+        self.queue = deque()
+        self.tickets = {}  # session_id -> _Ticket en cola
+        self.running = set()  # session_id lanzándose
+        self.condition = threading.Condition()
+        self.started = False
+
+        # Métricas
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_times = deque(maxlen=500)
+        self.launch_times = deque(maxlen=500)
+        self.blocked_reason = None
+
+    def start(self):
+        """Iniciar el despachador (idempotente)"""
+        with self.condition:
+            if self.started:
+                return
+            self.started = True
+        thread = threading.Thread(target=self._dispatch, name="admission-dispatcher")
+        thread.daemon = True
+        thread.start()
+
+    def submit(self, session_id, client_id, launch):
+        """
+        Encolar el lanzamiento de una sesión.
+
+        Retorna la posición en la cola (1 = siguiente), 0 si ya se está
+        lanzando, o None si se rechazó por cola llena.
+        """
+        if not self.started:
+            self.start()
+        with self.condition:
+            if session_id in self.running:
+                return 0
+            ticket = self.tickets.get(session_id)
+            if ticket is not None:
+                return ticket.position
+
+            queued_by_client = sum(1 for t in self.queue if t.client_id == client_id)
+            if len(self.queue) >= self.max_queue or queued_by_client >= self.max_queued_per_client:
+                self.rejected += 1
+                return None
+
+            ticket = _Ticket(session_id, client_id, launch)
+            self.queue.append(ticket)
+            self.tickets[session_id] = ticket
+            ticket.position = len(self.queue)
+            self.condition.notify_all()
+            return ticket.position
+
+    def is_pending(self, session_id):
+        """True si la sesión está en cola o lanzándose"""
+        with self.condition:
+            return session_id in self.tickets or session_id in self.running
+
+    def cancel(self, session_id):
+        """Quitar de la cola una sesión que ya no necesita Chrome"""
+        with self.condition:
+            ticket = self.tickets.pop(session_id, None)
+            if ticket is None:
+                return False
+            self.queue.remove(ticket)
+            changed = self._renumber()
+        self._notify(changed)
+        return True
+
+    def _renumber(self):
+        """Recalcular posiciones; retorna los tickets cuya posición cambió"""
+        changed = []
+        for index, ticket in enumerate(self.queue, 1):
+            if ticket.position != index:
+                ticket.position = index
+                changed.append((ticket.session_id, index))
+        return changed
+
+    def _notify(self, changed):
+        if self.on_position is None:
+            return
+        depth = len(self.queue)
+        for session_id, position in changed:
+            try:
+                self.on_position(session_id, position, depth)
+            except Exception as e:
+                logger.error(f"Error notificando posición en cola de {session_id}: {e}")
+
+    def _can_admit(self):
+        """Cupo de concurrencia, memoria y CPU; deja el motivo en blocked_reason"""
+        if len(self.running) >= self.max_concurrent:
+            self.blocked_reason = 'concurrency'
+            return False
+        available = self.memory_probe() if self.memory_probe else None
+        if available is not None:
+            reserved = len(self.running) * self.launch_rss_mb
+            if available - reserved - self.launch_rss_mb < self.min_available_mb:
+                self.blocked_reason = 'memory'
+                return False
+        load = self.load_probe() if self.load_probe else None
+        if load is not None and load > self.max_load:
+            self.blocked_reason = 'cpu'
+            return False
+        self.blocked_reason = None
+        return True
+
+    def _dispatch(self):
+        while True:
+            with self.condition:
+                while not self.queue or not self._can_admit():
+                    # Los recursos cambian sin eventos: revisar periódicamente
+                    self.condition.wait(ADMISSION_RECHECK_INTERVAL)
+                ticket = self.queue.popleft()
+                del self.tickets[ticket.session_id]
+                self.running.add(ticket.session_id)
+                self.admitted += 1
+                self.wait_times.append(time.monotonic() - ticket.enqueued_at)
+                changed = self._renumber()
+
+            self._notify(changed)
+            thread = threading.Thread(target=self._launch, args=(ticket,))
+            thread.daemon = True
+            thread.start()
+
+    def _launch(self, ticket):
+        started = time.monotonic()
+        try:
+            ticket.launch()
+        except Exception as e:
+            logger.error(f"Error lanzando sesión {ticket.session_id}: {e}")
+        finally:
+            with self.condition:
+                self.running.discard(ticket.session_id)
+                self.launch_times.append(time.monotonic() - started)
+                self.condition.notify_all()
+
+    def estimated_wait(self, position):
+        """Espera estimada para una posición, según la duración media de lanzamiento"""
+        launch_times = list(self.launch_times)
+        if not launch_times or not position:
+            return None
+        average = sum(launch_times) / len(launch_times)
+        return round(position * average / self.max_concurrent, 1)
+
+    def stats(self):
+        """Profundidad de cola y tiempos de espera (para autoescalado)"""
+        available = self.memory_probe() if self.memory_probe else None
+        load = self.load_probe() if self.load_probe else None
+        with self.condition:
+            now = time.monotonic()
+            waits = list(self.wait_times)
+            return {
+                'queue_depth': len(self.queue),
+                'running': len(self.running),
+                'max_concurrent': self.max_concurrent,
+                'oldest_wait': round(now - self.queue[0].enqueued_at, 3) if self.queue else 0.0,
+                'wait_p50': percentile(waits, 50),
+                'wait_p95': percentile(waits, 95),
+                'launch_p50': percentile(list(self.launch_times), 50),
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'blocked_by': self.blocked_reason if self.queue else None,
+                'available_memory_mb': round(available, 1) if available is not None else None,
+                'cpu_load': round(load, 2) if load is not None else None
+            }
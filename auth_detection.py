@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Detección de autenticación de WhatsApp Web
+Un solo script clasificador evalúa todos los selectores y retorna el
+estado de la página (loading, qr, authenticating, authenticated,
+phone_offline, logged_out, conflict) en un único round trip
+"""
+
+import os
+import time
+import logging
+
+from selector_registry import SelectorRegistry
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+AUTH_TIMEOUT = float(os.getenv('AUTH_TIMEOUT', 120))
+AUTH_POLL_INTERVAL = float(os.getenv('AUTH_POLL_INTERVAL', 1.0))
+
+# Estados de página que retorna el clasificador
+PAGE_LOADING = 'loading'
+PAGE_QR = 'qr'
+PAGE_AUTHENTICATING = 'authenticating'
+PAGE_AUTHENTICATED = 'authenticated'
+PAGE_PHONE_OFFLINE = 'phone_offline'
+PAGE_LOGGED_OUT = 'logged_out'
+PAGE_CONFLICT = 'conflict'
+
+# Estados con la interfaz principal cargada
+LINKED_PAGE_STATES = (PAGE_AUTHENTICATED, PAGE_PHONE_OFFLINE)
+
+# Selectores que indican que la interfaz principal ya cargó (sesión autenticada)
+AUTH_SELECTORS = [
+    # Barra de búsqueda principal
+    "[data-testid='chat-list-search']",
+    "[data-testid='search']",
+    "[data-testid='chatlist-search']",
+    "input[placeholder*='Search']",
+    "input[placeholder*='Buscar']",
+    "[aria-label*='Search']",
+    "[aria-label*='Buscar']",
+
+    # Elementos de la interfaz principal
+    "[data-testid='chatlist']",
+    "[data-testid='chat-list']",
+    "[data-testid='side']",
+    "#main",
+    "._3uMse",  # Clase común del chat list
+    "._1jJ70",  # Sidebar
+
+    # Elementos de la app principal
+    "[data-testid='app-wrapper-main']",
+    "._3q4NP",  # Container principal
+    "._2Zdgs",  # Chat container
+
+    # Cualquier elemento que contenga "chat"
+    "[data-testid*='chat']",
+    "[aria-label*='Chat']",
+    "[aria-label*='Conversation']"
+]
+
+# Selectores del QR vigente
+QR_SELECTORS = [
+    "canvas[aria-label*='QR']",
+    "[data-ref]"
+]
+
+# Selectores que indican que el QR expiró (botón "recargar QR")
+QR_EXPIRED_SELECTORS = [
+    "[data-testid='refresh-large']",
+    "span[data-icon='refresh-large']",
+    "[aria-label*='reload QR']",
+    "[aria-label*='Recargar']"
+]
+
+# Pantalla de carga tras escanear el QR (sincronizando chats)
+AUTHENTICATING_SELECTORS = [
+    "[data-testid='startup-progress-bar']",
+    "[data-testid='wa-web-loading-screen']",
+    "progress"
+]
+
+# Banner de teléfono o computadora sin conexión sobre la interfaz principal
+PHONE_OFFLINE_SELECTORS = [
+    "[data-testid='alert-phone']",
+    "span[data-icon='alert-phone']",
+    "[data-testid='alert-computer']",
+    "span[data-icon='alert-computer']"
+]
+
+# Botón de menú de la interfaz principal
+MENU_SELECTORS = [
+    "[data-testid='menu-btn']",
+    "[data-testid='menu']",
+    "[aria-label*='Menu']",
+    "[aria-label*='Menú']",
+    "._1ZVQX",  # Botón de menú
+    "._3XKXx"   # Header button
+]
+
+# Diálogo "WhatsApp está abierto en otra ventana" y textos de su botón
+CONFLICT_DIALOG_SELECTORS = [
+    "[data-testid='popup-contents']",
+    "[role='dialog']"
+]
+CONFLICT_TEXTS = ['use here', 'usar aquí', 'usar aqui', 'otra ventana', 'another window']
+
+# Registro con estadísticas de aciertos: cada grupo se prueba en el orden
+# de mayor tasa de aciertos, así los selectores obsoletos pasan al final
+selector_registry = SelectorRegistry({
+    'auth': AUTH_SELECTORS,
+    'qr': QR_SELECTORS,
+    'expired': QR_EXPIRED_SELECTORS,
+    'authenticating': AUTHENTICATING_SELECTORS,
+    'offline': PHONE_OFFLINE_SELECTORS,
+    'menu': MENU_SELECTORS,
+    'dialogs': CONFLICT_DIALOG_SELECTORS
+})
+
+# Función clasificadora; la usan el sondeo (execute_script) y el observador DevTools
+CLASSIFIER_FUNCTION = """
+function classifyPage(selectors) {
+    // Por grupo: índice del primero que coincidió (-1 si ninguno), índices de
+    // todos los que coincidieron y ms de cada querySelector evaluado. Cada
+    // full_scan_every sondeos se evalúa la lista completa en lugar de parar
+    // en el primero, así los selectores de más abajo también suman aciertos
+    var probes = {};
+    var every = selectors.full_scan_every || 0;
+    window.__waClassifyRuns = (window.__waClassifyRuns || 0) + 1;
+    var fullScan = every > 0 && window.__waClassifyRuns % every === 0;
+    function firstMatch(group) {
+        var list = selectors[group];
+        var probe = {hit: -1, hits: [], ms: []};
+        probes[group] = probe;
+        for (var i = 0; i < list.length; i++) {
+            var started = performance.now();
+            var found = null;
+            try {
+                found = document.querySelector(list[i]);
+            } catch (e) {
+                // Selector inválido, continuar con el siguiente
+            }
+            probe.ms.push(Math.round((performance.now() - started) * 1000) / 1000);
+            if (found) {
+                probe.hits.push(i);
+                if (probe.hit < 0) {
+                    probe.hit = i;
+                }
+                if (!fullScan) {
+                    break;
+                }
+            }
+        }
+        return probe.hit >= 0 ? list[probe.hit] : null;
+    }
+    var qrElement = document.querySelector('[data-ref]');
+    var result = {
+        auth: firstMatch('auth'),
+        qr: firstMatch('qr'),
+        qr_data: qrElement ? qrElement.getAttribute('data-ref') : null,
+        expired: firstMatch('expired'),
+        authenticating: firstMatch('authenticating'),
+        offline: firstMatch('offline'),
+        menu: firstMatch('menu'),
+        conflict: null,
+        ready: document.readyState,
+        probes: probes
+    };
+    var dialog = firstMatch('dialogs');
+    if (dialog) {
+        var text = (document.querySelector(dialog).textContent || '').toLowerCase();
+        for (var i = 0; i < selectors.conflict_texts.length; i++) {
+            if (text.indexOf(selectors.conflict_texts[i]) >= 0) {
+                result.conflict = dialog;
+                break;
+            }
+        }
+    }
+    if (result.conflict) {
+        result.state = 'conflict';
+    } else if (result.auth) {
+        result.state = result.offline ? 'phone_offline' : 'authenticated';
+    } else if (result.expired) {
+        result.state = 'logged_out';
+    } else if (result.qr_data || result.qr) {
+        result.state = 'qr';
+    } else if (result.authenticating) {
+        result.state = 'authenticating';
+    } else {
+        result.state = 'loading';
+    }
+    return result;
+}
+"""
+
+# Script de sondeo: todo el estado en un solo round trip
+DETECTION_SCRIPT = CLASSIFIER_FUNCTION + "return classifyPage(arguments[0]);"
+
+
+def classifier_selectors(auth_selectors=None):
+    """Selectores que recibe classifyPage, en el orden vigente del registro"""
+    selectors = {group: selector_registry.ordered(group) for group in selector_registry.groups}
+    if auth_selectors:
+        selectors['auth'] = auth_selectors
+    selectors['conflict_texts'] = CONFLICT_TEXTS
+    selectors['full_scan_every'] = selector_registry.full_scan_every
+    return selectors
+
+
+def classify_page(driver, auth_selectors=None):
+    """
+    Clasificar la página en un solo execute_script.
+
+    Retorna un dict con `state` (PAGE_*), `qr_data` y el selector que
+    coincidió para auth, qr, expired, authenticating, offline, menu y
+    conflict (o None), más `ready` (document.readyState) y `probes`
+    (ya registrado en selector_registry).
+    """
+    selectors = classifier_selectors(auth_selectors)
+    state = driver.execute_script(DETECTION_SCRIPT, selectors) or {}
+    selector_registry.record(selectors, state.get('probes'))
+    return state
+
+
+def wait_for_qr_or_auth(driver, timeout, poll_interval=None, probe=classify_page):
+    """
+    Sondear hasta que la página muestre el QR o la interfaz principal.
+
+    Un perfil ya vinculado entra directo sin QR; retorna el último estado
+    de classify_page ({} si el driver falló). `probe(driver)` reemplaza a
+    classify_page en cada sondeo (p. ej. para pasar por la cola de la sesión).
+    """
+    poll_interval = AUTH_POLL_INTERVAL if poll_interval is None else poll_interval
+    deadline = time.monotonic() + timeout
+    state = {}
+    while True:
+        try:
+            state = probe(driver)
+        except Exception as e:
+            logger.error(f"Error sondeando página: {e}")
+            return {}
+        if state.get('auth') or state.get('qr'):
+            return state
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return state
+        time.sleep(min(poll_interval, remaining))
+
+
+def detect_authentication(driver, timeout=None, poll_interval=None, should_continue=None, on_state=None):
+    """
+    Sondear la página hasta detectar autenticación, QR expirado o deadline.
+    `on_state(state)` recibe cada sondeo (p. ej. para seguir la rotación del QR).
+
+    Retorna un dict con:
+        authenticated: True si se detectó la interfaz principal
+        expired: True si WhatsApp mostró el botón de recargar QR
+        selector: selector que coincidió (o None)
+        elapsed: segundos hasta la detección
+        polls: número de round trips realizados
+        page: último resultado de classify_page
+    """
+    timeout = AUTH_TIMEOUT if timeout is None else timeout
+    poll_interval = AUTH_POLL_INTERVAL if poll_interval is None else poll_interval
+
+    started = time.monotonic()
+    deadline = started + timeout
+    polls = 0
+    last_state = {}
+
+    def result(authenticated, selector, expired=False):
+        return {
+            'authenticated': authenticated,
+            'expired': expired,
+            'selector': selector,
+            'elapsed': round(time.monotonic() - started, 3),
+            'polls': polls,
+            'page': last_state
+        }
+
+    while True:
+        try:
+            last_state = classify_page(driver)
+            polls += 1
+        except Exception as e:
+            # El driver murió o la página está navegando; no tiene sentido esperar más
+            logger.error(f"Error sondeando autenticación: {e}")
+            return result(False, None)
+
+        if on_state is not None:
+            on_state(last_state)
+
+        if last_state.get('auth'):
+            return result(True, last_state['auth'])
+
+        if last_state.get('expired'):
+            return result(False, last_state['expired'], expired=True)
+
+        if should_continue is not None and not should_continue():
+            return result(False, None)
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+
+        time.sleep(min(poll_interval, remaining))
+
+    # Verificación básica al vencer el deadline: si ya no hay QR asumimos autenticación
+    if last_state.get('ready') == 'complete' and not last_state.get('qr'):
+        logger.info("✅ No se encontró canvas de QR, asumiendo autenticación")
+        return result(True, 'no-qr-canvas')
+
+    return result(False, None)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark de sesiones por GB: un Chrome por sesión vs. browser contexts
+Abre N sesiones de WhatsApp Web con cada modelo, espera a que carguen
+y mide el RSS total de los árboles de procesos de Chrome/chromedriver
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault('HEADLESS', 'true')
+
+from browser_multiplexer import MultiplexedDriverPool, process_tree_rss
+from real_websocket_server import RealWhatsAppWebManager, WHATSAPP_WEB_URL
+
+NUM_SESSIONS = int(os.getenv('BENCH_SESSIONS', 8))
+CONTEXTS_PER_BROWSER = int(os.getenv('BENCH_CONTEXTS_PER_BROWSER', 8))
+SETTLE_SECONDS = float(os.getenv('BENCH_SETTLE_SECONDS', 20))
+BENCH_URL = os.getenv('BENCH_URL', WHATSAPP_WEB_URL)
+
+
+def tree_rss(drivers):
+    """RSS en bytes de todos los chromedriver dados y sus descendientes"""
+    return sum(process_tree_rss(driver.service.process.pid) for driver in drivers)
+
+
+def run_processes(manager):
+    """Modelo actual: un Chrome completo por sesión"""
+    drivers = []
+    try:
+        for _ in range(NUM_SESSIONS):
+            driver = manager.setup_chrome_driver()
+            if not driver:
+                raise RuntimeError("No se pudo lanzar Chrome")
+            driver.get(BENCH_URL)
+            drivers.append(driver)
+        time.sleep(SETTLE_SECONDS)
+        return tree_rss(drivers)
+    finally:
+        # Como en el servidor: el reaper libera puerto y perfil temporal
+        for driver in drivers:
+            manager.dispose_driver(driver)
+        manager.reaper.queue.join()
+
+
+def run_contexts(manager):
+    """Modelo multiplexado: CONTEXTS_PER_BROWSER sesiones por Chrome"""
+    pool = MultiplexedDriverPool(manager.setup_chrome_driver, CONTEXTS_PER_BROWSER,
+                                 disposer=manager.dispose_driver)
+    contexts = []
+    try:
+        for _ in range(NUM_SESSIONS):
+            context = pool.acquire()
+            if not context:
+                raise RuntimeError("No se pudo abrir un browser context")
+            context.get(BENCH_URL)
+            contexts.append(context)
+        time.sleep(SETTLE_SECONDS)
+        return tree_rss(host.driver for host in pool.hosts)
+    finally:
+        for context in contexts:
+            context.quit()
+        manager.reaper.queue.join()
+
+
+def main():
+    print(f"🧪 Benchmark de sesiones por GB ({NUM_SESSIONS} sesiones, {CONTEXTS_PER_BROWSER} por Chrome)")
+    print(f"   URL: {BENCH_URL}, espera {SETTLE_SECONDS}s tras cargar")
+    print("=" * 60)
+
+    manager = RealWhatsAppWebManager()
+    results = {}
+    for name, runner in (('proceso/sesión', run_processes), ('contexts', run_contexts)):
+        started = time.monotonic()
+        rss = runner(manager)
+        results[name] = rss
+        print(f"{name:<16} RSS {rss / 1048576:>8.1f} MB  "
+              f"{rss / 1048576 / NUM_SESSIONS:>7.1f} MB/sesión  "
+              f"{NUM_SESSIONS / (rss / 1073741824):>6.1f} sesiones/GB  "
+              f"({time.monotonic() - started:.1f}s)")
+
+    print("=" * 60)
+    ratio = results['proceso/sesión'] / results['contexts']
+    print(f"📈 Densidad con contexts: {ratio:.1f}x sesiones por GB")
+
+
+if __name__ == '__main__':
+    if os.getenv('NO_CHROME_MODE') == 'true':
+        print("❌ El benchmark necesita Chrome (NO_CHROME_MODE=true)")
+        sys.exit(1)
+    main()
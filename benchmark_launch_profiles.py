@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark de perfiles de lanzamiento de Chrome
+Para cada perfil lanza Chrome, abre WhatsApp Web y mide el tiempo hasta
+el QR, el RSS del árbol de procesos y los segundos de CPU consumidos
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault('HEADLESS', 'true')
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+from auth_detection import classify_page
+from browser_multiplexer import process_tree_rss, process_tree_cpu
+from launch_profiles import LAUNCH_PROFILES
+from real_websocket_server import RealWhatsAppWebManager, WHATSAPP_WEB_URL
+from stats_utils import percentile
+
+RUNS = int(os.getenv('BENCH_RUNS', 3))
+QR_TIMEOUT = float(os.getenv('BENCH_QR_TIMEOUT', 60))
+SETTLE_SECONDS = float(os.getenv('BENCH_SETTLE_SECONDS', 10))
+PROFILES = os.getenv('BENCH_PROFILES', ','.join(LAUNCH_PROFILES)).split(',')
+
+
+def run_once(manager, profile):
+    """Un lanzamiento: (segundos hasta el QR o None, RSS en bytes, segundos de CPU)"""
+    driver = manager.setup_chrome_driver(launch_profile=profile)
+    if not driver:
+        raise RuntimeError(f"No se pudo lanzar Chrome con el perfil {profile}")
+    try:
+        pid = driver.service.process.pid
+        started = time.monotonic()
+        driver.get(WHATSAPP_WEB_URL)
+        try:
+            WebDriverWait(driver, QR_TIMEOUT).until(lambda d: classify_page(d).get('qr_data'))
+            time_to_qr = time.monotonic() - started
+        except Exception:
+            time_to_qr = None
+        # Medir en reposo, con el QR ya dibujado
+        time.sleep(SETTLE_SECONDS)
+        return time_to_qr, process_tree_rss(pid), process_tree_cpu(pid)
+    finally:
+        # Como en el servidor: el reaper libera puerto y perfil temporal
+        manager.dispose_driver(driver)
+        manager.reaper.queue.join()
+
+
+def main():
+    print(f"🧪 Benchmark de perfiles de lanzamiento ({RUNS} corridas por perfil)")
+    print(f"   URL: {WHATSAPP_WEB_URL}, espera {SETTLE_SECONDS}s tras el QR")
+    print("=" * 72)
+    print(f"{'perfil':<10} {'QR p50':>8} {'QR p95':>8} {'sin QR':>7} {'RSS MB':>9} {'CPU s':>7}")
+
+    manager = RealWhatsAppWebManager()
+    for profile in PROFILES:
+        qr_times, rss, cpu = [], [], []
+        failures = 0
+        for _ in range(RUNS):
+            time_to_qr, run_rss, run_cpu = run_once(manager, profile)
+            if time_to_qr is None:
+                failures += 1
+            else:
+                qr_times.append(time_to_qr)
+            rss.append(run_rss)
+            cpu.append(run_cpu)
+
+        p50 = percentile(qr_times, 50)
+        p95 = percentile(qr_times, 95)
+        print(f"{profile:<10} "
+              f"{p50 if p50 is not None else '-':>8} "
+              f"{p95 if p95 is not None else '-':>8} "
+              f"{failures:>7} "
+              f"{sum(rss) / len(rss) / 1048576:>9.1f} "
+              f"{sum(cpu) / len(cpu):>7.2f}")
+
+    print("=" * 72)
+
+
+if __name__ == '__main__':
+    if os.getenv('NO_CHROME_MODE') == 'true':
+        print("❌ El benchmark necesita Chrome (NO_CHROME_MODE=true)")
+        sys.exit(1)
+    main()
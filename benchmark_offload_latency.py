@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latencia del hub de gevent durante una ráfaga de QRs
+Un greenlet "cliente" mide cada PROBE_INTERVAL cuánto se atrasa el hub
+mientras otros greenlets renderizan QRs: en línea, en hilos nativos o
+en procesos (offload.CPUOffloader)
+"""
+
+import os
+import time
+
+import gevent
+
+from offload import CPUOffloader
+from qr_render import QRRenderer
+from stats_utils import percentile
+
+BURST = int(os.getenv('BENCH_BURST', 40))
+WORKERS = int(os.getenv('BENCH_WORKERS', 2))
+PROBE_INTERVAL = float(os.getenv('BENCH_PROBE_INTERVAL', 0.01))
+SAMPLE_REF = "2@" + "x" * 180
+
+
+def probe(lags, stop):
+    """Cliente simulado: un evento cada PROBE_INTERVAL; registra el retraso en ms"""
+    while not stop:
+        expected = time.perf_counter() + PROBE_INTERVAL
+        gevent.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - expected) * 1000)
+
+
+def run_mode(mode):
+    offloader = CPUOffloader(mode=mode, workers=WORKERS)
+    offloader.start()
+    renderer = QRRenderer(cache_size=0)
+
+    lags, stop = [], []
+    prober = gevent.spawn(probe, lags, stop)
+    gevent.sleep(0.2)  # Línea base sin carga
+    baseline = len(lags)
+
+    started = time.perf_counter()
+    burst = [
+        gevent.spawn(lambda data: renderer.render(data, 'png', run=offloader.run), f"{SAMPLE_REF}{mode}{i}")
+        for i in range(BURST)
+    ]
+    gevent.joinall(burst)
+    elapsed = time.perf_counter() - started
+
+    stop.append(True)
+    prober.join()
+    offloader.shutdown()
+
+    during = lags[baseline:]
+    return {
+        'idle_p50': percentile(lags[:baseline], 50),
+        'p50': percentile(during, 50),
+        'p99': percentile(during, 99),
+        'max': round(max(during), 3) if during else None,
+        'burst': round(elapsed, 2)
+    }
+
+
+def main():
+    print(f"🧪 Latencia del hub durante {BURST} QRs ({WORKERS} workers, sonda cada {PROBE_INTERVAL * 1000:.0f} ms)")
+    print("=" * 72)
+    print(f"{'modo':<8} {'reposo p50':>11} {'p50 ms':>9} {'p99 ms':>9} {'máx ms':>9} {'ráfaga s':>9}")
+    for mode in ('inline', 'thread', 'process'):
+        result = run_mode(mode)
+        print(f"{mode:<8} {result['idle_p50']:>11} {result['p50']:>9} {result['p99']:>9} "
+              f"{result['max']:>9} {result['burst']:>9}")
+    print("=" * 72)
+
+
+if __name__ == '__main__':
+    main()
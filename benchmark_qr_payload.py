@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark del payload de QR en Socket.IO: data URL base64 vs. adjunto binario
+Mide los bytes en el cable (paquete de texto + adjuntos) y el CPU del
+servidor por QR entregado: armar el payload y codificar el paquete
+"""
+
+import os
+import time
+import base64
+
+from socketio import packet
+
+from qr_render import render_qr
+
+DELIVERIES = int(os.getenv('BENCH_DELIVERIES', 5000))
+SAMPLE_REF = "2@" + "x" * 180  # Largo típico de un data-ref de WhatsApp Web
+
+
+def base64_payload(session_id, png):
+    """Forma anterior: PNG en data URL dentro del JSON"""
+    return {
+        'session_id': session_id,
+        'qr_data': f"data:image/png;base64,{base64.b64encode(png).decode()}",
+        'message': 'Código QR'
+    }
+
+
+def binary_payload(session_id, png):
+    """Forma nueva: PNG como adjunto binario"""
+    return {
+        'session_id': session_id,
+        'qr_image': png,
+        'message': 'Código QR'
+    }
+
+
+def binary_with_ref_payload(session_id, png):
+    """Como la envía publish_qr: texto del QR (para clientes sin imagen) más el PNG binario"""
+    return dict(binary_payload(session_id, png), qr_data=SAMPLE_REF)
+
+
+def encode(payload):
+    """Frames que viajan por el WebSocket (texto + binarios)"""
+    encoded = packet.Packet(packet.EVENT, data=['qr_code', payload], namespace='/').encode()
+    return encoded if isinstance(encoded, list) else [encoded]
+
+
+def wire_bytes(frames):
+    return sum(len(frame.encode() if isinstance(frame, str) else frame) for frame in frames)
+
+
+def measure(build, png):
+    session_id = 'b1f6a0c2-1111-4c8e-9d57-2f1e4c7a9b10'
+    frames = encode(build(session_id, png))
+    started = time.process_time()
+    for _ in range(DELIVERIES):
+        encode(build(session_id, png))
+    cpu = (time.process_time() - started) / DELIVERIES
+    return wire_bytes(frames), len(frames), cpu
+
+
+def main():
+    png = render_qr(SAMPLE_REF)
+    print(f"🧪 Payload de QR en Socket.IO ({DELIVERIES} entregas, PNG de {len(png)} bytes)")
+    print("=" * 60)
+    results = {}
+    for name, build in (('base64', base64_payload), ('binario', binary_payload),
+                        ('binario+ref', binary_with_ref_payload)):
+        size, frames, cpu = measure(build, png)
+        results[name] = (size, cpu)
+        print(f"{name:<12} {size:>7} bytes en {frames} frame(s)   {cpu * 1e6:>7.1f} µs CPU/QR")
+    print("=" * 60)
+    saved = 1 - results['binario'][0] / results['base64'][0]
+    print(f"📉 Bytes en el cable: -{saved:.0%}; CPU por QR: {results['base64'][1] / results['binario'][1]:.1f}x menos")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del renderizado de QR
+Compara el pipeline anterior (qrcode -> PIL -> PNG -> base64 en cada
+llamada) con qr_render en frío y con caché, por formato, y mide la tasa
+de aciertos con una carga realista de QRs repetidos
+"""
+
+import io
+import os
+import time
+import base64
+import random
+
+import qrcode
+
+from qr_render import QRRenderer, FORMATS
+
+RENDERS = int(os.getenv('BENCH_RENDERS', 500))
+DISTINCT = int(os.getenv('BENCH_DISTINCT', 50))  # QRs vigentes a la vez (sesiones en login)
+SAMPLE_REF = "2@" + "x" * 180  # Largo típico de un data-ref de WhatsApp Web
+
+
+def payload(i):
+    return f"{SAMPLE_REF}{i:06d}"
+
+
+def legacy_render(data):
+    """Pipeline copiado en los servidores antes de qr_render"""
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def throughput(func, items):
+    started = time.perf_counter()
+    for item in items:
+        func(item)
+    return len(items) / (time.perf_counter() - started)
+
+
+def main():
+    print(f"🧪 Benchmark de renderizado QR ({RENDERS} renders, {DISTINCT} QRs distintos)")
+    print("=" * 60)
+
+    unique = [payload(i) for i in range(RENDERS)]
+    legacy = throughput(legacy_render, unique)
+    print(f"{'anterior (png+b64)':<24} {legacy:>9.1f} renders/s")
+
+    for fmt in FORMATS:
+        cold = QRRenderer(cache_size=0)
+        rate = throughput(lambda data: cold.render(data, fmt), unique)
+        print(f"{'qr_render ' + fmt + ' frío':<24} {rate:>9.1f} renders/s")
+
+    for fmt in FORMATS:
+        warm = QRRenderer()
+        warm.render(unique[0], fmt)
+        rate = throughput(lambda data: warm.render(data, fmt), [unique[0]] * RENDERS)
+        print(f"{'qr_render ' + fmt + ' caché':<24} {rate:>9.1f} renders/s")
+
+    # Carga realista: reenvíos de get_qr/estado sobre un conjunto de QRs vigentes,
+    # con rotaciones que introducen valores nuevos
+    print("-" * 60)
+    random.seed(1)
+    renderer = QRRenderer()
+    current = list(range(DISTINCT))
+    next_id = DISTINCT
+    requests = []
+    for _ in range(RENDERS):
+        if random.random() < 0.1:
+            current[random.randrange(DISTINCT)] = next_id
+            next_id += 1
+        requests.append(payload(random.choice(current)))
+    rate = throughput(lambda data: renderer.render(data, 'png'), requests)
+    stats = renderer.stats()
+    print(f"{'carga mixta png':<24} {rate:>9.1f} renders/s")
+    print(f"   aciertos {stats['hits']}, fallos {stats['misses']}, tasa {stats['hit_ratio']}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark del planificador de sesiones
+Compara un hilo dormido por sesión (modelo anterior de monitoreo y
+heartbeat) con SessionScheduler: hilos vivos, RSS del proceso y jitter
+de los ticks con BENCH_SESSIONS sesiones. Cada modo corre en su propio
+proceso para que el RSS no se mezcle.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+
+from scheduler import SessionScheduler, SCHEDULER_WORKERS
+from stats_utils import percentile
+
+SESSIONS = int(os.getenv('BENCH_SESSIONS', 500))
+INTERVAL = float(os.getenv('BENCH_INTERVAL', 1.0))
+DURATION = float(os.getenv('BENCH_DURATION', 15))
+TICK_WORK = float(os.getenv('BENCH_TICK_WORK', 0.002))  # Round trip simulado a chromedriver
+
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def tick():
+    time.sleep(TICK_WORK)
+
+
+def run_threads():
+    """Un hilo por sesión: trabajo + time.sleep(INTERVAL), como el heartbeat anterior"""
+    jitter = []
+    stop = threading.Event()
+
+    def loop(offset):
+        # Mismo reparto dentro del intervalo que en el planificador
+        time.sleep(offset)
+        due = time.monotonic()
+        while not stop.is_set():
+            jitter.append(time.monotonic() - due)
+            tick()
+            due = time.monotonic() + INTERVAL
+            time.sleep(INTERVAL)
+
+    for index in range(SESSIONS):
+        thread = threading.Thread(target=loop, args=(INTERVAL * index / SESSIONS,))
+        thread.daemon = True
+        thread.start()
+    time.sleep(DURATION)
+    result = {'threads': threading.active_count(), 'rss_mb': rss_mb()}
+    stop.set()
+    return result, jitter
+
+
+def run_scheduler():
+    """Todas las sesiones en el planificador: un despachador y SCHEDULER_WORKERS workers"""
+    scheduler = SessionScheduler()
+
+    def task():
+        tick()
+        return INTERVAL
+
+    for index in range(SESSIONS):
+        # Repartir los ticks dentro del intervalo, como sesiones creadas en distintos momentos
+        scheduler.schedule(f"session-{index}", 'heartbeat', INTERVAL * index / SESSIONS, task)
+    time.sleep(DURATION)
+    # scheduler.jitter guarda las últimas 1000 muestras
+    result = {'threads': threading.active_count(), 'rss_mb': rss_mb(), 'ticks': scheduler.executed}
+    jitter = list(scheduler.jitter)
+    scheduler.stop()
+    return result, jitter
+
+
+def child(mode):
+    result, jitter = run_threads() if mode == 'threads' else run_scheduler()
+    result.setdefault('ticks', len(jitter))
+    result.update({
+        'jitter_p50_ms': (percentile(jitter, 50) or 0) * 1000,
+        'jitter_p95_ms': (percentile(jitter, 95) or 0) * 1000,
+        'jitter_p99_ms': (percentile(jitter, 99) or 0) * 1000
+    })
+    print(json.dumps(result))
+
+
+def main():
+    print(f"🧪 Benchmark del planificador: {SESSIONS} sesiones, tick cada {INTERVAL}s durante {DURATION}s")
+    print(f"   trabajo por tick {TICK_WORK * 1000:.1f} ms, {SCHEDULER_WORKERS} workers en el planificador")
+    print("=" * 72)
+    print(f"{'modo':<10} {'hilos':>6} {'RSS MB':>8} {'ticks':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for mode in ('threads', 'scheduler'):
+        output = subprocess.run(
+            [sys.executable, __file__, mode],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<10} {result['threads']:>6} {result['rss_mb']:>8.1f} {result['ticks']:>7} "
+              f"{result['jitter_p50_ms']:>8.1f} {result['jitter_p95_ms']:>8.1f} {result['jitter_p99_ms']:>8.1f}")
+    print("=" * 72)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        child(sys.argv[1])
+    else:
+        main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memoria y de comparaciones de estado para 100k sesiones
+Compara los dicts libres anteriores (estado como string, dos datetime)
+con el registro Session (__slots__, IntEnum, timestamps monotónicos)
+"""
+
+import gc
+import sys
+import time
+import uuid
+import tracemalloc
+from datetime import datetime
+
+from session_record import Session, SessionStatus, count_by_status
+
+NUM_SESSIONS = 100000
+STATUSES = ['pending', 'connecting', 'qr_ready', 'authenticated']
+
+
+def build_dicts(ids):
+    """Sesiones como las creaba el gestor anterior"""
+    sessions = {}
+    for i, session_id in enumerate(ids):
+        sessions[session_id] = {
+            'client_id': f"client-{i}",
+            'status': STATUSES[i % 4],
+            'created_at': datetime.now(),
+            'qr_code': None,
+            'authenticated': i % 4 == 3,
+            'last_activity': datetime.now(),
+            'driver': None,
+            'phone_number': None
+        }
+    return sessions
+
+
+def build_records(ids):
+    """Sesiones como registros Session"""
+    sessions = {}
+    for i, session_id in enumerate(ids):
+        session = Session(session_id, f"client-{i}", SessionStatus(i % 4))
+        session.authenticated = i % 4 == 3
+        sessions[session_id] = session
+    return sessions
+
+
+def measure(builder, ids):
+    """Memoria asignada por el constructor, en bytes"""
+    gc.collect()
+    tracemalloc.start()
+    sessions = builder(ids)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return sessions, current
+
+
+def stats_dicts(sessions):
+    values = sessions.values()
+    return (
+        sum(1 for s in values if s.get('authenticated', False)),
+        sum(1 for s in values if s.get('status') == 'pending'),
+        sum(1 for s in values if s.get('status') == 'qr_ready'),
+        sum(1 for s in values if s.get('status') == 'connecting')
+    )
+
+
+def stats_records(sessions):
+    counts, authenticated = count_by_status(sessions.values())
+    return (
+        authenticated,
+        counts[SessionStatus.PENDING],
+        counts[SessionStatus.QR_READY],
+        counts[SessionStatus.CONNECTING]
+    )
+
+
+def cleanup_dicts(sessions):
+    current_time = datetime.now()
+    return [sid for sid, s in sessions.items()
+            if (current_time - s['last_activity']).total_seconds() > 7200]
+
+
+def cleanup_records(sessions):
+    cutoff = time.monotonic() - 7200
+    return [sid for sid, s in sessions.items() if s.last_activity < cutoff]
+
+
+def timed(func, sessions, repeat=5):
+    """Mejor tiempo de varias ejecuciones, en milisegundos"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(sessions)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 1)
+
+
+def main():
+    print(f"🧪 Benchmark de sesiones ({NUM_SESSIONS} sesiones, Python {sys.version.split()[0]})")
+    print("=" * 60)
+
+    ids = [str(uuid.uuid4()) for _ in range(NUM_SESSIONS)]
+
+    dicts, dict_bytes = measure(build_dicts, ids)
+    records, record_bytes = measure(build_records, ids)
+
+    assert stats_dicts(dicts) == stats_records(records)
+
+    print(f"{'':<22}{'dict':>12}{'Session':>12}")
+    print(f"{'memoria (MB)':<22}{dict_bytes / 1e6:>12.1f}{record_bytes / 1e6:>12.1f}")
+    print(f"{'bytes por sesión':<22}{dict_bytes // NUM_SESSIONS:>12}{record_bytes // NUM_SESSIONS:>12}")
+    print(f"{'stats (ms)':<22}{timed(stats_dicts, dicts):>12}{timed(stats_records, records):>12}")
+    print(f"{'cleanup (ms)':<22}{timed(cleanup_dicts, dicts):>12}{timed(cleanup_records, records):>12}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
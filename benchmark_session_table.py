@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark de contención de la tabla de sesiones
+Compara el esquema anterior (un solo lock, driver.quit() dentro del lock y
+estadísticas recorriendo todas las sesiones) con ShardedSessionTable,
+con 1k/10k sesiones y heartbeats concurrentes
+"""
+
+import sys
+import time
+import random
+import threading
+
+from session_record import Session, SessionStatus
+from session_table import ShardedSessionTable
+
+DURATION = 3.0
+HEARTBEAT_THREADS = 16
+READER_THREADS = 4
+QUIT_DELAY = 0.005  # Simula un driver.quit() lento
+
+
+class SingleLockTable:
+    """Réplica del gestor anterior: un lock global para todo"""
+
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def insert(self, session):
+        with self.lock:
+            self.sessions[session.session_id] = session
+
+    def get(self, session_id):
+        with self.lock:
+            return self.sessions.get(session_id)
+
+    def update(self, session_id, status, **fields):
+        with self.lock:
+            if session_id in self.sessions:
+                self.sessions[session_id].status = status
+                self.sessions[session_id].update(**fields)
+
+    def pop(self, session_id):
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+            if session is not None:
+                time.sleep(QUIT_DELAY)  # quit() dentro del lock
+            return session
+
+    def stats(self):
+        with self.lock:
+            return {
+                'authenticated': sum(1 for s in self.sessions.values() if s.authenticated),
+                'pending': sum(1 for s in self.sessions.values() if s.status == SessionStatus.PENDING),
+                'qr_ready': sum(1 for s in self.sessions.values() if s.status == SessionStatus.QR_READY)
+            }
+
+
+class ShardedBench(ShardedSessionTable):
+    """Tabla particionada con el quit() fuera del lock, como en el gestor actual"""
+
+    def pop(self, session_id):
+        session = super().pop(session_id)
+        if session is not None:
+            time.sleep(QUIT_DELAY)
+        return session
+
+
+def run(table, num_sessions):
+    """Ejecutar la carga y retornar operaciones por segundo de cada tipo"""
+    ids = [f"session-{i}" for i in range(num_sessions)]
+    for i, session_id in enumerate(ids):
+        session = Session(session_id, f"client-{i % 100}", SessionStatus.AUTHENTICATED)
+        session.authenticated = True
+        table.insert(session)
+
+    stop = threading.Event()
+    counters = {'heartbeat': 0, 'read': 0, 'stats': 0, 'churn': 0}
+    counters_lock = threading.Lock()
+
+    def heartbeat():
+        done = 0
+        rnd = random.Random()
+        while not stop.is_set():
+            table.update(rnd.choice(ids), SessionStatus.AUTHENTICATED, last_activity=time.monotonic())
+            done += 1
+        with counters_lock:
+            counters['heartbeat'] += done
+
+    def reader():
+        done = 0
+        stats_done = 0
+        rnd = random.Random()
+        while not stop.is_set():
+            table.get(rnd.choice(ids))
+            done += 1
+            if done % 100 == 0:
+                table.stats()
+                stats_done += 1
+        with counters_lock:
+            counters['read'] += done
+            counters['stats'] += stats_done
+
+    def churn():
+        done = 0
+        n = 0
+        while not stop.is_set():
+            session_id = f"churn-{n}"
+            table.insert(Session(session_id, 'churn'))
+            table.pop(session_id)
+            n += 1
+            done += 1
+        with counters_lock:
+            counters['churn'] += done
+
+    threads = [threading.Thread(target=heartbeat) for _ in range(HEARTBEAT_THREADS)]
+    threads += [threading.Thread(target=reader) for _ in range(READER_THREADS)]
+    threads.append(threading.Thread(target=churn))
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {name: round(count / DURATION) for name, count in counters.items()}
+
+
+def main():
+    print("🧪 Benchmark de contención de la tabla de sesiones")
+    print(f"   Python {sys.version.split()[0]} - {HEARTBEAT_THREADS} hilos de heartbeat, "
+          f"{READER_THREADS} lectores, {DURATION}s por caso")
+    print("=" * 70)
+    print(f"{'tabla':<18}{'sesiones':>10}{'heartbeat/s':>14}{'lecturas/s':>14}{'stats/s':>10}{'churn/s':>10}")
+
+    for num_sessions in (1000, 10000):
+        for name, factory in (('un solo lock', SingleLockTable), ('particionada', ShardedBench)):
+            result = run(factory(), num_sessions)
+            print(f"{name:<18}{num_sessions:>10}{result['heartbeat']:>14}{result['read']:>14}"
+                  f"{result['stats']:>10}{result['churn']:>10}")
+
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
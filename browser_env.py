@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Descubrimiento del entorno de navegador (Chrome y ChromeDriver)
+Se ejecuta una vez por proceso: prueba las rutas candidatas en paralelo
+y guarda versiones y capacidades en un archivo pequeño, válido mientras
+no cambien los binarios (mtime y tamaño)
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+BROWSER_ENV_CACHE = os.getenv('BROWSER_ENV_CACHE', '/tmp/browser_env.json')
+VERSION_TIMEOUT = float(os.getenv('BROWSER_VERSION_TIMEOUT', 10))
+
+# Rutas candidatas en orden de preferencia
+CHROME_PATHS = [
+    '/usr/bin/google-chrome',
+    '/usr/bin/google-chrome-stable',
+    '/usr/bin/chromium-browser',
+    '/usr/bin/chromium',
+    '/usr/bin/chrome',
+    '/snap/bin/chromium',
+    '/opt/google/chrome/chrome'
+]
+CHROME_COMMANDS = ['google-chrome', 'chromium-browser', 'chromium']
+
+CHROMEDRIVER_PATHS = [
+    '/usr/bin/chromedriver',
+    '/usr/local/bin/chromedriver'
+]
+CHROMEDRIVER_COMMANDS = ['chromedriver']
+
+_env = None
+_env_lock = threading.Lock()
+
+
+def _candidates(env_var, paths, commands):
+    """Rutas a probar: variable de entorno, rutas fijas y el PATH, sin duplicados"""
+    candidates = []
+    for path in [os.getenv(env_var)] + paths + [shutil.which(command) for command in commands]:
+        if path and path not in candidates:
+            candidates.append(path)
+    return candidates
+
+
+def _stat_key(paths):
+    """Huella de los binarios existentes; si cambia, la caché ya no vale"""
+    key = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        key.append([path, int(st.st_mtime), st.st_size])
+    return key
+
+
+def probe_binary(path, timeout=VERSION_TIMEOUT):
+    """Ejecutar `path --version`; retorna {'path', 'version', 'major'} o None"""
+    try:
+        result = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"⚠️ No se pudo verificar {path}: {e}")
+        return None
+    if result.returncode != 0:
+        return None
+    version = result.stdout.strip()
+    match = re.search(r'(\d+)\.\d+', version)
+    return {
+        'path': path,
+        'version': version,
+        'major': int(match.group(1)) if match else None
+    }
+
+
+def _read_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(path, data):
+    try:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"⚠️ No se pudo guardar la caché del entorno de navegador: {e}")
+
+
+def _probe_all(chrome_candidates, driver_candidates):
+    """Probar todos los candidatos existentes en paralelo; gana el primero por preferencia"""
+    existing = [path for path in chrome_candidates + driver_candidates if os.path.exists(path)]
+    if not existing:
+        return None, None
+    with ThreadPoolExecutor(max_workers=len(existing)) as executor:
+        results = dict(zip(existing, executor.map(probe_binary, existing)))
+
+    chrome = next((results[p] for p in chrome_candidates if results.get(p)), None)
+    driver = next((results[p] for p in driver_candidates if results.get(p)), None)
+    return chrome, driver
+
+
+def discover_browser_env(refresh=False, cache_path=BROWSER_ENV_CACHE):
+    """
+    Entorno de navegador del proceso (memorizado).
+
+    Retorna un dict con:
+        chrome / chromedriver: {'path', 'version', 'major'} o None
+        capabilities: available, versions_match, headless_new
+        cached: True si las versiones salieron del archivo de caché
+        elapsed: segundos que tomó el descubrimiento
+    """
+    global _env
+    with _env_lock:
+        if _env is not None and not refresh:
+            return _env
+
+        started = time.monotonic()
+        chrome_candidates = _candidates('CHROME_PATH', CHROME_PATHS, CHROME_COMMANDS)
+        driver_candidates = _candidates('CHROMEDRIVER_PATH', CHROMEDRIVER_PATHS, CHROMEDRIVER_COMMANDS)
+        key = _stat_key(chrome_candidates + driver_candidates)
+
+        cached = None if refresh else _read_cache(cache_path)
+        if cached and cached.get('key') == key:
+            chrome, driver = cached['chrome'], cached['chromedriver']
+            from_cache = True
+        else:
+            chrome, driver = _probe_all(chrome_candidates, driver_candidates)
+            _write_cache(cache_path, {'key': key, 'chrome': chrome, 'chromedriver': driver})
+            from_cache = False
+
+        chrome_major = chrome['major'] if chrome else None
+        driver_major = driver['major'] if driver else None
+        _env = {
+            'chrome': chrome,
+            'chromedriver': driver,
+            'capabilities': {
+                'available': bool(chrome and driver),
+                'versions_match': bool(chrome_major and chrome_major == driver_major),
+                'headless_new': bool(chrome_major and chrome_major >= 109)
+            },
+            'cached': from_cache,
+            'elapsed': round(time.monotonic() - started, 3)
+        }
+
+        logger.info(
+            f"🔎 Entorno de navegador ({'caché' if from_cache else 'sondeo'}, {_env['elapsed']}s): "
+            f"Chrome={chrome['path'] if chrome else None}, "
+            f"ChromeDriver={driver['path'] if driver else None}"
+        )
+        if chrome and driver and not _env['capabilities']['versions_match']:
+            logger.warning(f"⚠️ Versiones distintas: Chrome {chrome_major} / ChromeDriver {driver_major}")
+        return _env
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Varias sesiones de WhatsApp Web por proceso de Chrome
+Cada sesión vive en un browser context aislado (cookies y storage propios)
+creado por DevTools dentro de un Chrome compartido
+"""
+
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Configuración (1 = un Chrome por sesión, el modelo anterior)
+CHROME_CONTEXTS_PER_BROWSER = int(os.getenv('CHROME_CONTEXTS_PER_BROWSER', 1))
+CONTEXT_MEMORY_SAMPLE_INTERVAL = float(os.getenv('CONTEXT_MEMORY_SAMPLE_INTERVAL', 10))
+
+JS_HEAP_SCRIPT = "return window.performance && performance.memory ? performance.memory.usedJSHeapSize : null;"
+
+
+def process_tree_pids(root_pid):
+    """PIDs de un proceso y todos sus descendientes (Linux, vía /proc)"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # El nombre puede tener espacios; el ppid va después del último ')'
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    pids = []
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        pids.append(pid)
+        pending.extend(children.get(pid, ()))
+    return pids
+
+
+def process_tree_rss(root_pid):
+    """RSS en bytes de un proceso y todos sus descendientes"""
+    total = 0
+    for pid in process_tree_pids(root_pid):
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+def process_tree_cpu(root_pid):
+    """Segundos de CPU (utime + stime) consumidos por un proceso y sus descendientes vivos"""
+    ticks = 0
+    for pid in process_tree_pids(root_pid):
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            # Campos 14 y 15 de stat; tras el ')' empiezan en el campo 3
+            ticks += int(fields[11]) + int(fields[12])
+        except (OSError, IndexError, ValueError):
+            continue
+    return ticks / os.sysconf('SC_CLK_TCK')
+
+
+class ContextDriver:
+    """
+    Driver de una sesión dentro de un Chrome compartido.
+
+    Expone la misma interfaz que el WebDriver que se usa en el servidor
+    (get, execute_script, find_element, current_url, ...). Cada llamada
+    toma el lock del navegador y cambia a la ventana del contexto; los
+    WebElement devueltos solo son válidos para comprobar existencia.
+    """
+
+    # Atributos propios: no deben resolverse contra el driver compartido
+    service = None  # El reaper no debe matar el chromedriver compartido
+    user_data_dir = None  # Los contextos no tienen perfil en disco
+    tenant = None
+    debug_port = None  # El puerto pertenece al Chrome compartido
+
+    def __init__(self, host, handle, context_id, target_id, on_quit):
+        self.host = host
+        self.handle = handle
+        self.context_id = context_id
+        self.target_id = target_id
+        self.on_quit = on_quit
+        self.closed = False
+        self.js_heap = None
+
+    def __getattr__(self, name):
+        value = self.host.run(self.handle, lambda driver: getattr(driver, name))
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            return self.host.run(self.handle, lambda driver: getattr(driver, name)(*args, **kwargs))
+        return call
+
+    @property
+    def devtools_port(self):
+        """Puerto de depuración del Chrome compartido (para conexiones DevTools)"""
+        return getattr(self.host.driver, 'debug_port', None)
+
+    def quit(self):
+        """Cerrar solo este contexto; el navegador sigue sirviendo a los demás"""
+        if self.closed:
+            return
+        self.closed = True
+        self.on_quit(self)
+
+
+class BrowserHost:
+    """
+    Un Chrome real y los contextos abiertos en él. Se crea sin driver
+    mientras se lanza: `ready` se marca al terminar el lanzamiento y
+    `reserved` cuenta los contextos prometidos que aún no se abrieron.
+    """
+
+    def __init__(self, driver, capacity):
+        self.driver = driver
+        self.capacity = capacity
+        self.lock = threading.RLock()
+        self.current_handle = None
+        self.contexts = {}  # handle -> ContextDriver
+        self.reserved = 0
+        self.ready = threading.Event()
+        if driver is not None:
+            self.ready.set()
+        self.rss = None
+        self.sampled_at = None
+
+    def run(self, handle, func):
+        """Ejecutar func(driver) con la ventana del contexto activa"""
+        with self.lock:
+            if self.current_handle != handle:
+                self.driver.switch_to.window(handle)
+                self.current_handle = handle
+            return func(self.driver)
+
+    def open_context(self, on_quit):
+        """Crear un browser context aislado con su propia pestaña"""
+        with self.lock:
+            before = set(self.driver.window_handles)
+            context_id = self.driver.execute_cdp_cmd('Target.createBrowserContext', {})['browserContextId']
+            target_id = self.driver.execute_cdp_cmd('Target.createTarget', {
+                'url': 'about:blank',
+                'browserContextId': context_id
+            })['targetId']
+            new_handles = set(self.driver.window_handles) - before
+            handle = new_handles.pop() if new_handles else target_id
+            context = ContextDriver(self, handle, context_id, target_id, on_quit)
+            self.contexts[handle] = context
+            return context
+
+    def close_context(self, context):
+        """Cerrar la pestaña y descartar el contexto (cookies y storage incluidos)"""
+        with self.lock:
+            self.contexts.pop(context.handle, None)
+            if self.current_handle == context.handle:
+                self.current_handle = None
+            try:
+                self.driver.execute_cdp_cmd('Target.closeTarget', {'targetId': context.target_id})
+                self.driver.execute_cdp_cmd('Target.disposeBrowserContext', {'browserContextId': context.context_id})
+            except Exception as e:
+                logger.error(f"Error cerrando browser context {context.context_id}: {e}")
+
+    def sample_memory(self):
+        """Medir RSS del árbol de Chrome y heap JS de cada contexto (un round trip por contexto)"""
+        self.sampled_at = time.monotonic()
+        process = getattr(getattr(self.driver, 'service', None), 'process', None)
+        if process is not None and os.path.isdir('/proc'):
+            self.rss = process_tree_rss(process.pid)
+        for context in list(self.contexts.values()):
+            try:
+                context.js_heap = self.run(context.handle, lambda driver: driver.execute_script(JS_HEAP_SCRIPT))
+            except Exception:
+                context.js_heap = None
+
+    def stats(self):
+        """Última medición de memoria (la toma sample_memory, no esta llamada)"""
+        contexts = len(self.contexts)
+        return {
+            'contexts': contexts,
+            'capacity': self.capacity,
+            'sample_age': round(time.monotonic() - self.sampled_at, 1) if self.sampled_at else None,
+            'rss_mb': round(self.rss / 1048576, 1) if self.rss else None,
+            'rss_per_context_mb': round(self.rss / 1048576 / contexts, 1) if self.rss and contexts else None,
+            'js_heap_mb': [
+                round(context.js_heap / 1048576, 1) if context.js_heap else None
+                for context in list(self.contexts.values())
+            ]
+        }
+
+
+class MultiplexedDriverPool:
+    """
+    Empaqueta sesiones en navegadores compartidos, `contexts_per_browser`
+    por proceso. Un navegador que queda sin contextos se entrega al disposer.
+    """
+
+    def __init__(self, launcher, contexts_per_browser=CHROME_CONTEXTS_PER_BROWSER, disposer=None):
+        self.launcher = launcher
+        self.contexts_per_browser = max(1, contexts_per_browser)
+        self.disposer = disposer
+        self.hosts = []
+        self.lock = threading.Lock()
+
+        # Métricas
+        self.browsers_launched = 0
+        self.contexts_opened = 0
+
+    @property
+    def enabled(self):
+        return self.contexts_per_browser > 1
+
+    def acquire(self):
+        """
+        Abrir un contexto en el navegador más lleno que aún tenga espacio, o
+        lanzar uno. Bajo el lock solo se elige y reserva el lugar; el
+        lanzamiento de Chrome y la creación del contexto van fuera de él.
+        """
+        with self.lock:
+            candidates = [host for host in self.hosts if len(host.contexts) + host.reserved < host.capacity]
+            host = max(candidates, key=lambda h: len(h.contexts) + h.reserved, default=None)
+            launch = host is None
+            if launch:
+                # Navegador reservado antes de lanzarlo: los acquire concurrentes lo comparten
+                host = BrowserHost(None, self.contexts_per_browser)
+                self.hosts.append(host)
+            host.reserved += 1
+
+        if launch:
+            driver = None
+            try:
+                driver = self.launcher()
+            except Exception as e:
+                logger.error(f"Error lanzando Chrome compartido: {e}")
+            with self.lock:
+                if driver:
+                    host.driver = driver
+                    self.browsers_launched += 1
+                    logger.info(f"🧩 Nuevo Chrome compartido ({len(self.hosts)} en total)")
+                else:
+                    self.hosts.remove(host)
+            host.ready.set()
+        else:
+            host.ready.wait()
+
+        if host.driver is None:
+            with self.lock:
+                host.reserved -= 1
+            return None
+
+        try:
+            context = host.open_context(self.release)
+        except Exception as e:
+            logger.error(f"Error creando browser context: {e}")
+            context = None
+        with self.lock:
+            host.reserved -= 1
+            if context is None:
+                if not host.contexts and not host.reserved and host in self.hosts:
+                    self._retire(host)
+                return None
+            self.contexts_opened += 1
+        return context
+
+    def release(self, context):
+        """Cerrar un contexto; si el navegador queda vacío (y sin reservas), desmontarlo"""
+        host = context.host
+        host.close_context(context)
+        with self.lock:
+            if not host.contexts and not host.reserved and host in self.hosts:
+                self._retire(host)
+
+    def _retire(self, host):
+        self.hosts.remove(host)
+        if self.disposer is not None:
+            self.disposer(host.driver)
+        else:
+            host.driver.quit()
+
+    def sample_memory(self):
+        """Medir la memoria de todos los navegadores (tarea periódica, fuera de /api/stats)"""
+        with self.lock:
+            hosts = [host for host in self.hosts if host.driver is not None]
+        for host in hosts:
+            try:
+                host.sample_memory()
+            except Exception as e:
+                logger.error(f"Error midiendo memoria de Chrome compartido: {e}")
+
+    def stats(self):
+        """Densidad de empaquetado y memoria por navegador y contexto (valores cacheados)"""
+        with self.lock:
+            hosts = [host for host in self.hosts if host.driver is not None]
+        browsers = [host.stats() for host in hosts]
+        contexts = sum(b['contexts'] for b in browsers)
+        rss = [b['rss_mb'] for b in browsers if b['rss_mb']]
+        return {
+            'enabled': self.enabled,
+            'contexts_per_browser': self.contexts_per_browser,
+            'browsers': len(browsers),
+            'contexts': contexts,
+            'browsers_launched': self.browsers_launched,
+            'contexts_opened': self.contexts_opened,
+            'rss_mb': round(sum(rss), 1) if rss else None,
+            'sessions_per_gb': round(contexts / (sum(rss) / 1024), 1) if rss and contexts else None,
+            'hosts': browsers
+        }
@@ -8,13 +8,13 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 
+from auth_detection import classify_page, selector_registry
+from launch_profiles import apply_launch_profile
+
 def check_whatsapp_elements():
     # Configurar Chrome
     chrome_options = Options()
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-gpu')
-    chrome_options.add_argument('--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36')
+    apply_launch_profile(chrome_options, 'debug')
     
     service = Service('/usr/bin/chromedriver')
     driver = webdriver.Chrome(service=service, options=chrome_options)
@@ -28,31 +28,27 @@ def check_whatsapp_elements():
         
         print("\n=== ELEMENTOS ENCONTRADOS ===")
         
-        # Buscar elementos comunes de WhatsApp Web autenticado
-        selectors = [
-            "[data-testid='chat-list-search']",
-            "[data-testid='search']", 
-            "[data-testid='chatlist-search']",
-            "input[placeholder*='Search']",
-            "input[placeholder*='Buscar']",
-            "[aria-label*='Search']",
-            "[aria-label*='Buscar']",
-            "._3uMse",  # Clase común del chat list
-            "._2_e0y",  # Otra clase común
-            "#main",
-            ".app",
-            "._1jJ70"  # Sidebar
-        ]
+        # Selectores del registro, en el orden aprendido (con sus estadísticas guardadas)
+        selector_registry.load()
+        stats = selector_registry.stats()['groups']
+        
+        for group, selectors in stats.items():
+            print(f"\n--- {group} ---")
+            for entry in selectors:
+                selector = entry['selector']
+                history = f"aciertos {entry['hits']}/{entry['probes']}"
+                try:
+                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
+                    if elements:
+                        print(f"✅ ENCONTRADO: {selector} ({len(elements)} elementos, {history})")
+                    else:
+                        print(f"❌ NO ENCONTRADO: {selector} ({history})")
+                except Exception as e:
+                    print(f"❌ ERROR con {selector}: {e}")
         
-        for selector in selectors:
-            try:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                if elements:
-                    print(f"✅ ENCONTRADO: {selector} ({len(elements)} elementos)")
-                else:
-                    print(f"❌ NO ENCONTRADO: {selector}")
-            except Exception as e:
-                print(f"❌ ERROR con {selector}: {e}")
+        # Estado según el clasificador
+        print("\n=== ESTADO DE LA PÁGINA ===")
+        print(f"Estado: {classify_page(driver).get('state')}")
         
         # Verificar título de la página
         print(f"\n=== TÍTULO ===")
@@ -3,15 +3,32 @@
 
 from flask import Blueprint, render_template, request, session, redirect, jsonify
 from clientes.aura.utils.supabase_client import supabase
-import qrcode
-import io
-import base64
+from clientes.aura.utils.qr_render import render_qr_base64
+import os
 import json
+import hmac
+import time
+import hashlib
 from datetime import datetime
 
+# Secreto compartido con el servidor WebSocket: solo con un token firmado
+# usa el perfil persistente (y la vinculación) de una Nora
+TENANT_TOKEN_SECRET = os.getenv('TENANT_TOKEN_SECRET', '')
+TENANT_TOKEN_TTL = int(os.getenv('TENANT_TOKEN_TTL', 3600))
+
 # Crear el blueprint
 panel_cliente_qr_whatsapp_web_bp = Blueprint('panel_cliente_qr_whatsapp_web', __name__)
 
+def firmar_tenant(nombre_nora):
+    """Token '<nora>:<vence>:<hmac>' para el servidor WebSocket (None sin secreto configurado)"""
+    if not TENANT_TOKEN_SECRET or not nombre_nora:
+        return None
+    vence = int(time.time()) + TENANT_TOKEN_TTL
+    firma = hmac.new(
+        TENANT_TOKEN_SECRET.encode(), f"{nombre_nora}:{vence}".encode(), hashlib.sha256
+    ).hexdigest()
+    return f"{nombre_nora}:{vence}:{firma}"
+
 @panel_cliente_qr_whatsapp_web_bp.route('/')
 def index():
     """Vista principal del módulo QR WhatsApp Web"""
@@ -54,6 +71,7 @@ def index():
         
         return render_template('panel_cliente_qr_whatsapp_web/index_websocket.html',
                              nombre_nora=nombre_nora,
+                             tenant_token=firmar_tenant(nombre_nora),
                              session_data=session_data)
         
     except Exception as e:
@@ -89,24 +107,8 @@ def generar_qr():
         # Crear un QR con información JSON o URL personalizada
         qr_data = f"NORA_WA_CONNECTION:{json.dumps(conexion_info)}"
         
-        # Generar QR code
-        qr = qrcode.QRCode(
-            version=2,  # Aumentar versión para más datos
-            error_correction=qrcode.constants.ERROR_CORRECT_M,
-            box_size=8,
-            border=4,
-        )
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        
-        # Crear imagen del QR
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convertir a base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        qr_base64 = base64.b64encode(buffer.getvalue()).decode()
+        # Generar QR code en base64 (versión 2 para más datos)
+        qr_base64 = render_qr_base64(qr_data, version=2, error_correction='M', box_size=8)
         
         # Guardar sesión en base de datos
         session_data = {
@@ -247,24 +249,8 @@ def generar_qr_whatsapp():
             # Sin número específico, solo el mensaje
             whatsapp_url = f"https://wa.me/?text={mensaje}"
         
-        # Generar QR code para WhatsApp
-        qr = qrcode.QRCode(
-            version=2,
-            error_correction=qrcode.constants.ERROR_CORRECT_M,
-            box_size=8,
-            border=4,
-        )
-        qr.add_data(whatsapp_url)
-        qr.make(fit=True)
-        
-        # Crear imagen
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convertir a base64
-        img_buffer = io.BytesIO()
-        img.save(img_buffer, format='PNG')
-        img_buffer.seek(0)
-        img_base64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
+        # Generar QR code para WhatsApp en base64
+        img_base64 = render_qr_base64(whatsapp_url, version=2, error_correction='M', box_size=8)
         
         return jsonify({
             "success": True,
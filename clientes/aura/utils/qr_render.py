@@ -0,0 +1,46 @@
+# ✅ Archivo: clientes/aura/utils/qr_render.py
+# 👉 Renderizado de QR del panel: una sola copia del pipeline qrcode -> PNG
+#    (el panel se despliega aparte y no tiene el qr_render.py del servidor)
+
+import io
+import os
+import base64
+from functools import lru_cache
+
+import qrcode
+from PIL import Image
+
+QR_CACHE_SIZE = int(os.getenv('QR_CACHE_SIZE', 256))
+
+ERROR_CORRECTION = {
+    'L': qrcode.constants.ERROR_CORRECT_L,
+    'M': qrcode.constants.ERROR_CORRECT_M,
+    'Q': qrcode.constants.ERROR_CORRECT_Q,
+    'H': qrcode.constants.ERROR_CORRECT_H
+}
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def render_qr(data, version=1, error_correction='L', box_size=10, border=4):
+    """PNG del QR en bytes: 1 bit por módulo escalado sin interpolación (cacheado)"""
+    qr = qrcode.QRCode(
+        version=version,
+        error_correction=ERROR_CORRECTION[error_correction],
+        border=border
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+
+    size = len(matrix)
+    image = Image.new('1', (size, size), 1)
+    image.putdata([0 if dark else 1 for row in matrix for dark in row])
+    image = image.resize((size * box_size, size * box_size), Image.NEAREST)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def render_qr_base64(data, **options):
+    """PNG del QR en base64, como lo esperan las vistas del panel"""
+    return base64.b64encode(render_qr(data, **options)).decode()
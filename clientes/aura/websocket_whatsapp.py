@@ -4,13 +4,12 @@ import json
 import uuid
 import time
 import threading
-import qrcode
-import io
-import base64
 from datetime import datetime
 import os
 import logging
 
+from clientes.aura.utils.qr_render import render_qr
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -50,25 +49,11 @@ class WhatsAppWebSocketManager:
             # Por ahora, generamos un QR con datos simulados
             qr_data = f"whatsapp-web-session:{session_id}:{int(time.time())}"
             
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Convertir a base64
-            img_buffer = io.BytesIO()
-            img.save(img_buffer, format='PNG')
-            img_buffer.seek(0)
-            img_base64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
+            # PNG en bytes (se envía como adjunto binario, sin base64)
+            qr_image = render_qr(qr_data)
             
             # Actualizar sesión
-            self.update_session_status(session_id, 'qr_ready', qr_code=img_base64)
+            self.update_session_status(session_id, 'qr_ready', qr_code=qr_image)
             
             return qr_data
             
@@ -142,6 +127,7 @@ def init_websocket(app):
                     'type': 'qr_code',
                     'session_id': session_id,
                     'qr_data': qr_data,
+                    'qr_image': ws_manager.get_session(session_id)['qr_code'],
                     'message': 'Código QR generado'
                 })
                 
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Observador de página por DevTools Protocol
+Inyecta un MutationObserver en WhatsApp Web que publica el estado de la
+página (el mismo clasificador que el sondeo) a través de Runtime.addBinding;
+los cambios llegan como eventos por el puerto de depuración, sin sondeos
+de chromedriver
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import urllib.request
+
+from auth_detection import CLASSIFIER_FUNCTION, classifier_selectors, selector_registry
+
+try:
+    import websocket
+    WEBSOCKET_AVAILABLE = True
+except ImportError:
+    WEBSOCKET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+DEVTOOLS_EVENTS = os.getenv('DEVTOOLS_EVENTS', 'true').lower() == 'true'
+DEVTOOLS_CONNECT_TIMEOUT = float(os.getenv('DEVTOOLS_CONNECT_TIMEOUT', 5))
+DEVTOOLS_DEBOUNCE_MS = int(os.getenv('DEVTOOLS_DEBOUNCE_MS', 50))
+
+BINDING_NAME = '__whatsappState'
+
+# Atributos que cambian cuando aparece/rota el QR, carga la interfaz o avanza la barra de progreso
+OBSERVED_ATTRIBUTES = ['data-ref', 'data-testid', 'data-icon', 'aria-label', 'placeholder', 'class', 'id', 'role', 'value']
+
+OBSERVER_TEMPLATE = """
+(function(selectors, attributes, debounce, binding) {
+    if (window.top !== window) {
+        return;
+    }
+    if (window.__whatsappObserver) {
+        window.__whatsappObserver.report(true);
+        return;
+    }
+%s
+    var last = null;
+    var pending = false;
+    function report(force) {
+        pending = false;
+        if (typeof window[binding] !== 'function') {
+            return;
+        }
+        var state = classifyPage(selectors);
+        var probes = state.probes;
+        delete state.probes;
+        // Solo se publican los cambios de estado (los tiempos de sondeo no cuentan)
+        var key = JSON.stringify(state);
+        if (force === true || key !== last) {
+            last = key;
+            state.probes = probes;
+            window[binding](JSON.stringify(state));
+        }
+    }
+    function schedule() {
+        if (!pending) {
+            pending = true;
+            setTimeout(report, debounce);
+        }
+    }
+    function observe() {
+        var observer = new MutationObserver(schedule);
+        observer.observe(document.documentElement, {
+            childList: true,
+            subtree: true,
+            attributes: true,
+            attributeFilter: attributes
+        });
+        window.__whatsappObserver = {observer: observer, report: report};
+        report(true);
+    }
+    if (document.documentElement) {
+        observe();
+    } else {
+        document.addEventListener('DOMContentLoaded', observe);
+    }
+})(%s, %s, %d, %s);
+"""
+
+DETACH_SCRIPT = """
+if (window.__whatsappObserver) {
+    window.__whatsappObserver.observer.disconnect();
+    delete window.__whatsappObserver;
+}
+"""
+
+
+def observer_script(selectors=None):
+    """Script del MutationObserver con el clasificador y sus selectores"""
+    return OBSERVER_TEMPLATE % (
+        CLASSIFIER_FUNCTION,
+        json.dumps(selectors or classifier_selectors()),
+        json.dumps(OBSERVED_ATTRIBUTES),
+        DEVTOOLS_DEBOUNCE_MS,
+        json.dumps(BINDING_NAME)
+    )
+
+
+def find_page_target(port, target_id=None, host='127.0.0.1'):
+    """URL del WebSocket DevTools de la página (la indicada o la de WhatsApp Web)"""
+    with urllib.request.urlopen(f'http://{host}:{port}/json/list', timeout=DEVTOOLS_CONNECT_TIMEOUT) as response:
+        targets = json.loads(response.read().decode())
+
+    pages = [t for t in targets if t.get('type') == 'page' and t.get('webSocketDebuggerUrl')]
+    if target_id:
+        pages = [t for t in pages if t.get('id') == target_id]
+    else:
+        # Un Chrome por sesión tiene una sola pestaña; preferir la de WhatsApp si hubiera más
+        pages.sort(key=lambda t: 'whatsapp' not in t.get('url', ''))
+    return pages[0]['webSocketDebuggerUrl'] if pages else None
+
+
+class PageWatcher:
+    """
+    Conexión DevTools a una página con el observador instalado.
+
+    El estado publicado por la página queda en `state`; `on_state(state)`
+    se llama en el hilo lector por cada cambio y `wait_for` bloquea hasta
+    que un estado cumpla un predicado.
+    """
+
+    def __init__(self, port, target_id=None, on_state=None, host='127.0.0.1'):
+        self.port = port
+        self.target_id = target_id
+        self.on_state = on_state
+        self.host = host
+        self.ws = None
+        self.state = {}
+        self.selectors = None
+        self.connected = False
+        self.condition = threading.Condition()
+        self.next_id = 0
+        self.send_lock = threading.Lock()
+
+        # Métricas
+        self.events = 0
+        self.connected_at = None
+        self.last_event_at = None
+
+    def start(self):
+        """Conectar e instalar binding y observador; False si no fue posible"""
+        if not WEBSOCKET_AVAILABLE:
+            return False
+        try:
+            url = find_page_target(self.port, self.target_id, self.host)
+            if not url:
+                logger.warning(f"⚠️ Sin página DevTools en el puerto {self.port}")
+                return False
+            # Chrome rechaza conexiones con Origin si no hay --remote-allow-origins
+            self.ws = websocket.create_connection(url, timeout=DEVTOOLS_CONNECT_TIMEOUT, suppress_origin=True)
+            self.ws.settimeout(None)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo conectar a DevTools en el puerto {self.port}: {e}")
+            return False
+
+        self.connected = True
+        self.connected_at = time.monotonic()
+        thread = threading.Thread(target=self._read, name=f"devtools-{self.port}")
+        thread.daemon = True
+        thread.start()
+
+        # El orden de selectores queda fijo mientras dure la conexión
+        self.selectors = classifier_selectors()
+        script = observer_script(self.selectors)
+        self._send('Runtime.enable')
+        self._send('Runtime.addBinding', {'name': BINDING_NAME})
+        # En cada navegación o recarga, y en el documento ya cargado
+        self._send('Page.addScriptToEvaluateOnNewDocument', {'source': script})
+        self._send('Runtime.evaluate', {'expression': script})
+        return True
+
+    def _send(self, method, params=None):
+        with self.send_lock:
+            self.next_id += 1
+            message = {'id': self.next_id, 'method': method, 'params': params or {}}
+            try:
+                self.ws.send(json.dumps(message))
+            except Exception as e:
+                logger.warning(f"⚠️ Error enviando {method} a DevTools: {e}")
+
+    def _read(self):
+        while self.connected:
+            try:
+                message = json.loads(self.ws.recv())
+            except Exception:
+                break
+
+            if 'error' in message:
+                logger.warning(f"⚠️ DevTools respondió error: {message['error']}")
+                continue
+            if message.get('method') != 'Runtime.bindingCalled':
+                continue
+            params = message.get('params', {})
+            if params.get('name') != BINDING_NAME:
+                continue
+            try:
+                state = json.loads(params.get('payload') or '{}')
+            except ValueError:
+                continue
+            selector_registry.record(self.selectors, state.get('probes'))
+
+            with self.condition:
+                self.state = state
+                self.events += 1
+                self.last_event_at = time.monotonic()
+                self.condition.notify_all()
+            if self.on_state:
+                try:
+                    self.on_state(state)
+                except Exception as e:
+                    logger.error(f"Error procesando estado de la página: {e}")
+
+        with self.condition:
+            self.connected = False
+            self.condition.notify_all()
+
+    def wait_for(self, predicate, timeout, should_continue=None, check_interval=1.0):
+        """
+        Esperar un estado que cumpla `predicate`.
+
+        Retorna ese estado, o None si venció el timeout, `should_continue`
+        retornó False o se perdió la conexión (ver `connected`).
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                if predicate(self.state):
+                    return self.state
+                if not self.connected:
+                    return None
+                if should_continue is not None and not should_continue():
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                # Despierta con cada evento; check_interval solo acota should_continue
+                self.condition.wait(min(check_interval, remaining))
+
+    def close(self):
+        """Desconectar el observador y cerrar la conexión DevTools (Chrome y la página siguen vivos)"""
+        with self.condition:
+            was_connected = self.connected
+            self.connected = False
+            self.condition.notify_all()
+        if was_connected and self.ws:
+            # El script de nuevos documentos muere con la conexión; el observador actual no
+            self._send('Runtime.evaluate', {'expression': DETACH_SCRIPT})
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+
+
+def watch_page(port, target_id=None, on_state=None):
+    """Iniciar un PageWatcher; None si los eventos DevTools no están disponibles"""
+    if not DEVTOOLS_EVENTS or not port:
+        return None
+    watcher = PageWatcher(port, target_id, on_state)
+    if not watcher.start():
+        return None
+    return watcher
+
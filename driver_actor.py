@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Cola de comandos WebDriver por sesión
+Chromedriver no es seguro entre hilos: cada sesión tiene su propia cola y
+sus comandos se ejecutan en orden, de a uno, sobre un pool acotado de
+workers compartido. Quien envía recibe un Future y puede esperarlo sin
+bloquear el hub de gevent
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from offload import wait_future
+from stats_utils import percentile
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+DRIVER_ACTOR_WORKERS = int(os.getenv('DRIVER_ACTOR_WORKERS', 8))
+DRIVER_COMMAND_TIMEOUT = float(os.getenv('DRIVER_COMMAND_TIMEOUT', 30))
+DRIVER_ACTOR_TOMBSTONES = int(os.getenv('DRIVER_ACTOR_TOMBSTONES', 10000))
+
+
+class DriverCommand:
+    """Llamada pendiente; vence si sigue en cola al llegar a su deadline"""
+
+    __slots__ = ('func', 'args', 'future', 'enqueued_at', 'deadline')
+
+    def __init__(self, func, args, timeout):
+        self.func = func
+        self.args = args
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+        self.deadline = self.enqueued_at + timeout
+
+
+class DriverActor:
+    """
+    Cola de una sesión. A lo sumo un worker la procesa a la vez; tras cada
+    comando vuelve al final de la cola del pool, así una sesión con muchos
+    comandos no acapara los workers.
+    """
+
+    def __init__(self, session_id, pool):
+        self.session_id = session_id
+        self.pool = pool
+        self.queue = deque()
+        self.lock = threading.Lock()
+        self.active = False
+        self.closed = False
+
+    def submit(self, func, *args, timeout=None):
+        """Encolar func(*args); retorna su Future"""
+        command = DriverCommand(func, args, self.pool.timeout if timeout is None else timeout)
+        with self.lock:
+            if self.closed:
+                command.future.set_exception(RuntimeError(f"Cola de la sesión {self.session_id} cerrada"))
+                return command.future
+            self.queue.append(command)
+            depth = len(self.queue)
+            start = not self.active
+            self.active = True
+        self.pool.note_submitted(depth)
+        if start:
+            self.pool.executor.submit(self._step)
+        return command.future
+
+    def close(self):
+        """No aceptar más comandos; los ya encolados se ejecutan"""
+        with self.lock:
+            self.closed = True
+
+    def _step(self):
+        with self.lock:
+            command = self.queue.popleft()
+        try:
+            self.pool.run_command(command)
+        finally:
+            with self.lock:
+                more = bool(self.queue)
+                self.active = more
+            if more:
+                self.pool.executor.submit(self._step)
+
+
+class DriverActorPool:
+    """
+    Colas de comandos por sesión sobre un ThreadPoolExecutor compartido.
+
+    `call` espera el resultado con timeout (cediendo el hub si se llama
+    desde un greenlet); un comando que vence en cola no se ejecuta. Un
+    comando ya en ejecución no se puede interrumpir: lo acota el timeout
+    HTTP de chromedriver.
+
+    Tras `close` la sesión queda marcada como cerrada: sus comandos
+    posteriores fallan con RuntimeError en lugar de crear otra cola sobre
+    un driver que se está desechando. `open` la reabre al asociarle un
+    driver nuevo. Se recuerdan las últimas `tombstones` sesiones cerradas.
+    """
+
+    def __init__(self, workers=DRIVER_ACTOR_WORKERS, timeout=DRIVER_COMMAND_TIMEOUT,
+                 tombstones=DRIVER_ACTOR_TOMBSTONES):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='driver-actor')
+        self.actors = {}
+        self.closed = OrderedDict()  # session_id -> None, en orden de cierre
+        self.tombstones = max(1, tombstones)
+        self.lock = threading.Lock()
+
+        # Métricas
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.wait_times = deque(maxlen=1000)
+        self.run_times = deque(maxlen=1000)
+
+    def actor(self, session_id):
+        """Cola de la sesión (se crea con el primer comando); None si la sesión fue cerrada"""
+        with self.lock:
+            if session_id in self.closed:
+                self.rejected += 1
+                return None
+            actor = self.actors.get(session_id)
+            if actor is None:
+                actor = self.actors[session_id] = DriverActor(session_id, self)
+            return actor
+
+    def open(self, session_id):
+        """Volver a aceptar comandos de una sesión cerrada (driver nuevo asociado)"""
+        with self.lock:
+            self.closed.pop(session_id, None)
+
+    def submit(self, session_id, func, *args, timeout=None):
+        """Encolar func(*args) en la cola de la sesión; retorna un Future"""
+        actor = self.actor(session_id)
+        if actor is None:
+            future = Future()
+            future.set_exception(RuntimeError(f"Cola de la sesión {session_id} cerrada"))
+            return future
+        return actor.submit(func, *args, timeout=timeout)
+
+    def call(self, session_id, func, *args, timeout=None):
+        """Encolar y esperar el resultado; TimeoutError si no termina a tiempo"""
+        timeout = self.timeout if timeout is None else timeout
+        future = self.submit(session_id, func, *args, timeout=timeout)
+        try:
+            return wait_future(future, timeout)
+        except (TimeoutError, FutureTimeoutError):
+            # Si aún no empezó, ya no se ejecuta
+            future.cancel()
+            raise
+
+    def close(self, session_id, func=None, *args):
+        """
+        Cerrar la cola de la sesión; func(*args) (p. ej. desechar el driver)
+        corre después de los comandos pendientes. Retorna su Future o None.
+        """
+        with self.lock:
+            actor = self.actors.pop(session_id, None)
+            if actor is None and func is not None:
+                actor = DriverActor(session_id, self)
+            self.closed[session_id] = None
+            self.closed.move_to_end(session_id)
+            while len(self.closed) > self.tombstones:
+                self.closed.popitem(last=False)
+        if actor is None:
+            return None
+        # Sin timeout: el cierre del driver debe ejecutarse siempre
+        future = actor.submit(func, *args, timeout=float('inf')) if func is not None else None
+        actor.close()
+        return future
+
+    def note_submitted(self, depth):
+        with self.lock:
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, depth)
+
+    def run_command(self, command):
+        """Ejecutar un comando (en un worker) y resolver su Future"""
+        started = time.monotonic()
+        if not command.future.set_running_or_notify_cancel():
+            # El llamador dejó de esperar antes de que empezara
+            with self.lock:
+                self.cancelled += 1
+            return
+        if started > command.deadline:
+            with self.lock:
+                self.timed_out += 1
+            command.future.set_exception(TimeoutError("Comando WebDriver vencido en cola"))
+            return
+
+        try:
+            result = command.func(*command.args)
+        except Exception as e:
+            with self.lock:
+                self.failed += 1
+                self.wait_times.append(started - command.enqueued_at)
+                self.run_times.append(time.monotonic() - started)
+            command.future.set_exception(e)
+            return
+
+        with self.lock:
+            self.completed += 1
+            self.wait_times.append(started - command.enqueued_at)
+            self.run_times.append(time.monotonic() - started)
+        command.future.set_result(result)
+
+    def stats(self):
+        with self.lock:
+            actors = list(self.actors.values())
+            wait_times = list(self.wait_times)
+            run_times = list(self.run_times)
+            stats = {
+                'workers': self.workers,
+                'sessions': len(actors),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'timed_out': self.timed_out,
+                'cancelled': self.cancelled,
+                'rejected': self.rejected,
+                'closed': len(self.closed),
+                'max_depth': self.max_depth
+            }
+        stats.update({
+            'queue_depth': sum(len(actor.queue) for actor in actors),
+            'wait_p50': percentile(wait_times, 50),
+            'wait_p95': percentile(wait_times, 95),
+            'run_p50': percentile(run_times, 50),
+            'run_p95': percentile(run_times, 95)
+        })
+        return stats
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Pool de drivers de Chrome pre-lanzados y pre-navegados a WhatsApp Web
+Permite entregar un navegador listo en cada get_qr sin esperar el arranque en frío
+"""
+
+import os
+import time
+import itertools
+import threading
+import logging
+from collections import deque
+
+from stats_utils import percentile
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+DRIVER_POOL_MIN = int(os.getenv('DRIVER_POOL_MIN', 1))
+DRIVER_POOL_MAX = int(os.getenv('DRIVER_POOL_MAX', 4))
+DRIVER_POOL_IDLE_TIMEOUT = float(os.getenv('DRIVER_POOL_IDLE_TIMEOUT', 300))
+DRIVER_POOL_CHECK_INTERVAL = float(os.getenv('DRIVER_POOL_CHECK_INTERVAL', 5))
+
+
+class ChromeDriverPool:
+    """Pool de drivers calientes con tamaño mínimo/máximo y desalojo por inactividad"""
+
+    def __init__(self, factory, min_size=DRIVER_POOL_MIN, max_size=DRIVER_POOL_MAX,
+                 idle_timeout=DRIVER_POOL_IDLE_TIMEOUT, check_interval=DRIVER_POOL_CHECK_INTERVAL,
+                 disposer=None, admission=None):
+        self.factory = factory
+        self.disposer = disposer  # Callback para cerrar drivers descartados
+        self.admission = admission  # AdmissionController compartido con los lanzamientos de sesiones
+        self.launch_ids = itertools.count(1)
+        self.min_size = max(0, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+
+        self.idle = deque()  # (driver, ready_at)
+        self.launching = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread = None
+
+        # Métricas
+        self.recent_leases = deque()
+        self.launch_times = deque(maxlen=200)
+        self.hits = 0
+        self.misses = 0
+        self.launch_failures = 0
+        self.admission_rejected = 0
+        self.evicted = 0
+
+    def start(self):
+        """Iniciar el hilo que mantiene el pool lleno"""
+        if self.running or self.max_size == 0:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._maintain)
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info(f"🔥 Pool de drivers iniciado (min={self.min_size}, max={self.max_size})")
+
+    def stop(self):
+        """Detener el pool y cerrar los drivers ociosos"""
+        self.running = False
+        self.wakeup.set()
+        with self.lock:
+            drivers = [driver for driver, _ in self.idle]
+            self.idle.clear()
+        for driver in drivers:
+            self._quit(driver)
+
+    def lease(self):
+        """Tomar un driver listo del pool; retorna None si no hay ninguno"""
+        with self.lock:
+            self.recent_leases.append(time.monotonic())
+
+        while True:
+            with self.lock:
+                if not self.idle:
+                    self.misses += 1
+                    self.wakeup.set()
+                    return None
+                driver, _ = self.idle.popleft()
+
+            if self._is_alive(driver):
+                with self.lock:
+                    self.hits += 1
+                self.wakeup.set()
+                return driver
+
+            # Driver muerto: descartarlo y probar con el siguiente
+            self._quit(driver)
+
+    def _target_size(self, now):
+        """Tamaño deseado: mínimo + demanda reciente, limitado por el máximo"""
+        while self.recent_leases and now - self.recent_leases[0] > self.idle_timeout:
+            self.recent_leases.popleft()
+        return min(self.max_size, self.min_size + len(self.recent_leases))
+
+    def _maintain(self):
+        """Rellenar el pool y desalojar drivers ociosos por demasiado tiempo"""
+        while self.running:
+            try:
+                now = time.monotonic()
+                expired = []
+                with self.lock:
+                    target = self._target_size(now)
+                    while self.idle and now - self.idle[0][1] > self.idle_timeout:
+                        expired.append(self.idle.popleft()[0])
+                        self.evicted += 1
+                    missing = target - len(self.idle) - self.launching
+                    if missing > 0:
+                        self.launching += missing
+
+                for driver in expired:
+                    self._quit(driver)
+
+                for _ in range(max(0, missing)):
+                    self._schedule_launch()
+
+            except Exception as e:
+                logger.error(f"Error manteniendo pool de drivers: {e}")
+
+            self.wakeup.wait(self.check_interval)
+            self.wakeup.clear()
+
+    def _schedule_launch(self):
+        """Lanzar un driver en su propio hilo, o encolarlo en el control de admisión"""
+        if self.admission is None:
+            thread = threading.Thread(target=self._launch)
+            thread.daemon = True
+            thread.start()
+            return
+
+        # Los rellenos compiten por memoria y CPU con las sesiones: misma cola
+        position = self.admission.submit(f"driver-pool-{next(self.launch_ids)}", 'driver-pool', self._launch)
+        if position is None:
+            # Cola llena: se reintenta en la próxima revisión del pool
+            with self.lock:
+                self.launching -= 1
+                self.admission_rejected += 1
+
+    def _launch(self):
+        """Lanzar un driver nuevo y dejarlo en el pool"""
+        started = time.monotonic()
+        driver = None
+        try:
+            driver = self.factory()
+        except Exception as e:
+            logger.error(f"Error lanzando driver para el pool: {e}")
+
+        elapsed = time.monotonic() - started
+        with self.lock:
+            self.launching -= 1
+            if driver is None:
+                self.launch_failures += 1
+            elif self.running:
+                self.launch_times.append(elapsed)
+                self.idle.append((driver, time.monotonic()))
+                logger.info(f"🔥 Driver caliente listo en {elapsed:.1f}s (ociosos: {len(self.idle)})")
+                return
+
+        if driver is not None:
+            self._quit(driver)
+
+    def _is_alive(self, driver):
+        """Verificar que el driver sigue respondiendo"""
+        try:
+            return 'web.whatsapp.com' in (driver.current_url or '')
+        except Exception:
+            return False
+
+    def _quit(self, driver):
+        """Cerrar un driver descartado"""
+        try:
+            if self.disposer is not None:
+                self.disposer(driver)
+            else:
+                driver.quit()
+        except Exception as e:
+            logger.error(f"Error cerrando driver del pool: {e}")
+
+    def stats(self):
+        """Métricas del pool"""
+        with self.lock:
+            launch_times = list(self.launch_times)
+            leases = self.hits + self.misses
+            return {
+                'idle': len(self.idle),
+                'launching': self.launching,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / leases, 3) if leases else None,
+                'evicted': self.evicted,
+                'launch_failures': self.launch_failures,
+                'admission_rejected': self.admission_rejected,
+                'launch_time_p50': percentile(launch_times, 50),
+                'launch_time_p95': percentile(launch_times, 95)
+            }
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Cierre asíncrono de drivers de Chrome
+Cola de desmontaje con pool de workers: quit(), procesos hijos huérfanos
+y directorio de perfil temporal, fuera del camino de cada request
+"""
+
+import os
+import time
+import queue
+import shutil
+import signal
+import logging
+import threading
+from collections import deque
+
+from stats_utils import percentile
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+DRIVER_REAPER_WORKERS = int(os.getenv('DRIVER_REAPER_WORKERS', 2))
+DRIVER_QUIT_TIMEOUT = float(os.getenv('DRIVER_QUIT_TIMEOUT', 15))
+
+
+def find_processes_with_arg(argument):
+    """PIDs cuyo cmdline contiene el argumento dado (Linux, vía /proc)"""
+    pids = []
+    if not argument or not os.path.isdir('/proc'):
+        return pids
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/cmdline', 'rb') as f:
+                args = f.read().split(b'\0')
+        except OSError:
+            continue
+        if argument.encode() in args:
+            pids.append(int(entry))
+    return pids
+
+
+class DriverReaper:
+    """Cola de desmontaje de drivers atendida por un pool de workers"""
+
+    def __init__(self, workers=DRIVER_REAPER_WORKERS, quit_timeout=DRIVER_QUIT_TIMEOUT):
+        self.workers = max(1, workers)
+        self.quit_timeout = quit_timeout
+        self.queue = queue.Queue()
+        self.threads = []
+        self.lock = threading.Lock()
+
+        # Métricas
+        self.latencies = deque(maxlen=500)  # desde submit hasta terminar
+        self.quit_times = deque(maxlen=500)
+        self.completed = 0
+        self.quit_failures = 0
+        self.killed_processes = 0
+        self.removed_dirs = 0
+
+    def start(self):
+        """Iniciar los workers (idempotente)"""
+        with self.lock:
+            if self.threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"driver-reaper-{i}")
+                thread.daemon = True
+                thread.start()
+                self.threads.append(thread)
+
+    def submit(self, driver, user_data_dir=None, session_id=None, keep_profile=False, on_done=None):
+        """
+        Encolar el cierre de un driver; retorna de inmediato.
+
+        keep_profile conserva el directorio de perfil (perfiles persistentes);
+        on_done se llama cuando Chrome ya terminó.
+        """
+        if not self.threads:
+            self.start()
+        self.queue.put((driver, user_data_dir, session_id, keep_profile, on_done, time.monotonic()))
+
+    def _work(self):
+        while True:
+            driver, user_data_dir, session_id, keep_profile, on_done, submitted_at = self.queue.get()
+            try:
+                self._teardown(driver, user_data_dir, session_id, keep_profile)
+            except Exception as e:
+                logger.error(f"Error desmontando driver de sesión {session_id}: {e}")
+            finally:
+                if on_done is not None:
+                    try:
+                        on_done()
+                    except Exception as e:
+                        logger.error(f"Error en callback de desmontaje de sesión {session_id}: {e}")
+                with self.lock:
+                    self.completed += 1
+                    self.latencies.append(time.monotonic() - submitted_at)
+                self.queue.task_done()
+
+    def _teardown(self, driver, user_data_dir, session_id, keep_profile=False):
+        """quit() con timeout, matar procesos sobrantes y borrar el perfil"""
+        service_process = getattr(getattr(driver, 'service', None), 'process', None)
+
+        # quit() en un hilo auxiliar para no bloquear el worker indefinidamente
+        started = time.monotonic()
+        quit_thread = threading.Thread(target=self._quit, args=(driver, session_id))
+        quit_thread.daemon = True
+        quit_thread.start()
+        quit_thread.join(self.quit_timeout)
+        with self.lock:
+            self.quit_times.append(time.monotonic() - started)
+            if quit_thread.is_alive():
+                self.quit_failures += 1
+                logger.warning(f"⏰ quit() excedió {self.quit_timeout}s para sesión {session_id}")
+
+        # chromedriver que no terminó (poll() evita matar un PID reutilizado)
+        if service_process is not None and service_process.poll() is None:
+            service_process.kill()
+            with self.lock:
+                self.killed_processes += 1
+
+        # Procesos de Chrome que quedaron vivos con ese perfil
+        if user_data_dir:
+            for pid in find_processes_with_arg(f"--user-data-dir={user_data_dir}"):
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                    with self.lock:
+                        self.killed_processes += 1
+                except (ProcessLookupError, PermissionError):
+                    pass
+
+        if user_data_dir and not keep_profile and os.path.isdir(user_data_dir):
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+            with self.lock:
+                self.removed_dirs += 1
+
+        logger.info(f"🧹 Driver desmontado para sesión {session_id} en {time.monotonic() - started:.1f}s")
+
+    def _quit(self, driver, session_id):
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.error(f"Error cerrando driver de sesión {session_id}: {e}")
+
+    def stats(self):
+        """Métricas de desmontaje"""
+        with self.lock:
+            latencies = list(self.latencies)
+            quit_times = list(self.quit_times)
+            return {
+                'queue_depth': self.queue.qsize(),
+                'workers': self.workers,
+                'completed': self.completed,
+                'quit_timeouts': self.quit_failures,
+                'killed_processes': self.killed_processes,
+                'removed_profile_dirs': self.removed_dirs,
+                'teardown_latency_p50': percentile(latencies, 50),
+                'teardown_latency_p95': percentile(latencies, 95),
+                'quit_time_p50': percentile(quit_times, 50)
+            }
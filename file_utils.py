@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+Utilidades de archivos compartidas por los módulos que persisten estado en disco
+"""
+
+import os
+
+
+def atomic_write(path, data):
+    """Escritura atómica: un reinicio a mitad nunca deja un archivo truncado"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Perfiles de lanzamiento de Chrome
+Todas las flags y preferencias en un solo lugar, agrupadas por nombre:
+default (las flags de siempre, por defecto), debug (con logging de Chrome),
+y los que acotan memoria a pedido: balanced y minimal (menor huella)
+"""
+
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+CHROME_LAUNCH_PROFILE = os.getenv('CHROME_LAUNCH_PROFILE', 'default')
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Flags comunes a todos los perfiles (contenedor sin sandbox ni GPU, sin marcas de automatización)
+BASE_ARGS = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-gpu",
+    "--disable-web-security",
+    "--allow-running-insecure-content",
+    "--disable-blink-features=AutomationControlled"
+]
+
+BASE_PREFS = {
+    "profile.default_content_setting_values.notifications": 2,
+    "profile.default_content_settings.popups": 0
+}
+
+# Sin imágenes: el QR es un canvas, no una imagen
+BLOCK_IMAGES_PREFS = {
+    "profile.managed_default_content_settings.images": 2
+}
+
+# Tráfico y servicios de fondo que WhatsApp Web no necesita
+BACKGROUND_ARGS = [
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-domain-reliability",
+    "--metrics-recording-only",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--mute-audio",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication"
+]
+
+LAUNCH_PROFILES = {
+    # Flags comunes sin límites de memoria (la configuración previa a los perfiles)
+    'default': {
+        'args': [],
+        'prefs': {}
+    },
+    # Configuración completa, con logging de Chrome para diagnosticar
+    'debug': {
+        'args': ["--enable-logging", "--v=1"],
+        'prefs': {}
+    },
+    # Opt-in: sin servicios de fondo y con límites moderados de renderers y heap
+    'balanced': {
+        'args': BACKGROUND_ARGS + [
+            "--renderer-process-limit=2",
+            "--js-flags=--max-old-space-size=384"
+        ],
+        'prefs': {}
+    },
+    # Opt-in: un solo renderer, heap acotado, sin imágenes ni fuentes remotas
+    'minimal': {
+        'args': BACKGROUND_ARGS + [
+            "--renderer-process-limit=1",
+            "--disable-site-isolation-trials",
+            "--js-flags=--max-old-space-size=192",
+            "--blink-settings=imagesEnabled=false",
+            "--disable-remote-fonts",
+            "--disk-cache-size=33554432"
+        ],
+        'prefs': BLOCK_IMAGES_PREFS
+    }
+}
+
+
+def resolve_launch_profile(name=None):
+    """Nombre de perfil válido (CHROME_LAUNCH_PROFILE si no se indica)"""
+    name = name or CHROME_LAUNCH_PROFILE
+    if name not in LAUNCH_PROFILES:
+        logger.warning(f"⚠️ Perfil de lanzamiento desconocido '{name}', usando 'default'")
+        return 'default'
+    return name
+
+
+def apply_launch_profile(options, name=None, user_agent=USER_AGENT, extra_prefs=None):
+    """
+    Agregar a unas ChromeOptions las flags y preferencias del perfil (más
+    `extra_prefs`, si se indican); retorna su nombre
+    """
+    name = resolve_launch_profile(name)
+    profile = LAUNCH_PROFILES[name]
+
+    for argument in BASE_ARGS + profile['args'] + [f"--user-agent={user_agent}"]:
+        options.add_argument(argument)
+    options.add_experimental_option("prefs", {**BASE_PREFS, **profile['prefs'], **(extra_prefs or {})})
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    return name
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Trabajo de CPU fuera del hub de gevent
+Las funciones pesadas (renderizado de QR) corren en un pool acotado de
+procesos o hilos nativos; el greenlet que espera cede el hub hasta que
+el resultado llega, así los demás sockets del worker siguen atendidos
+"""
+
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from stats_utils import percentile
+
+try:
+    import gevent
+    import gevent.event
+    GEVENT_AVAILABLE = True
+except ImportError:
+    GEVENT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+OFFLOAD_MODE = os.getenv('OFFLOAD_MODE', 'thread').lower()  # thread | process | inline
+OFFLOAD_WORKERS = int(os.getenv('OFFLOAD_WORKERS', 2))
+OFFLOAD_TIMEOUT = float(os.getenv('OFFLOAD_TIMEOUT', 10))
+
+OFFLOAD_MODES = ('thread', 'process', 'inline')
+
+
+def _noop():
+    return None
+
+
+def wait_future(future, timeout=None):
+    """
+    Esperar un concurrent.futures.Future sin bloquear el hub de gevent.
+
+    En el hilo principal (donde corre el hub) el greenlet se suspende con
+    un watcher async que el pool dispara al terminar; en un hilo nativo
+    se espera de forma normal.
+    """
+    if not GEVENT_AVAILABLE or threading.current_thread() is not threading.main_thread():
+        return future.result(timeout)
+
+    hub = gevent.get_hub()
+    watcher = hub.loop.async_()
+    done = gevent.event.Event()
+    # El watcher debe estar activo antes del send(): libev descarta los send a un watcher detenido
+    watcher.start(done.set)
+    # send() es seguro desde otros hilos; si ya terminó, se llama aquí mismo
+    future.add_done_callback(lambda _: watcher.send())
+    try:
+        if not done.wait(timeout):
+            future.cancel()
+            raise TimeoutError(f"Trabajo sin terminar tras {timeout}s")
+    finally:
+        watcher.close()
+    return future.result(0)
+
+
+class CPUOffloader:
+    """
+    Pool acotado para funciones de CPU.
+
+    En modo 'thread' no hay procesos extra y el hub espera a lo sumo un
+    intervalo de cambio del GIL (5 ms). En modo 'process' el hub no
+    compite por el GIL, pero las funciones y argumentos deben poder
+    serializarse y los procesos se crean con 'spawn' (fork de un proceso
+    con hilos y hub de gevent no es seguro), que reimporta el script
+    principal en cada worker: solo sirve si es seguro de importar, como
+    start_railway.py.
+    """
+
+    def __init__(self, mode=OFFLOAD_MODE, workers=OFFLOAD_WORKERS, timeout=OFFLOAD_TIMEOUT):
+        if mode not in OFFLOAD_MODES:
+            logger.warning(f"⚠️ OFFLOAD_MODE desconocido '{mode}', usando 'thread'")
+            mode = 'thread'
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.executor = None
+        self.lock = threading.Lock()
+
+        # Métricas
+        self.submitted = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.run_times = deque(maxlen=500)
+
+    def _get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                if self.mode == 'process':
+                    self.executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+                else:
+                    self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='cpu-offload')
+                logger.info(f"🧮 Pool de CPU iniciado ({self.mode}, {self.workers} workers)")
+            return self.executor
+
+    def start(self):
+        """Crear el pool y arrancar sus workers antes de la primera petición"""
+        if self.mode == 'inline':
+            return
+        executor = self._get_executor()
+        for future in [executor.submit(_noop) for _ in range(self.workers)]:
+            try:
+                future.result(self.timeout)
+            except Exception as e:
+                logger.error(f"Error iniciando pool de CPU: {e}")
+
+    def run(self, func, *args):
+        """Ejecutar func(*args) en el pool y retornar su resultado (cediendo el hub mientras)"""
+        if self.mode == 'inline':
+            return func(*args)
+
+        started = time.monotonic()
+        with self.lock:
+            self.submitted += 1
+            self.in_flight += 1
+        executor = self._get_executor()
+        try:
+            return wait_future(executor.submit(func, *args), self.timeout)
+        except BrokenExecutor:
+            # Un worker murió: la próxima llamada crea un pool nuevo
+            with self.lock:
+                self.failed += 1
+                if self.executor is executor:
+                    self.executor = None
+            raise
+        except Exception:
+            with self.lock:
+                self.failed += 1
+            raise
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+                self.run_times.append(time.monotonic() - started)
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self.lock:
+            run_times = list(self.run_times)
+            return {
+                'mode': self.mode,
+                'workers': self.workers,
+                'submitted': self.submitted,
+                'failed': self.failed,
+                'in_flight': self.in_flight,
+                'run_p50': percentile(run_times, 50),
+                'run_p95': percentile(run_times, 95)
+            }
+
+
+# Pool compartido por todo el proceso
+offloader = CPUOffloader()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Asignación de puertos de depuración remota para Chrome
+Cada instancia recibe su propio --remote-debugging-port; los puertos
+liberados se reutilizan y los que quedan asignados a un Chrome muerto
+se recuperan como fugas
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+DEBUG_PORT_START = int(os.getenv('DEBUG_PORT_START', 9222))
+DEBUG_PORT_END = int(os.getenv('DEBUG_PORT_END', 9721))  # inclusivo
+DEBUG_PORT_LEAK_GRACE = float(os.getenv('DEBUG_PORT_LEAK_GRACE', 60))
+DEBUG_PORT_CHECK_INTERVAL = float(os.getenv('DEBUG_PORT_CHECK_INTERVAL', 30))
+
+
+def port_is_free(port, host='127.0.0.1'):
+    """True si nadie escucha en el puerto (se puede hacer bind)"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        # Igual que un servidor: TIME_WAIT de conexiones viejas no cuenta como ocupado
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, port))
+            return True
+        except OSError:
+            return False
+
+
+def port_is_listening(port, host='127.0.0.1'):
+    """True si hay un proceso aceptando conexiones en el puerto"""
+    try:
+        with socket.create_connection((host, port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+class _Lease:
+    __slots__ = ('owner', 'allocated_at')
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.allocated_at = time.monotonic()
+
+
+class PortAllocator:
+    """
+    Rango fijo de puertos con lista de libres.
+
+    `allocate` prefiere puertos recién liberados y salta los que otro
+    proceso mantiene ocupados. `check_leaks` libera los puertos asignados
+    hace más de `leak_grace` segundos en los que ya nadie escucha.
+    """
+
+    def __init__(self, start=DEBUG_PORT_START, end=DEBUG_PORT_END,
+                 leak_grace=DEBUG_PORT_LEAK_GRACE, check_interval=DEBUG_PORT_CHECK_INTERVAL):
+        self.start_port = start
+        self.end_port = end
+        self.leak_grace = leak_grace
+        self.check_interval = check_interval
+        self.free = deque(range(start, end + 1))
+        self.allocated = {}  # puerto -> _Lease
+        self.used = set()  # puertos asignados alguna vez
+        self.lock = threading.Lock()
+        self.running = False
+
+        # Métricas
+        self.allocations = 0
+        self.reuses = 0
+        self.busy_skips = 0
+        self.leaks = 0
+        self.exhausted = 0
+
+    def allocate(self, owner=None):
+        """Reservar un puerto libre; None si el rango está agotado"""
+        with self.lock:
+            for _ in range(len(self.free)):
+                port = self.free.popleft()
+                if not port_is_free(port):
+                    # Ocupado por otro proceso: volver a intentarlo más tarde
+                    self.free.append(port)
+                    self.busy_skips += 1
+                    continue
+                self.allocated[port] = _Lease(owner)
+                self.allocations += 1
+                if port in self.used:
+                    self.reuses += 1
+                self.used.add(port)
+                return port
+
+            self.exhausted += 1
+            logger.error(f"❌ Sin puertos de depuración libres ({self.start_port}-{self.end_port})")
+            return None
+
+    def release(self, port, owner=None):
+        """Devolver un puerto; se ignora si ya fue reasignado a otro dueño"""
+        with self.lock:
+            lease = self.allocated.get(port)
+            if lease is None or (owner is not None and lease.owner != owner):
+                return False
+            del self.allocated[port]
+            self.free.appendleft(port)  # Reutilizar primero los recién liberados
+            return True
+
+    def check_leaks(self):
+        """Recuperar puertos asignados cuyo Chrome ya no escucha"""
+        now = time.monotonic()
+        with self.lock:
+            candidates = [(port, lease) for port, lease in self.allocated.items()
+                          if now - lease.allocated_at > self.leak_grace]
+
+        leaked = [(port, lease) for port, lease in candidates if not port_is_listening(port)]
+        recovered = []
+        with self.lock:
+            for port, lease in leaked:
+                if self.allocated.get(port) is not lease:
+                    continue  # Liberado o reasignado mientras se revisaba
+                del self.allocated[port]
+                self.free.append(port)
+                recovered.append(port)
+                self.leaks += 1
+                logger.warning(f"🔌 Puerto de depuración {port} recuperado (Chrome de {lease.owner} ya no escucha)")
+        return recovered
+
+    def start(self):
+        """Revisar fugas periódicamente en un hilo propio"""
+        if self.running:
+            return
+        self.running = True
+        thread = threading.Thread(target=self._run, name="debug-port-leaks")
+        thread.daemon = True
+        thread.start()
+
+    def _run(self):
+        while self.running:
+            time.sleep(self.check_interval)
+            try:
+                self.check_leaks()
+            except Exception as e:
+                logger.error(f"Error revisando fugas de puertos: {e}")
+
+    def stats(self):
+        with self.lock:
+            return {
+                'range': f"{self.start_port}-{self.end_port}",
+                'allocated': len(self.allocated),
+                'free': len(self.free),
+                'allocations': self.allocations,
+                'reuses': self.reuses,
+                'busy_skips': self.busy_skips,
+                'leaks_recovered': self.leaks,
+                'exhausted': self.exhausted
+            }
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Perfiles de Chrome persistentes por tenant
+Cada tenant (nombre_nora / cliente) reutiliza el mismo --user-data-dir,
+conservando la caché de WhatsApp Web y la vinculación del teléfono.
+El espacio en disco se limita con expulsión LRU.
+"""
+
+import os
+import re
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+PROFILE_ROOT = os.getenv('PROFILE_ROOT', '/tmp/whatsapp_profiles')
+PROFILE_DISK_BUDGET_MB = float(os.getenv('PROFILE_DISK_BUDGET_MB', 2048))
+
+# Archivo cuyo mtime registra el último uso del perfil (sobrevive reinicios)
+LAST_USED_MARKER = '.last_used'
+
+# Prefijo de los perfiles expulsados que esperan su borrado
+EVICTED_PREFIX = '.evicted-'
+
+
+def directory_size(path):
+    """Bytes ocupados por un directorio (sin seguir enlaces)"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def profile_name(tenant):
+    """Nombre de directorio estable y seguro para un tenant"""
+    safe = re.sub(r'[^A-Za-z0-9_.-]', '_', str(tenant))[:48]
+    digest = hashlib.sha1(str(tenant).encode()).hexdigest()[:8]
+    return f"{safe}-{digest}"
+
+
+class _Profile:
+    """Estado de un perfil en disco"""
+
+    __slots__ = ('path', 'size', 'last_used', 'in_use')
+
+    def __init__(self, path, size=0, last_used=0.0):
+        self.path = path
+        self.size = size
+        self.last_used = last_used
+        self.in_use = False
+
+
+class ProfileManager:
+    """
+    Asigna a cada tenant un directorio de perfil estable.
+
+    Un perfil solo puede tenerlo abierto un Chrome a la vez: `acquire`
+    retorna None si ya está en uso. Al liberarlo se mide su tamaño y se
+    expulsan los perfiles menos usados (y libres) hasta cumplir el presupuesto.
+    """
+
+    def __init__(self, root=PROFILE_ROOT, budget_mb=PROFILE_DISK_BUDGET_MB):
+        self.root = root
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.profiles = {}  # nombre de directorio -> _Profile
+        self.lock = threading.Lock()
+        self.loaded = False
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.busy = 0
+        self.evictions = 0
+
+    def _load(self):
+        """Inventario inicial de perfiles existentes (perezoso, bajo lock)"""
+        if self.loaded:
+            return
+        self.loaded = True
+        os.makedirs(self.root, exist_ok=True)
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not os.path.isdir(path):
+                continue
+            if name.startswith(EVICTED_PREFIX):
+                # Expulsión que no terminó de borrarse antes de un reinicio
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            marker = os.path.join(path, LAST_USED_MARKER)
+            last_used = os.path.getmtime(marker if os.path.exists(marker) else path)
+            self.profiles[name] = _Profile(path, directory_size(path), last_used)
+        if self.profiles:
+            logger.info(f"🗂️ {len(self.profiles)} perfiles de Chrome encontrados en {self.root}")
+
+    def _touch(self, profile):
+        profile.last_used = time.time()
+        try:
+            with open(os.path.join(profile.path, LAST_USED_MARKER), 'a'):
+                pass
+            os.utime(os.path.join(profile.path, LAST_USED_MARKER), (profile.last_used, profile.last_used))
+        except OSError:
+            pass
+
+    def acquire(self, tenant):
+        """
+        Reservar el perfil de un tenant.
+
+        Retorna (path, hit) o None si el perfil ya está abierto por otro driver.
+        hit indica que el perfil ya existía (caché y vinculación reutilizables).
+        """
+        name = profile_name(tenant)
+        with self.lock:
+            self._load()
+            profile = self.profiles.get(name)
+            if profile is not None and profile.in_use:
+                self.busy += 1
+                return None
+
+            hit = profile is not None
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+                profile = _Profile(os.path.join(self.root, name))
+                os.makedirs(profile.path, exist_ok=True)
+                self.profiles[name] = profile
+
+            profile.in_use = True
+            self._touch(profile)
+            return profile.path, hit
+
+    def release(self, tenant):
+        """Liberar el perfil (Chrome ya cerrado), medirlo y aplicar el presupuesto"""
+        name = profile_name(tenant)
+        with self.lock:
+            profile = self.profiles.get(name)
+            if profile is None:
+                return
+            path = profile.path
+
+        # Medir fuera del lock: puede recorrer miles de archivos
+        size = directory_size(path) if os.path.isdir(path) else 0
+
+        with self.lock:
+            profile = self.profiles.get(name)
+            if profile is None:
+                return
+            profile.size = size
+            profile.in_use = False
+            self._touch(profile)
+            evicted = self._enforce_budget()
+
+        # Borrar fuera del lock: los directorios ya no tienen el nombre de ningún perfil
+        for path in evicted:
+            shutil.rmtree(path, ignore_errors=True)
+            logger.info(f"🗑️ Perfil expulsado por presupuesto de disco: {path}")
+
+    def _enforce_budget(self):
+        """
+        Quitar del inventario los perfiles LRU libres que exceden el
+        presupuesto. Cada uno se renombra bajo el lock: un acquire posterior
+        del mismo tenant crea un directorio nuevo en lugar de recibir uno
+        que se está borrando. Retorna las rutas renombradas a borrar.
+        """
+        evicted = []
+        usage = sum(profile.size for profile in self.profiles.values())
+        if usage <= self.budget:
+            return evicted
+        for name, profile in sorted(self.profiles.items(), key=lambda item: item[1].last_used):
+            if usage <= self.budget:
+                break
+            if profile.in_use:
+                continue
+            tombstone = os.path.join(self.root, f"{EVICTED_PREFIX}{name}-{uuid.uuid4().hex[:8]}")
+            try:
+                os.rename(profile.path, tombstone)
+            except FileNotFoundError:
+                tombstone = None
+            except OSError as e:
+                logger.error(f"Error apartando perfil expulsado {profile.path}: {e}")
+                continue
+            usage -= profile.size
+            del self.profiles[name]
+            if tombstone:
+                evicted.append(tombstone)
+            self.evictions += 1
+        return evicted
+
+    def stats(self):
+        """Métricas de reutilización y uso de disco"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'root': self.root,
+                'profiles': len(self.profiles),
+                'in_use': sum(1 for profile in self.profiles.values() if profile.in_use),
+                'disk_usage_mb': round(sum(p.size for p in self.profiles.values()) / 1048576, 1),
+                'budget_mb': round(self.budget / 1048576, 1),
+                'hits': self.hits,
+                'misses': self.misses,
+                'busy': self.busy,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Renderizado de códigos QR
+Un solo pipeline (qrcode -> matriz de módulos -> PNG/SVG) con caché LRU
+por (datos, versión, corrección de errores, tamaño de módulo, borde, formato)
+"""
+
+import io
+import os
+import base64
+import logging
+import threading
+from collections import OrderedDict
+
+import qrcode
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+QR_CACHE_SIZE = int(os.getenv('QR_CACHE_SIZE', 256))
+
+ERROR_CORRECTION = {
+    'L': qrcode.constants.ERROR_CORRECT_L,
+    'M': qrcode.constants.ERROR_CORRECT_M,
+    'Q': qrcode.constants.ERROR_CORRECT_Q,
+    'H': qrcode.constants.ERROR_CORRECT_H
+}
+
+FORMATS = ('png', 'svg', 'matrix')
+
+
+def qr_matrix(data, version=1, error_correction='L', border=4):
+    """Matriz de módulos (tupla de filas de bool, True = oscuro) incluyendo el borde"""
+    qr = qrcode.QRCode(
+        version=version,
+        error_correction=ERROR_CORRECTION[error_correction],
+        border=border
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return tuple(tuple(row) for row in qr.get_matrix())
+
+
+def matrix_to_png(matrix, box_size=10):
+    """PNG de 1 bit: un píxel por módulo escalado sin interpolación"""
+    size = len(matrix)
+    image = Image.new('1', (size, size), 1)
+    image.putdata([0 if dark else 1 for row in matrix for dark in row])
+    if box_size != 1:
+        image = image.resize((size * box_size, size * box_size), Image.NEAREST)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def matrix_to_svg(matrix, box_size=10):
+    """SVG con un solo path; los módulos oscuros contiguos de cada fila van en un rectángulo"""
+    size = len(matrix)
+    parts = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            parts.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+    pixels = size * box_size
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path d="{"".join(parts)}" fill="#000"/></svg>'
+    )
+
+
+def render_uncached(data, fmt, version, error_correction, box_size, border):
+    """Renderizado completo sin caché (función de módulo: se puede ejecutar en otro proceso)"""
+    matrix = qr_matrix(data, version, error_correction, border)
+    if fmt == 'matrix':
+        return matrix
+    convert = matrix_to_png if fmt == 'png' else matrix_to_svg
+    return convert(matrix, box_size)
+
+
+class QRRenderer:
+    """
+    Renderizador con caché LRU compartida entre formatos.
+
+    La matriz de módulos también se cachea: pedir PNG y SVG de los mismos
+    datos solo calcula el código una vez. Con `run` (p. ej. offloader.run)
+    los fallos de caché se renderizan fuera del hilo que llama.
+    """
+
+    def __init__(self, cache_size=QR_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _cached(self, key, build, count=True):
+        """Valor de la caché o construido con build(); count=False no afecta las métricas"""
+        with self.lock:
+            value = self.cache.get(key)
+            if value is not None:
+                self.cache.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            if count:
+                self.misses += 1
+
+        # Se renderiza fuera del lock; dos hilos con la misma clave pueden renderizar a la vez
+        value = build()
+        if self.cache_size <= 0:
+            return value
+        with self.lock:
+            self.cache[key] = value
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def render(self, data, fmt='png', version=1, error_correction='L', box_size=10, border=4, run=None):
+        """
+        Renderizar un QR.
+
+        Retorna bytes PNG ('png'), texto SVG ('svg') o la matriz de
+        módulos ('matrix', tupla de tuplas de bool). `run(func, *args)`
+        ejecuta el renderizado cuando no está en caché.
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato de QR no soportado: {fmt}")
+
+        matrix_key = ('matrix', data, version, error_correction, border)
+        key = matrix_key if fmt == 'matrix' else (fmt, data, version, error_correction, box_size, border)
+
+        if run is not None:
+            return self._cached(
+                key,
+                lambda: run(render_uncached, data, fmt, version, error_correction, box_size, border)
+            )
+
+        def build_matrix():
+            return qr_matrix(data, version, error_correction, border)
+
+        if fmt == 'matrix':
+            return self._cached(matrix_key, build_matrix)
+
+        # Un acierto del formato final no toca la matriz; un fallo puede reutilizarla
+        convert = matrix_to_png if fmt == 'png' else matrix_to_svg
+        return self._cached(
+            key,
+            lambda: convert(self._cached(matrix_key, build_matrix, count=False), box_size)
+        )
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.cache),
+                'capacity': self.cache_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None
+            }
+
+
+# Renderizador compartido por todo el proceso
+renderer = QRRenderer()
+
+
+def render_qr(data, fmt='png', **options):
+    """Renderizar con el renderizador compartido (ver QRRenderer.render)"""
+    return renderer.render(data, fmt, **options)
+
+
+def render_qr_base64(data, **options):
+    """PNG del QR en base64 (lo que esperan los clientes en `qr_code`)"""
+    return base64.b64encode(renderer.render(data, 'png', **options)).decode()
+
+
+def render_qr_data_url(data, **options):
+    """PNG del QR como data URL, listo para un <img src>"""
+    return f"data:image/png;base64,{render_qr_base64(data, **options)}"
@@ -5,29 +5,49 @@ Este servidor maneja las conexiones reales a WhatsApp Web
 """
 
 import os
-import sys
-import json
 import uuid
 import time
 import threading
-import qrcode
-import io
-import base64
 from datetime import datetime
 import logging
+from collections import deque
 from flask import Flask, request, render_template
-from flask_socketio import SocketIO, emit, disconnect, join_room, leave_room
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
 
 # Selenium imports
 from selenium import webdriver
-from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.service import Service
 
+from admission import AdmissionController
+from auth_detection import (
+    AUTH_POLL_INTERVAL, AUTH_TIMEOUT, LINKED_PAGE_STATES,
+    PAGE_CONFLICT, PAGE_LOGGED_OUT, PAGE_PHONE_OFFLINE, PAGE_QR,
+    classify_page, detect_authentication, selector_registry, wait_for_qr_or_auth
+)
+from browser_env import discover_browser_env
+from browser_multiplexer import MultiplexedDriverPool, CONTEXT_MEMORY_SAMPLE_INTERVAL
+from devtools_watcher import watch_page
+from driver_actor import DriverActorPool
+from driver_pool import ChromeDriverPool
+from driver_reaper import DriverReaper
+from launch_profiles import apply_launch_profile, resolve_launch_profile
+from port_allocator import PortAllocator
+from offload import offloader
+from qr_render import render_qr, renderer as qr_renderer
+from profile_manager import ProfileManager
+from scheduler import SessionScheduler
+from session_record import Session, SessionStatus, wall_to_monotonic
+from session_snapshot import SessionSnapshotter
+from session_store import create_session_store, serialize_session
+from session_table import ShardedSessionTable
+from stats_utils import percentile
+from tenant_auth import verify_tenant_token
+from timer_wheel import TimerWheel
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -39,77 +59,246 @@ logger = logging.getLogger(__name__)
 WS_PORT = int(os.getenv('WS_PORT', 5001))
 WS_HOST = os.getenv('WS_HOST', '0.0.0.0')
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+WHATSAPP_WEB_URL = "https://web.whatsapp.com"
+SESSION_TTL = float(os.getenv('SESSION_TTL', 7200))  # Inactividad máxima (2 horas)
+EXPIRY_TICK = float(os.getenv('EXPIRY_TICK', 1.0))
+RESTORE_AUTH_TIMEOUT = float(os.getenv('RESTORE_AUTH_TIMEOUT', 45))  # Espera de la interfaz al reanudar un perfil
+RESTORE_CLAIM_TIMEOUT = float(os.getenv('RESTORE_CLAIM_TIMEOUT', 300))  # Plazo para que un cliente reclame una sesión restaurada
+HEARTBEAT_INTERVAL = float(os.getenv('HEARTBEAT_INTERVAL', 30))
+PAGE_LOAD_TIMEOUT = float(os.getenv('PAGE_LOAD_TIMEOUT', 300))  # Timeout de carga de página de chromedriver
 
 class RealWhatsAppWebManager:
     """Gestor REAL de WhatsApp Web usando Selenium"""
     
     def __init__(self):
-        self.sessions = {}
+        # Tabla particionada: locks por shard, índice por cliente y contadores por estado
+        self.sessions = ShardedSessionTable()
+        
+        # Vista compartida entre workers (memoria o Redis según SESSION_STORE)
+        self.store = create_session_store(self.sessions, SESSION_TTL)
+        
+        # Expiración por inactividad: cada actividad reprograma el deadline
+        self.expiry = TimerWheel(tick=EXPIRY_TICK)
         self.active_connections = {}
         self.drivers = {}  # Almacenar drivers de Selenium
-        self.lock = threading.Lock()
         
-    def create_session(self, client_id):
+        # Cierre asíncrono de drivers (quit, procesos huérfanos y perfil temporal)
+        self.reaper = DriverReaper()
+        
+        # Un puerto de depuración remota por instancia de Chrome
+        self.ports = PortAllocator()
+        
+        # Perfiles persistentes por tenant (caché de WhatsApp Web y vinculación)
+        self.profiles = ProfileManager()
+        
+        # Control de admisión: lanzamientos limitados por concurrencia, memoria y CPU
+        self.admission = AdmissionController(on_position=self.notify_queue_position)
+        
+        # Pool de drivers pre-lanzados para entregar QR sin arranque en frío (rellenos vía admisión)
+        self.driver_pool = ChromeDriverPool(
+            self.launch_warm_driver, disposer=self.dispose_driver, admission=self.admission
+        )
+        
+        # Varias sesiones por Chrome como browser contexts (CHROME_CONTEXTS_PER_BROWSER > 1)
+        self.multiplexer = MultiplexedDriverPool(self.setup_chrome_driver, disposer=self.dispose_driver)
+        self.qr_latencies = deque(maxlen=500)
+        self.detection_modes = {'events': 0, 'polling': 0}  # QR y login: eventos DevTools vs. sondeo
+        
+        # Rotación del QR: WhatsApp cambia data-ref periódicamente durante el login
+        self.qr_lock = threading.Lock()
+        self.qr_rotations = 0
+        self.qr_duplicates = 0
+        self.qr_rotation_intervals = deque(maxlen=500)
+        
+        # Snapshot de sesiones autenticadas para reanudarlas tras un reinicio
+        self.snapshotter = SessionSnapshotter(self.sessions, self.restore_session, admission=self.admission)
+        
+        # Monitoreo de autenticación y heartbeats de todas las sesiones en un pool acotado
+        self.scheduler = SessionScheduler()
+        
+        # Chromedriver no es seguro entre hilos: cada sesión serializa sus comandos en una cola
+        self.actors = DriverActorPool()
+        
+        # Sesiones restauradas que ningún cliente reclamó: session_id -> deadline (no lo extienden los heartbeats)
+        self.unclaimed = {}
+        self.claim_lock = threading.Lock()
+        
+    def create_session(self, client_id, tenant=None):
         """Crear nueva sesión REAL de WhatsApp Web"""
-        with self.lock:
-            session_id = str(uuid.uuid4())
-            self.sessions[session_id] = {
-                'client_id': client_id,
-                'status': 'pending',
-                'created_at': datetime.now(),
-                'qr_code': None,
-                'authenticated': False,
-                'last_activity': datetime.now(),
-                'driver': None,
-                'phone_number': None
-            }
-            logger.info(f"Sesión REAL creada: {session_id} para cliente {client_id}")
-            return session_id
+        session_id = str(uuid.uuid4())
+        session = Session(session_id, client_id, tenant=tenant)
+        self.sessions.insert(session)
+        self.expiry.schedule(session_id, session.last_activity + SESSION_TTL)
+        self.save_to_store(session)
+        logger.info(f"Sesión REAL creada: {session_id} para cliente {client_id}")
+        return session_id
         
     def get_session(self, session_id):
         """Obtener sesión por ID"""
-        with self.lock:
-            return self.sessions.get(session_id)
-        
+        return self.sessions.get(session_id)
+            
+    def get_client_sessions(self, client_id):
+        """Obtener los IDs de sesión de un cliente usando el índice"""
+        return self.sessions.client_session_ids(client_id)
+            
     def update_session_status(self, session_id, status, **kwargs):
-        """Actualizar estado de sesión"""
-        with self.lock:
-            if session_id in self.sessions:
-                old_status = self.sessions[session_id].get('status', 'unknown')
-                self.sessions[session_id]['status'] = status
-                self.sessions[session_id]['last_activity'] = datetime.now()
-                self.sessions[session_id].update(kwargs)
-                
-                # Log más detallado
-                if status == 'authenticated':
-                    logger.info(f"🎉 Sesión {session_id} AUTENTICADA exitosamente (era: {old_status})")
-                else:
-                    logger.info(f"📱 Sesión {session_id} actualizada: {old_status} -> {status}")
-                
-                # Log de kwargs adicionales
-                if kwargs:
-                    logger.info(f"📋 Datos adicionales para {session_id}: {kwargs}")
-            else:
-                logger.warning(f"⚠️ Intentando actualizar sesión inexistente: {session_id}")
+        """Actualizar estado de sesión; retorna el estado anterior, o None si la sesión no existe"""
+        now = time.monotonic()
+        old_status = self.sessions.update(session_id, status, last_activity=now, **kwargs)
+        if old_status is None:
+            logger.warning(f"⚠️ Intentando actualizar sesión inexistente: {session_id}")
+            return None
+        
+        self.schedule_expiry(session_id, now)
+        self.save_to_store(self.sessions.get(session_id))
+            
+        # Log más detallado
+        if status == SessionStatus.AUTHENTICATED:
+            logger.info(f"🎉 Sesión {session_id} AUTENTICADA exitosamente (era: {old_status.label})")
+        else:
+            logger.info(f"📱 Sesión {session_id} actualizada: {old_status.label} -> {status.label}")
+        
+        # Log de kwargs adicionales
+        if kwargs:
+            logger.info(f"📋 Datos adicionales para {session_id}: {kwargs}")
+        return old_status
                 
+    def schedule_expiry(self, session_id, now):
+        """Reprogramar la expiración por inactividad, sin pasar el plazo de reclamo si lo tiene"""
+        with self.claim_lock:
+            deadline = now + SESSION_TTL
+            claim_deadline = self.unclaimed.get(session_id)
+            if claim_deadline is not None:
+                deadline = min(deadline, claim_deadline)
+            self.expiry.schedule(session_id, deadline)
+            
+    def claim_session(self, session_id, client_id):
+        """
+        Asignar la sesión al cliente (sid) que la pide. Una sesión restaurada
+        pertenecía a un sid de antes del reinicio: al reclamarla deja de
+        tener plazo de reclamo y vuelve a expirar por inactividad.
+        """
+        with self.claim_lock:
+            previous = self.sessions.reassign(session_id, client_id)
+            claimed = self.unclaimed.pop(session_id, None) is not None
+            if claimed:
+                self.expiry.schedule(session_id, time.monotonic() + SESSION_TTL)
+        if previous is None or (previous == client_id and not claimed):
+            return False
+        self.save_to_store(self.sessions.get(session_id))
+        logger.info(f"🤝 Sesión {session_id} reclamada por cliente {client_id} (antes: {previous})")
+        return True
+        
     def remove_session(self, session_id):
         """Eliminar sesión y cerrar driver"""
-        with self.lock:
-            if session_id in self.sessions:
-                # Cerrar driver de Selenium si existe
-                session = self.sessions[session_id]
-                if session.get('driver'):
-                    try:
-                        session['driver'].quit()
-                        logger.info(f"Driver cerrado para sesión: {session_id}")
-                    except Exception as e:
-                        logger.error(f"Error cerrando driver: {e}")
+        session = self.sessions.pop(session_id)
+        if session is None:
+            return
+            
+        self.expiry.cancel(session_id)
+        self.unclaimed.pop(session_id, None)
+        self.admission.cancel(session_id)
+        self.scheduler.cancel(session_id)
+        self.delete_from_store(session_id)
+        logger.info(f"Sesión eliminada: {session_id}")
+        
+        # El driver se cierra en segundo plano; la eliminación retorna de inmediato
+        self.close_watcher(session)
+        if session.driver:
+            self.release_session_driver(session_id, session.driver)
                 
-                del self.sessions[session_id]
-                logger.info(f"Sesión eliminada: {session_id}")
+    def remove_client_sessions(self, client_id):
+        """Eliminar todas las sesiones de un cliente (costo proporcional a sus sesiones)"""
+        session_ids = self.get_client_sessions(client_id)
+        for session_id in session_ids:
+            self.remove_session(session_id)
+        return session_ids
+        
+    def save_to_store(self, session):
+        """Publicar la sesión en el almacén compartido (un fallo no interrumpe el flujo local)"""
+        if session is None:
+            return
+        try:
+            self.store.save(session)
+        except Exception as e:
+            logger.error(f"Error guardando sesión {session.session_id} en el almacén: {e}")
+            
+    def delete_from_store(self, session_id):
+        """Quitar la sesión del almacén compartido"""
+        try:
+            self.store.delete(session_id)
+        except Exception as e:
+            logger.error(f"Error eliminando sesión {session_id} del almacén: {e}")
+            
+    def get_session_info(self, session_id):
+        """Datos serializables de una sesión, local o de otro worker"""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            return serialize_session(session, self.store.worker_id)
+        try:
+            return self.store.load(session_id)
+        except Exception as e:
+            logger.error(f"Error leyendo sesión {session_id} del almacén: {e}")
+            return None
+        
+    def attach_driver(self, session_id, driver):
+        """
+        Asociar un driver a la sesión (estado CONNECTING) con su perfil, puerto
+        y observador. Si la sesión se eliminó mientras Chrome arrancaba, el
+        driver se desecha y retorna False.
+        """
+        debug_port = driver.debug_port or getattr(driver, 'devtools_port', None)
+        # Observador DevTools instalado antes de navegar: QR y login llegan como eventos
+        watcher = watch_page(
+            debug_port, getattr(driver, 'target_id', None),
+            on_state=lambda state: self.on_page_state(session_id, state)
+        )
+        # La cola de la sesión pudo cerrarse al liberar un driver anterior
+        self.actors.open(session_id)
+        old_status = self.update_session_status(
+            session_id, SessionStatus.CONNECTING,
+            driver=driver,
+            user_data_dir=driver.user_data_dir,
+            debug_port=debug_port,
+            watcher=watcher
+        )
+        if old_status is None:
+            logger.warning(f"🗑️ Sesión {session_id} eliminada durante el lanzamiento, desechando driver")
+            if watcher:
+                watcher.close()
+            self.release_session_driver(session_id, driver)
+            return False
+        return True
+        
+    def close_watcher(self, session):
+        """Cerrar el observador DevTools de la sesión, si tiene"""
+        watcher = session.watcher if session else None
+        if watcher:
+            session.watcher = None
+            watcher.close()
+        
+    def release_session_driver(self, session_id, driver):
+        """Desechar el driver de una sesión después de los comandos que aún tiene en cola"""
+        self.actors.close(session_id, self.dispose_driver, driver, session_id)
+        
+    def dispose_driver(self, driver, session_id=None):
+        """Encolar el cierre de un driver que ya no pertenece a ninguna sesión"""
+        tenant = getattr(driver, 'tenant', None)
+        user_data_dir = getattr(driver, 'user_data_dir', None)
+        debug_port = getattr(driver, 'debug_port', None)
+        
+        def on_done():
+            # Puerto y perfil se liberan cuando Chrome ya terminó
+            if debug_port:
+                self.ports.release(debug_port, user_data_dir)
+            if tenant:
+                self.profiles.release(tenant)
                 
-    def setup_chrome_driver(self):
-        """Configurar driver de Chromium para WhatsApp Web"""
+        # Un perfil persistente se conserva en disco
+        self.reaper.submit(driver, user_data_dir, session_id, keep_profile=bool(tenant), on_done=on_done)
+            
+    def setup_chrome_driver(self, user_data_dir=None, launch_profile=None):
+        """Configurar driver de Chromium para WhatsApp Web (perfil existente opcional)"""
         try:
             # Verificar si estamos en modo sin Chrome
             if os.getenv('NO_CHROME_MODE') == 'true':
@@ -118,106 +307,194 @@ class RealWhatsAppWebManager:
             
             chrome_options = Options()
             
-            # Configuraciones para WhatsApp Web
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-extensions")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--remote-debugging-port=9222")
-            chrome_options.add_argument("--disable-web-security")
-            chrome_options.add_argument("--allow-running-insecure-content")
-            chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
+            # Flags y preferencias del perfil de lanzamiento (CHROME_LAUNCH_PROFILE)
+            launch_profile = apply_launch_profile(chrome_options, launch_profile)
             
             # Configurar headless para Railway
             if os.getenv('RAILWAY_ENVIRONMENT') or os.getenv('PORT'):
                 chrome_options.add_argument("--headless=new")
-                chrome_options.add_argument("--disable-gpu")
                 chrome_options.add_argument("--virtual-time-budget=10000")
                 logger.info("🌐 Modo headless activado para Railway")
             
-            # User agent personalizado
-            chrome_options.add_argument("--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-            
-            # Configurar directorio de datos de usuario único
-            user_data_dir = f"/tmp/chrome_user_data_{uuid.uuid4()}"
+            # Configurar directorio de datos de usuario único (o reutilizar uno guardado)
+            if not user_data_dir:
+                user_data_dir = f"/tmp/chrome_user_data_{uuid.uuid4()}"
             chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
             
             # Para desarrollo, usar headless opcional
             if os.getenv('HEADLESS', 'False').lower() == 'true':
                 chrome_options.add_argument("--headless")
             
-            # Intentar usar Chrome/Chromium directamente primero
-            try:
-                # Buscar ejecutable de Chrome/Chromium
-                chrome_paths = [
-                    '/usr/bin/google-chrome',
-                    '/usr/bin/chromium-browser',
-                    '/usr/bin/chromium',
-                    '/usr/bin/chrome',
-                    '/snap/bin/chromium',
-                    '/opt/google/chrome/chrome'
-                ]
-                
-                # Verificar si hay un path específico configurado
-                if os.getenv('CHROME_PATH'):
-                    chrome_paths.insert(0, os.getenv('CHROME_PATH'))
-                
-                chrome_path = None
-                for path in chrome_paths:
-                    if os.path.exists(path):
-                        chrome_path = path
-                        break
-                
-                if chrome_path:
-                    chrome_options.binary_location = chrome_path
-                    logger.info(f"Usando Chrome en: {chrome_path}")
-                else:
-                    logger.error("❌ No se encontró Chrome en ninguna ruta")
-                    return None
-                
-                # Configurar servicio con ChromeDriver
-                service_paths = [
-                    '/usr/bin/chromedriver',
-                    '/usr/local/bin/chromedriver'
-                ]
-                
-                service = None
-                for path in service_paths:
-                    if os.path.exists(path):
-                        service = Service(path)
-                        logger.info(f"Usando ChromeDriver en: {path}")
-                        break
-                
-                if not service:
-                    logger.error("❌ ChromeDriver no encontrado en rutas del sistema")
-                    return None
-                
-            except Exception as e:
-                logger.error(f"Error configurando Chromium: {e}")
+            # Binarios descubiertos una sola vez por proceso (browser_env)
+            browser_env = discover_browser_env()
+            chrome = browser_env['chrome']
+            chromedriver = browser_env['chromedriver']
+            
+            if not chrome:
+                logger.error("❌ No se encontró Chrome en ninguna ruta")
+                return None
+            chrome_options.binary_location = chrome['path']
+            
+            if not chromedriver:
+                logger.error("❌ ChromeDriver no encontrado en rutas del sistema")
+                return None
+            service = Service(chromedriver['path'])
+            
+            # Puerto de depuración propio: varios Chrome concurrentes no colisionan
+            debug_port = self.ports.allocate(owner=user_data_dir)
+            if debug_port is None:
                 return None
+            chrome_options.add_argument(f"--remote-debugging-port={debug_port}")
             
             # Crear driver
-            driver = webdriver.Chrome(service=service, options=chrome_options)
+            try:
+                driver = webdriver.Chrome(service=service, options=chrome_options)
+            except Exception:
+                self.ports.release(debug_port, user_data_dir)
+                raise
+            driver.user_data_dir = user_data_dir  # Para borrarlo al desmontar
+            driver.debug_port = debug_port  # Se libera al desmontar
             driver.set_window_size(1200, 800)
             
             # Ejecutar script para evitar detección
             driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             
-            logger.info("✅ Driver de Chromium configurado exitosamente")
+            logger.info(f"✅ Driver de Chromium configurado exitosamente (perfil {launch_profile})")
             return driver
             
         except Exception as e:
             logger.error(f"❌ Error configurando driver: {e}")
             return None
             
+    def launch_warm_driver(self):
+        """Lanzar un driver y dejarlo navegado en WhatsApp Web (fábrica del pool)"""
+        driver = self.setup_chrome_driver()
+        if driver:
+            driver.get(WHATSAPP_WEB_URL)
+        return driver
+        
+    def launch_tenant_driver(self, tenant):
+        """Lanzar un driver sobre el perfil persistente del tenant; retorna (driver, hit)"""
+        acquired = self.profiles.acquire(tenant)
+        if not acquired:
+            logger.info(f"🔒 Perfil de {tenant} en uso, usando perfil temporal")
+            return None, False
+            
+        user_data_dir, hit = acquired
+        driver = self.setup_chrome_driver(user_data_dir=user_data_dir)
+        if not driver:
+            self.profiles.release(tenant)
+            return None, False
+            
+        driver.tenant = tenant  # Para conservar el perfil al desmontar
+        logger.info(f"🗂️ Perfil de {tenant} {'reutilizado' if hit else 'creado'}: {user_data_dir}")
+        return driver, hit
+        
+    def lease_warm_driver(self):
+        """Tomar un driver caliente del pool, recargando si su QR ya expiró"""
+        driver = self.driver_pool.lease()
+        if not driver:
+            return None
+            
+        try:
+            if classify_page(driver).get('expired'):
+                logger.info("♻️ QR del driver caliente expirado, recargando página")
+                driver.refresh()
+        except Exception as e:
+            logger.error(f"Error verificando driver caliente: {e}")
+            
+        return driver
+            
+    def restore_session(self, entry):
+        """Relanzar Chrome sobre el perfil de una sesión del snapshot"""
+        session_id = entry['session_id']
+        tenant = entry.get('tenant')
+        if tenant:
+            driver, _ = self.launch_tenant_driver(tenant)
+        else:
+            driver = self.setup_chrome_driver(user_data_dir=entry['user_data_dir'])
+        if not driver:
+            return False
+            
+        try:
+            driver.get(WHATSAPP_WEB_URL)
+            detection = detect_authentication(driver, timeout=RESTORE_AUTH_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Error reanudando perfil de sesión {session_id}: {e}")
+            detection = {'authenticated': False}
+            
+        if not detection['authenticated']:
+            # El perfil ya no está vinculado: el reaper lo cierra y lo borra
+            logger.warning(f"⚠️ Sesión {session_id} no volvió autenticada, descartando perfil")
+            self.dispose_driver(driver, session_id)
+            return False
+            
+        session = Session(session_id, entry.get('client_id'), SessionStatus.AUTHENTICATED, tenant=tenant)
+        session.update(
+            created_at=wall_to_monotonic(entry['created_at']),
+            authenticated=True,
+            driver=driver,
+            user_data_dir=driver.user_data_dir,
+            debug_port=driver.debug_port,
+            phone_number=entry.get('phone_number'),
+            auth_selector=detection['selector'],
+            auth_detection_time=detection['elapsed'],
+            page_state=detection['page'].get('state')
+        )
+        # Su client_id es un sid de antes del reinicio: expira pronto si nadie la reclama con get_qr
+        claim_deadline = time.monotonic() + RESTORE_CLAIM_TIMEOUT
+        with self.claim_lock:
+            self.unclaimed[session_id] = claim_deadline
+            self.sessions.insert(session)
+            self.expiry.schedule(session_id, min(claim_deadline, session.last_activity + SESSION_TTL))
+        self.save_to_store(session)
+        
+        logger.info(f"♻️ Sesión {session_id} restaurada autenticada en {detection['elapsed']}s")
+        self.start_real_heartbeat(session_id, driver)
+        return True
+            
+    def request_whatsapp_session(self, session_id):
+        """Pedir Chrome para una sesión a través del control de admisión; False si se rechazó"""
+        if os.getenv('NO_CHROME_MODE') == 'true':
+            # Sin Chrome no hay lanzamiento que limitar (QR simulado)
+            return self.start_whatsapp_session(session_id)
+            
+        session = self.get_session(session_id)
+        position = self.admission.submit(
+            session_id, session.client_id,
+            lambda: self.start_whatsapp_session(session_id)
+        )
+        if position is None:
+            logger.warning(f"🚦 Cola de lanzamientos llena, sesión {session_id} rechazada")
+            return False
+        if position:
+            self.notify_queue_position(session_id, position, len(self.admission.queue))
+        return True
+        
+    def notify_queue_position(self, session_id, position, depth):
+        """Emitir la posición de la sesión en la cola de lanzamientos"""
+        if self.get_session(session_id) is None:
+            # Rellenos del pool de drivers: nadie espera en su room
+            return
+        socketio.emit('queued', {
+            'type': 'queued',
+            'session_id': session_id,
+            'position': position,
+            'queue_depth': depth,
+            'estimated_wait': self.admission.estimated_wait(position),
+            'message': f'En cola para iniciar WhatsApp Web (posición {position})'
+        }, room=session_id)
+        
     def start_whatsapp_session(self, session_id):
         """Iniciar sesión REAL de WhatsApp Web"""
         try:
+            started = time.monotonic()
             session = self.get_session(session_id)
             if not session:
                 return False
+            if session.driver:
+                # Ya tiene Chrome (p. ej. get_qr repetido): no lanzar otro
+                return True
                 
             logger.info(f"Iniciando sesión real de WhatsApp Web: {session_id}")
             
@@ -227,22 +504,63 @@ class RealWhatsAppWebManager:
                 self.send_mock_qr_code(session_id)
                 return True
             
-            # Crear driver
-            driver = self.setup_chrome_driver()
-            if not driver:
-                logger.error("❌ No se pudo crear el driver de Chrome")
-                self.send_mock_qr_code(session_id)
-                return True
-                
-            # Guardar driver en la sesión
-            self.update_session_status(session_id, 'connecting', driver=driver)
+            # Perfil persistente del tenant: caché y vinculación de la última vez
+            driver = None
+            if session.tenant:
+                driver, profile_hit = self.launch_tenant_driver(session.tenant)
+                if driver:
+                    if not self.attach_driver(session_id, driver):
+                        return False
+                    self.navigate_to_whatsapp(session_id, driver)
+                    
+                    if profile_hit:
+                        # Un perfil aún vinculado entra directo a la interfaz, sin QR
+                        state = wait_for_qr_or_auth(
+                            driver, timeout=30,
+                            probe=lambda d: self.actors.call(session_id, classify_page, d)
+                        )
+                        if state.get('auth'):
+                            elapsed = round(time.monotonic() - started, 3)
+                            logger.info(f"🔑 Sesión {session_id} reutilizó la vinculación del perfil de {session.tenant}")
+                            self.complete_authentication(
+                                session_id, driver, state['auth'], elapsed,
+                                page_state=state, profile_reused=True
+                            )
+                            return True
+            
+            if not driver and self.multiplexer.enabled:
+                # Contexto aislado dentro de un Chrome compartido
+                driver = self.multiplexer.acquire()
+                if driver:
+                    if not self.attach_driver(session_id, driver):
+                        return False
+                    self.navigate_to_whatsapp(session_id, driver)
             
-            # Navegar a WhatsApp Web
-            logger.info("Navegando a WhatsApp Web...")
-            driver.get("https://web.whatsapp.com")
+            if not driver:
+                # Usar un driver caliente del pool si hay disponible
+                driver = self.lease_warm_driver()
+                if driver:
+                    logger.info("🔥 Usando driver caliente del pool")
+                    if not self.attach_driver(session_id, driver):
+                        return False
+                else:
+                    # Crear driver en frío
+                    driver = self.setup_chrome_driver()
+                    if not driver:
+                        logger.error("❌ No se pudo crear el driver de Chrome")
+                        self.send_mock_qr_code(session_id)
+                        return True
+                        
+                    # Guardar driver en la sesión
+                    if not self.attach_driver(session_id, driver):
+                        return False
+                    
+                    # Navegar a WhatsApp Web
+                    logger.info("Navegando a WhatsApp Web...")
+                    self.navigate_to_whatsapp(session_id, driver)
             
             # Esperar a que aparezca el QR
-            self.wait_for_qr_code(session_id, driver)
+            self.wait_for_qr_code(session_id, driver, started)
             
             return True
             
@@ -251,38 +569,46 @@ class RealWhatsAppWebManager:
             self.send_mock_qr_code(session_id)
             return True
             
-    def wait_for_qr_code(self, session_id, driver):
+    def navigate_to_whatsapp(self, session_id, driver):
+        """
+        Navegar a WhatsApp Web por la cola de la sesión. driver.get espera la
+        carga completa: se le da el timeout de carga de chromedriver, no el
+        de un comando corto.
+        """
+        self.actors.call(session_id, driver.get, WHATSAPP_WEB_URL, timeout=PAGE_LOAD_TIMEOUT)
+        
+    def wait_for_qr_code(self, session_id, driver, started=None):
         """Esperar y capturar código QR real"""
         try:
             logger.info(f"Esperando código QR para sesión: {session_id}")
             
-            # Esperar a que aparezca el QR (máximo 30 segundos)
-            wait = WebDriverWait(driver, 30)
-            
-            # Selector del QR de WhatsApp Web
-            qr_element = wait.until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "[data-ref]"))
-            )
+            # Esperar a que aparezca el QR (máximo 30 segundos): por evento del
+            # observador DevTools, o sondeando el clasificador si no hay conexión
+            qr_data = None
+            session = self.get_session(session_id)
+            watcher = session.watcher if session else None
+            if watcher and watcher.connected:
+                state = watcher.wait_for(lambda s: s.get('qr_data'), 30)
+                if state:
+                    qr_data = state['qr_data']
+                    self.detection_modes['events'] += 1
+                elif watcher.connected:
+                    raise TimeoutException("El observador no reportó QR")
+            if not qr_data:
+                self.detection_modes['polling'] += 1
+                wait = WebDriverWait(driver, 30)
+                qr_data = wait.until(lambda d: self.actors.call(session_id, classify_page, d).get('qr_data'))
             
             logger.info("Elemento QR encontrado")
             
-            # Obtener el atributo data-ref que contiene el código QR
-            qr_data = qr_element.get_attribute("data-ref")
-            
             if qr_data:
-                logger.info(f"QR Code obtenido: {qr_data[:50]}...")
+                time_to_qr = round(time.monotonic() - started, 3) if started else None
+                if time_to_qr is not None:
+                    self.qr_latencies.append(time_to_qr)
+                logger.info(f"QR Code obtenido en {time_to_qr}s: {qr_data[:50]}...")
                 
-                # Actualizar sesión con QR real
-                self.update_session_status(session_id, 'qr_ready', qr_data=qr_data)
-                
-                # Emitir evento de QR
-                socketio.emit('qr_code', {
-                    'type': 'qr_code',
-                    'session_id': session_id,
-                    'qr_data': qr_data,
-                    'message': 'Código QR REAL generado',
-                    'is_real': True
-                }, room=session_id)
+                # Actualizar sesión con QR real y emitirlo a la room
+                self.publish_qr(session_id, qr_data, time_to_qr=time_to_qr)
                 
                 # Iniciar monitoreo de autenticación
                 self.monitor_authentication(session_id, driver)
@@ -298,205 +624,267 @@ class RealWhatsAppWebManager:
             logger.error(f"Error capturando QR: {e}")
             return False
             
+    def publish_qr(self, session_id, qr_data, time_to_qr=None):
+        """
+        Guardar y emitir el QR vigente de la sesión, solo si cambió.
+        Retorna True si se emitió (primer QR o rotación).
+        """
+        now = time.monotonic()
+        with self.qr_lock:
+            session = self.get_session(session_id)
+            if not session or session.status not in (SessionStatus.CONNECTING, SessionStatus.QR_READY):
+                return False
+            if session.qr_data == qr_data:
+                self.qr_duplicates += 1
+                return False
+            
+            rotated = session.status == SessionStatus.QR_READY and session.qr_data is not None
+            rotation = session.qr_rotations + 1 if rotated else 0
+            previous_at = session.qr_updated_at
+            self.update_session_status(
+                session_id, SessionStatus.QR_READY,
+                qr_data=qr_data, qr_updated_at=now, qr_rotations=rotation
+            )
+            if rotated:
+                self.qr_rotations += 1
+                self.qr_rotation_intervals.append(now - previous_at)
+        
+        if rotated:
+            logger.info(f"🔄 QR rotado para sesión {session_id} (rotación {rotation}, vigente {now - previous_at:.1f}s)")
+        
+        socketio.emit('qr_code', build_qr_payload(
+            session_id, qr_data,
+            'Código QR REAL actualizado' if rotated else 'Código QR REAL generado',
+            time_to_qr=time_to_qr,
+            rotation=rotation,
+            is_real=True
+        ), room=session_id)
+        return True
+        
+    def on_page_state(self, session_id, state):
+        """Estado de la página (evento DevTools o sondeo): registrarlo y publicar rotaciones del QR"""
+        session = self.get_session(session_id)
+        if session and state.get('state'):
+            session.update(page_state=state['state'])
+        if state.get('auth') or state.get('expired'):
+            # Decidir ya, sin esperar al próximo tick del monitoreo
+            self.scheduler.wake(session_id, 'auth')
+        qr_data = state.get('qr_data')
+        if not qr_data:
+            return
+        # El primer QR lo publica wait_for_qr_code (con su tiempo hasta QR)
+        if session and session.status == SessionStatus.QR_READY:
+            self.publish_qr(session_id, qr_data)
+        
     def monitor_authentication(self, session_id, driver):
-        """Monitorear autenticación real de WhatsApp Web"""
-        def monitor():
+        """Monitorear autenticación real de WhatsApp Web (ticks en el planificador compartido)"""
+        logger.info(f"Monitoreando autenticación para sesión: {session_id}")
+        started = time.monotonic()
+        self.scheduler.schedule(session_id, 'auth', 0, lambda: self.auth_tick(session_id, driver, started))
+        
+    def auth_tick(self, session_id, driver, started):
+        """
+        Un tick del monitoreo de autenticación; retorna la espera hasta el
+        siguiente, o None al decidir. Con el observador DevTools conectado
+        lee su último estado sin round trip; si no, sondea el clasificador.
+        """
+        session = self.get_session(session_id)
+        if not session or session.status not in (SessionStatus.CONNECTING, SessionStatus.QR_READY):
+            return None
+            
+        elapsed = round(time.monotonic() - started, 3)
+        watcher = session.watcher
+        if watcher and watcher.connected:
+            state, mode = watcher.state, 'events'
+        else:
+            mode = 'polling'
             try:
-                logger.info(f"Monitoreando autenticación para sesión: {session_id}")
-                
-                # Esperar hasta 120 segundos por autenticación
-                wait = WebDriverWait(driver, 120)
-                
-                # Esperar a que desaparezca el QR y aparezca la interfaz principal
-                try:
-                    # Múltiples selectores para detectar autenticación exitosa
-                    selectors = [
-                        # Barra de búsqueda principal
-                        "[data-testid='chat-list-search']",
-                        "[data-testid='search']", 
-                        "[data-testid='chatlist-search']",
-                        "input[placeholder*='Search']",
-                        "input[placeholder*='Buscar']",
-                        "[aria-label*='Search']",
-                        "[aria-label*='Buscar']",
-                        
-                        # Elementos de la interfaz principal
-                        "[data-testid='chatlist']",
-                        "[data-testid='chat-list']",
-                        "[data-testid='side']",
-                        "#main",
-                        "._3uMse",  # Clase común del chat list
-                        "._1jJ70",  # Sidebar
-                        
-                        # Elementos de la app principal
-                        "[data-testid='app-wrapper-main']",
-                        "._3q4NP",  # Container principal
-                        "._2Zdgs",  # Chat container
-                        
-                        # Cualquier elemento que contenga "chat"
-                        "[data-testid*='chat']",
-                        "[aria-label*='Chat']",
-                        "[aria-label*='Conversation']"
-                    ]
-                    
-                    authenticated = False
-                    found_selector = None
-                    
-                    for selector in selectors:
-                        try:
-                            element = wait.until(
-                                EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                            )
-                            logger.info(f"✅ Autenticación detectada con selector: {selector}")
-                            authenticated = True
-                            found_selector = selector
-                            break
-                        except TimeoutException:
-                            continue
-                    
-                    if not authenticated:
-                        # Intentar una verificación más básica
-                        try:
-                            # Verificar que no estamos en la página de QR
-                            qr_canvas = driver.find_elements(By.CSS_SELECTOR, "canvas[aria-label*='QR']")
-                            if not qr_canvas:
-                                logger.info("✅ No se encontró canvas de QR, asumiendo autenticación")
-                                authenticated = True
-                                found_selector = "no-qr-canvas"
-                            else:
-                                logger.info(f"❌ Aún se encuentra canvas de QR: {len(qr_canvas)}")
-                        except Exception as e:
-                            logger.error(f"Error verificando QR canvas: {e}")
-                    
-                    if not authenticated:
-                        raise TimeoutException("No se pudo detectar autenticación con ningún selector")
-                    
-                    logger.info(f"¡Autenticación exitosa para sesión: {session_id}!")
-                    
-                    # Obtener número de teléfono si es posible
-                    phone_number = self.get_phone_number(driver)
-                    
-                    # Actualizar sesión
-                    self.update_session_status(
-                        session_id, 
-                        'authenticated', 
-                        authenticated=True,
-                        phone_number=phone_number
-                    )
-                    
-                    # Emitir evento de autenticación exitosa
-                    socketio.emit('authenticated', {
-                        'type': 'authenticated',
-                        'session_id': session_id,
-                        'message': '¡Autenticación REAL exitosa!',
-                        'phone_number': phone_number,
-                        'is_real': True,
-                        'timestamp': datetime.now().isoformat()
-                    }, room=session_id)
-                    
-                    # Iniciar heartbeat para mantener sesión viva
-                    self.start_real_heartbeat(session_id, driver)
-                    
-                except TimeoutException:
-                    logger.warning(f"Timeout en autenticación para sesión: {session_id}")
-                    self.update_session_status(session_id, 'qr_expired')
-                    
-                    # Emitir evento de QR expirado
-                    socketio.emit('qr_expired', {
-                        'type': 'qr_expired',
-                        'session_id': session_id,
-                        'message': 'Código QR expirado - Genera uno nuevo'
-                    }, room=session_id)
-                    
+                state = self.actors.call(session_id, classify_page, driver)
             except Exception as e:
-                logger.error(f"Error monitoreando autenticación: {e}")
-                
-        # Ejecutar monitoreo en hilo separado
-        thread = threading.Thread(target=monitor)
-        thread.daemon = True
-        thread.start()
+                # El driver murió o la página está navegando; no tiene sentido esperar más
+                logger.error(f"Error sondeando autenticación: {e}")
+                self.close_watcher(session)
+                self.expire_qr(session_id, driver, elapsed)
+                return None
+            self.on_page_state(session_id, state)
+            
+        selector = state.get('auth')
+        expired = state.get('expired')
+        if not selector and not expired and elapsed < AUTH_TIMEOUT:
+            return AUTH_POLL_INTERVAL
+            
+        self.detection_modes[mode] += 1
+        self.close_watcher(session)
         
-    def get_phone_number(self, driver):
-        """Obtener número de teléfono de la sesión"""
+        if not selector and not expired and state.get('ready') == 'complete' and not state.get('qr'):
+            # Verificación básica al vencer el deadline: si ya no hay QR asumimos autenticación
+            logger.info("✅ No se encontró canvas de QR, asumiendo autenticación")
+            selector = 'no-qr-canvas'
+            
+        if not selector:
+            if expired:
+                logger.info(f"⌛ WhatsApp reportó QR expirado ({expired}) tras {elapsed}s")
+            logger.warning(f"Timeout en autenticación para sesión: {session_id} ({elapsed}s)")
+            self.expire_qr(session_id, driver, elapsed)
+            return None
+            
+        logger.info(f"✅ Autenticación detectada con selector: {selector} en {elapsed}s ({mode})")
+        self.complete_authentication(session_id, driver, selector, elapsed, page_state=state)
+        return None
+        
+    def expire_qr(self, session_id, driver, elapsed):
+        """QR sin escanear a tiempo: liberar Chrome y avisar a la room"""
+        self.update_session_status(
+            session_id, SessionStatus.QR_EXPIRED,
+            driver=None, user_data_dir=None, debug_port=None
+        )
+        
+        # Liberar Chrome de inmediato; un nuevo get_qr lanzará otro
+        self.release_session_driver(session_id, driver)
+        
+        # Emitir evento de QR expirado
+        socketio.emit('qr_expired', {
+            'type': 'qr_expired',
+            'session_id': session_id,
+            'elapsed': elapsed,
+            'message': 'Código QR expirado - Genera uno nuevo'
+        }, room=session_id)
+        
+    def complete_authentication(self, session_id, driver, selector, elapsed, page_state=None, **extra):
+        """
+        Marcar la sesión autenticada, notificar a la room e iniciar heartbeat.
+        `page_state` es el último resultado del clasificador, si ya se tiene.
+        """
+        logger.info(f"¡Autenticación exitosa para sesión: {session_id}!")
+        
+        # Obtener número de teléfono si es posible
+        page_state = page_state or self.classify_session_page(session_id, driver)
+        phone_number = self.get_phone_number(page_state)
+        
+        # Actualizar sesión
+        self.update_session_status(
+            session_id, 
+            SessionStatus.AUTHENTICATED, 
+            authenticated=True,
+            page_state=page_state.get('state'),
+            phone_number=phone_number,
+            auth_selector=selector,
+            auth_detection_time=elapsed
+        )
+        
+        # Emitir evento de autenticación exitosa
+        socketio.emit('authenticated', {
+            'type': 'authenticated',
+            'session_id': session_id,
+            'message': '¡Autenticación REAL exitosa!',
+            'phone_number': phone_number,
+            'detected_by': selector,
+            'detection_time': elapsed,
+            'is_real': True,
+            'timestamp': datetime.now().isoformat(),
+            **extra
+        }, room=session_id)
+        
+        # Iniciar heartbeat para mantener sesión viva
+        self.start_real_heartbeat(session_id, driver)
+        
+    def classify_session_page(self, session_id, driver):
+        """Estado de la página por el clasificador ({} si el driver no respondió)"""
         try:
-            # Intentar obtener información del usuario
-            selectors = [
-                "[data-testid='menu-btn']",
-                "[data-testid='menu']",
-                "[aria-label*='Menu']",
-                "[aria-label*='Menú']",
-                "._1ZVQX",  # Botón de menú
-                "._3XKXx"   # Header button
-            ]
-            
-            for selector in selectors:
-                try:
-                    # Intentar encontrar algún elemento que nos dé información
-                    element = driver.find_element(By.CSS_SELECTOR, selector)
-                    if element:
-                        # Si encontramos el elemento, significa que estamos autenticados
-                        logger.info(f"✅ Elemento de interfaz encontrado: {selector}")
-                        return "Sesión autenticada"
-                except:
-                    continue
-            
-            return "Sesión activa"
+            return self.actors.call(session_id, classify_page, driver)
         except Exception as e:
-            logger.error(f"Error obteniendo información de usuario: {e}")
-            return "Sesión activa"
+            logger.error(f"Error clasificando página: {e}")
+            return {}
+            
+    def get_phone_number(self, page_state):
+        """Obtener número de teléfono de la sesión"""
+        # El clasificador ya buscó el botón de menú de la interfaz principal
+        if page_state.get('menu'):
+            logger.info(f"✅ Elemento de interfaz encontrado: {page_state['menu']}")
+            return "Sesión autenticada"
+        return "Sesión activa"
             
+    def start_context_sampling(self):
+        """Medir la memoria de los Chrome compartidos en el planificador, no en cada /api/stats"""
+        def tick():
+            self.multiplexer.sample_memory()
+            return CONTEXT_MEMORY_SAMPLE_INTERVAL
+        self.scheduler.schedule('browser-contexts', 'memory', CONTEXT_MEMORY_SAMPLE_INTERVAL, tick)
+        
     def start_real_heartbeat(self, session_id, driver):
-        """Iniciar heartbeat real para mantener sesión viva"""
-        def heartbeat():
-            while True:
-                try:
-                    session = self.get_session(session_id)
-                    if not session or session.get('status') != 'authenticated':
-                        break
-                        
-                    # Verificar que el driver sigue activo
-                    if driver:
-                        # Hacer una acción mínima para mantener la sesión
-                        try:
-                            driver.current_url
-                            
-                            # Actualizar última actividad
-                            self.update_session_status(session_id, 'authenticated')
-                            
-                            # Emitir heartbeat
-                            socketio.emit('heartbeat', {
-                                'type': 'heartbeat',
-                                'session_id': session_id,
-                                'timestamp': datetime.now().isoformat(),
-                                'is_real': True
-                            }, room=session_id)
-                            
-                        except Exception as e:
-                            logger.error(f"Driver no válido en heartbeat: {e}")
-                            break
-                    
-                    # Heartbeat cada 30 segundos
-                    time.sleep(30)
-                    
-                except Exception as e:
-                    logger.error(f"Error en heartbeat real para sesión {session_id}: {e}")
-                    break
-                    
-        thread = threading.Thread(target=heartbeat)
-        thread.daemon = True
-        thread.start()
+        """Programar el heartbeat real de la sesión en el planificador compartido"""
+        self.scheduler.schedule(session_id, 'heartbeat', 0, lambda: self.heartbeat_tick(session_id, driver))
+        
+    def heartbeat_tick(self, session_id, driver):
+        """Un heartbeat: verificar que la sesión sigue vinculada; retorna la espera hasta el siguiente o None"""
+        session = self.get_session(session_id)
+        if not session or session.status != SessionStatus.AUTHENTICATED:
+            return None
+            
+        # Verificar que el driver sigue activo y la sesión sigue vinculada
+        if driver:
+            try:
+                page_state = self.actors.call(session_id, classify_page, driver).get('state')
+            except Exception as e:
+                logger.error(f"Driver no válido en heartbeat: {e}")
+                return None
+                
+            if page_state in (PAGE_LOGGED_OUT, PAGE_QR):
+                # WhatsApp volvió a pedir QR: el teléfono cerró la sesión
+                self.handle_logged_out(session_id, driver, page_state)
+                return None
+            if page_state in (PAGE_PHONE_OFFLINE, PAGE_CONFLICT):
+                logger.warning(f"⚠️ Sesión {session_id} en estado {page_state}")
+                
+            # Actualizar última actividad
+            self.update_session_status(session_id, SessionStatus.AUTHENTICATED, page_state=page_state)
+            
+            # Emitir heartbeat
+            socketio.emit('heartbeat', {
+                'type': 'heartbeat',
+                'session_id': session_id,
+                'page_state': page_state,
+                'timestamp': datetime.now().isoformat(),
+                'is_real': True
+            }, room=session_id)
+            
+        return HEARTBEAT_INTERVAL
+        
+    def handle_logged_out(self, session_id, driver, page_state):
+        """Sesión desvinculada desde el teléfono: liberar Chrome y avisar a la room"""
+        logger.warning(f"🔌 Sesión {session_id} desvinculada ({page_state})")
+        self.update_session_status(
+            session_id, SessionStatus.DISCONNECTED,
+            authenticated=False, page_state=page_state,
+            driver=None, user_data_dir=None, debug_port=None
+        )
+        self.release_session_driver(session_id, driver)
+        
+        socketio.emit('disconnected', {
+            'type': 'disconnected',
+            'session_id': session_id,
+            'page_state': page_state,
+            'message': 'WhatsApp cerró la sesión - Genera un nuevo QR'
+        }, room=session_id)
         
     def send_test_message(self, session_id, message="Test desde WhatsApp Web Real"):
         """Enviar mensaje de prueba real"""
         try:
             session = self.get_session(session_id)
-            if not session or not session.get('authenticated'):
+            if not session or not session.authenticated:
                 return False
                 
-            driver = session.get('driver')
+            driver = session.driver
             if not driver:
                 return False
                 
+            # La página debe seguir vinculada; el comando pasa por la cola de la sesión
+            # y el handler de Socket.IO cede el hub mientras espera
+            page_state = self.actors.call(session_id, classify_page, driver).get('state')
+            if page_state not in LINKED_PAGE_STATES:
+                logger.warning(f"⚠️ Sesión {session_id} no lista para enviar ({page_state})")
+                return False
+                
             # Por seguridad, por ahora solo simulamos el envío
             # En una implementación completa, aquí se enviaría el mensaje real
             logger.info(f"Mensaje de prueba simulado para sesión: {session_id}")
@@ -508,15 +896,50 @@ class RealWhatsAppWebManager:
             return False
             
     def get_active_sessions(self):
-        """Obtener estadísticas de sesiones activas"""
-        with self.lock:
-            return {
-                'total_sessions': len(self.sessions),
-                'authenticated': sum(1 for s in self.sessions.values() if s.get('authenticated', False)),
-                'pending': sum(1 for s in self.sessions.values() if s.get('status') == 'pending'),
-                'qr_ready': sum(1 for s in self.sessions.values() if s.get('status') == 'qr_ready'),
-                'connecting': sum(1 for s in self.sessions.values() if s.get('status') == 'connecting')
-            }
+        """Obtener estadísticas de sesiones activas (sumadas entre workers)"""
+        return self.store.cluster_stats(self.get_local_session_stats())
+    
+    def get_local_session_stats(self):
+        """Estadísticas de las sesiones de este proceso"""
+        # Contadores mantenidos incrementalmente por shard, sin recorrer las sesiones
+        stats = self.sessions.stats()
+        status_counts = stats['status_counts']
+        return {
+            'total_sessions': stats['total_sessions'],
+            'authenticated': stats['authenticated'],
+            'pending': status_counts.get(SessionStatus.PENDING, 0),
+            'qr_ready': status_counts.get(SessionStatus.QR_READY, 0),
+            'connecting': status_counts.get(SessionStatus.CONNECTING, 0)
+        }
+    
+    def get_performance_stats(self):
+        """Métricas de rendimiento (pool de drivers y tiempo hasta QR)"""
+        latencies = list(self.qr_latencies)
+        return {
+            'driver_pool': self.driver_pool.stats(),
+            'driver_reaper': self.reaper.stats(),
+            'session_store': self.store.stats(),
+            'session_snapshot': self.snapshotter.stats(),
+            'scheduler': self.scheduler.stats(),
+            'driver_actors': self.actors.stats(),
+            'selectors': selector_registry.summary(),
+            'chrome_profiles': self.profiles.stats(),
+            'browser_contexts': self.multiplexer.stats(),
+            'debug_ports': self.ports.stats(),
+            'admission': self.admission.stats(),
+            'page_detection': dict(self.detection_modes),
+            'qr_rotation': {
+                'rotations': self.qr_rotations,
+                'duplicates_suppressed': self.qr_duplicates,
+                'interval_p50': percentile(list(self.qr_rotation_intervals), 50),
+                'interval_p95': percentile(list(self.qr_rotation_intervals), 95)
+            },
+            'qr_render': qr_renderer.stats(),
+            'cpu_offload': offloader.stats(),
+            'chrome_launch_profile': resolve_launch_profile(),
+            'time_to_qr_p50': percentile(latencies, 50),
+            'time_to_qr_p95': percentile(latencies, 95)
+        }
     
     def send_mock_qr_code(self, session_id):
         """Enviar código QR simulado cuando Chrome no está disponible"""
@@ -526,36 +949,16 @@ class RealWhatsAppWebManager:
             # Crear QR simulado con mensaje
             qr_text = f"WhatsApp Web no disponible - Chrome no encontrado\nSession: {session_id}\nTime: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
             
-            # Generar QR code
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(qr_text)
-            qr.make(fit=True)
-            
-            # Crear imagen
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Convertir a base64
-            img_buffer = io.BytesIO()
-            img.save(img_buffer, format='PNG')
-            img_buffer.seek(0)
-            qr_data = base64.b64encode(img_buffer.getvalue()).decode()
-            qr_data_url = f"data:image/png;base64,{qr_data}"
-            
             # Actualizar sesión
-            self.update_session_status(session_id, 'qr_ready', qr_data=qr_data_url)
+            self.update_session_status(session_id, SessionStatus.QR_READY, qr_data=qr_text)
             
-            # Enviar QR al cliente
-            socketio.emit('qr_code', {
-                'session_id': session_id,
-                'qr_data': qr_data_url,
-                'message': '⚠️ Chrome no disponible - QR simulado',
-                'error': 'Chrome no está instalado en Railway'
-            })
+            # Enviar QR solo al cliente dueño de la sesión
+            session = self.get_session(session_id)
+            socketio.emit('qr_code', build_qr_payload(
+                session_id, qr_text,
+                '⚠️ Chrome no disponible - QR simulado',
+                error='Chrome no está instalado en Railway'
+            ), room=session.client_id if session else session_id)
             
             logger.info(f"QR simulado enviado para sesión: {session_id}")
             
@@ -567,6 +970,25 @@ class RealWhatsAppWebManager:
                 'error': str(e)
             })
 
+def render_qr_image(qr_data):
+    """PNG del QR para adjuntarlo como binario en Socket.IO (None si falla el render)"""
+    try:
+        return render_qr(qr_data, 'png', run=offloader.run)
+    except Exception as e:
+        logger.error(f"Error renderizando QR: {e}")
+        return None
+
+def build_qr_payload(session_id, qr_data, message, **extra):
+    """Evento 'qr_code': texto del QR en qr_data y su PNG como adjunto binario en qr_image"""
+    return {
+        'type': 'qr_code',
+        'session_id': session_id,
+        'qr_data': qr_data,
+        'qr_image': render_qr_image(qr_data),
+        'message': message,
+        **extra
+    }
+
 # Instancia global del manager REAL
 ws_manager = RealWhatsAppWebManager()
 
@@ -607,14 +1029,30 @@ def handle_disconnect():
     client_id = request.sid
     logger.info(f"Cliente desconectado: {client_id}")
     
-    # Limpiar sesiones del cliente
-    sessions_to_remove = []
-    for session_id, session in ws_manager.sessions.items():
-        if session.get('client_id') == client_id:
-            sessions_to_remove.append(session_id)
-    
-    for session_id in sessions_to_remove:
-        ws_manager.remove_session(session_id)
+    # Limpiar sesiones del cliente usando el índice por client_id
+    ws_manager.remove_client_sessions(client_id)
+
+def qr_age(info):
+    """Segundos desde la última rotación del QR de una sesión serializada (o None)"""
+    if not info.get('qr_updated_at'):
+        return None
+    return round(time.time() - info['qr_updated_at'], 1)
+
+def build_status_payload(session_id, info):
+    """Evento 'status' a partir de los datos serializados de una sesión"""
+    return {
+        'type': 'status',
+        'session_id': session_id,
+        'status': info['status'],
+        'authenticated': info['authenticated'],
+        'created_at': info['created_at'],
+        'phone_number': info['phone_number'],
+        'qr_rotations': info.get('qr_rotations', 0),
+        'qr_age': qr_age(info),
+        'page_state': info.get('page_state'),
+        'message': f"Estado: {info['status']}",
+        'is_real': True
+    }
 
 @socketio.on('get_qr')
 def handle_get_qr(data):
@@ -623,21 +1061,61 @@ def handle_get_qr(data):
         client_id = request.sid
         session_id = data.get('session_id')
         
+        session = ws_manager.get_session(session_id) if session_id else None
+        if session:
+            # El cliente que la pide pasa a ser su dueño (p. ej. sesión restaurada tras un reinicio)
+            ws_manager.claim_session(session_id, client_id)
+        
         if not session_id:
-            # Crear nueva sesión
-            session_id = ws_manager.create_session(client_id)
+            # Crear nueva sesión; el perfil persistente del tenant (con su vinculación
+            # de WhatsApp) solo se usa con un token firmado por el panel
+            tenant = verify_tenant_token(data.get('tenant_token'))
+            requested = data.get('tenant') or data.get('nombre_nora')
+            if requested and requested != tenant:
+                logger.warning(f"🔐 Tenant {requested} sin token válido: sesión con perfil temporal")
+            session_id = ws_manager.create_session(client_id, tenant=tenant)
+        elif session and session.status == SessionStatus.AUTHENTICATED:
+            # Sesión ya vinculada (p. ej. restaurada tras un reinicio): no requiere QR
+            join_room(session_id)
+            emit('status', build_status_payload(session_id, ws_manager.get_session_info(session_id)))
+            return
+        elif session and (session.driver or ws_manager.admission.is_pending(session_id)):
+            # Chrome ya lanzado o en cola para esta sesión: reenviar estado sin lanzar otro
+            join_room(session_id)
+            emit('status', build_status_payload(session_id, ws_manager.get_session_info(session_id)))
+            if session.status == SessionStatus.QR_READY and session.qr_data:
+                emit('qr_code', build_qr_payload(
+                    session_id, session.qr_data, 'Código QR REAL generado',
+                    rotation=session.qr_rotations,
+                    qr_age=round(time.monotonic() - session.qr_updated_at, 1) if session.qr_updated_at else None,
+                    is_real=True
+                ))
+            return
+        elif not session:
+            # La sesión vive en otro worker: reportar su estado sin lanzar Chrome
+            info = ws_manager.get_session_info(session_id)
+            if info:
+                join_room(session_id)
+                emit('status', build_status_payload(session_id, info))
+                return
         
         # Unirse a la room de la sesión
         join_room(session_id)
         
-        # Iniciar sesión REAL de WhatsApp Web
-        success = ws_manager.start_whatsapp_session(session_id)
-        
-        if not success:
+        if not ws_manager.get_session(session_id):
             emit('error', {
                 'type': 'error',
                 'message': 'Error iniciando sesión real de WhatsApp Web'
             })
+            return
+        
+        # Iniciar sesión REAL de WhatsApp Web (sujeta al control de admisión)
+        if not ws_manager.request_whatsapp_session(session_id):
+            emit('error', {
+                'type': 'error',
+                'message': 'Servidor saturado: demasiadas sesiones iniciándose, intenta de nuevo en unos minutos',
+                'retry': True
+            })
             
     except Exception as e:
         logger.error(f"Error en get_qr: {e}")
@@ -659,19 +1137,10 @@ def handle_get_status(data):
             })
             return
             
-        session = ws_manager.get_session(session_id)
+        info = ws_manager.get_session_info(session_id)
         
-        if session:
-            emit('status', {
-                'type': 'status',
-                'session_id': session_id,
-                'status': session['status'],
-                'authenticated': session.get('authenticated', False),
-                'created_at': session['created_at'].isoformat(),
-                'phone_number': session.get('phone_number'),
-                'message': f"Estado: {session['status']}",
-                'is_real': True
-            })
+        if info:
+            emit('status', build_status_payload(session_id, info))
         else:
             emit('error', {
                 'type': 'error',
@@ -708,7 +1177,7 @@ def handle_test_whatsapp(data):
             })
             return
             
-        if not session.get('authenticated', False):
+        if not session.authenticated:
             emit('error', {
                 'type': 'error',
                 'message': 'WhatsApp no está autenticado'
@@ -741,11 +1210,11 @@ def handle_test_whatsapp(data):
                 'message': 'Conexión WhatsApp REAL verificada',
                 'is_real': True,
                 'details': {
-                    'status': session['status'],
-                    'authenticated': session.get('authenticated', False),
-                    'phone_number': session.get('phone_number', 'No disponible'),
-                    'created_at': session['created_at'].isoformat(),
-                    'last_activity': session['last_activity'].isoformat()
+                    'status': session.status.label,
+                    'authenticated': session.authenticated,
+                    'phone_number': session.phone_number or 'No disponible',
+                    'created_at': session.created_datetime.isoformat(),
+                    'last_activity': session.last_activity_datetime.isoformat()
                 }
             })
             
@@ -896,10 +1365,21 @@ def api_health():
         'timestamp': datetime.now().isoformat(),
         'chrome_available': chrome_available,
         'active_sessions': len(ws_manager.sessions),
+        'launch_queue_depth': len(ws_manager.admission.queue),
         'uptime': 'running',
         'environment': 'railway' if os.getenv('RAILWAY_ENVIRONMENT') else 'local'
     }
 
+@app.route('/api/admission')
+def api_admission():
+    """API endpoint de la cola de lanzamientos de Chrome (para autoescalado)"""
+    return ws_manager.admission.stats()
+
+@app.route('/api/selectors')
+def api_selectors():
+    """API endpoint de aciertos y latencia por selector de detección"""
+    return selector_registry.stats()
+
 @app.route('/api/stats')
 def api_stats():
     """API endpoint para estadísticas"""
@@ -908,6 +1388,7 @@ def api_stats():
         'service': 'WhatsApp Web Real Server',
         'timestamp': datetime.now().isoformat(),
         'sessions': session_stats,
+        'performance': ws_manager.get_performance_stats(),
         'server_info': {
             'chrome_available': os.getenv('NO_CHROME_MODE') != 'true',
             'environment': 'railway' if os.getenv('RAILWAY_ENVIRONMENT') else 'local',
@@ -915,35 +1396,55 @@ def api_stats():
         }
     }
 
-# Tarea de limpieza periódica
-def cleanup_sessions():
-    """Limpiar sesiones inactivas"""
+# Expiración de sesiones inactivas
+def expire_sessions():
+    """Eliminar sesiones al vencer su deadline de inactividad (rueda de tiempo)"""
     while True:
         try:
-            time.sleep(300)  # Ejecutar cada 5 minutos
-            
-            current_time = datetime.now()
-            sessions_to_remove = []
+            time.sleep(EXPIRY_TICK)
             
-            for session_id, session in ws_manager.sessions.items():
-                # Eliminar sesiones inactivas por más de 2 horas
-                if (current_time - session['last_activity']).total_seconds() > 7200:
-                    sessions_to_remove.append(session_id)
-            
-            for session_id in sessions_to_remove:
+            expired = ws_manager.expiry.advance(time.monotonic())
+            for session_id in expired:
                 ws_manager.remove_session(session_id)
                 
-            if sessions_to_remove:
-                logger.info(f"Limpieza completada: {len(sessions_to_remove)} sesiones eliminadas")
+            if expired:
+                logger.info(f"Expiración completada: {len(expired)} sesiones eliminadas")
                 
         except Exception as e:
-            logger.error(f"Error en limpieza de sesiones: {e}")
+            logger.error(f"Error expirando sesiones: {e}")
+
+def start_background_tasks():
+    """Iniciar tareas de fondo (expiración, selectores, pool de drivers y snapshot de sesiones)"""
+    # Iniciar reaper de sesiones expiradas en hilo separado
+    expiry_thread = threading.Thread(target=expire_sessions)
+    expiry_thread.daemon = True
+    expiry_thread.start()
+    
+    # Suscripción de invalidaciones y publicación de estadísticas de este worker
+    ws_manager.store.start(ws_manager.get_local_session_stats)
+    
+    # Orden de selectores aprendido en ejecuciones anteriores
+    selector_registry.start()
+    
+    # Pool de CPU (renderizado de QR) listo antes de la primera petición
+    offload_thread = threading.Thread(target=offloader.start)
+    offload_thread.daemon = True
+    offload_thread.start()
+    
+    # Pre-lanzar drivers y reanudar sesiones guardadas solo si Chrome está disponible
+    if os.getenv('NO_CHROME_MODE') != 'true':
+        discover_browser_env()
+        ws_manager.ports.start()
+        ws_manager.admission.start()
+        # Con contextos multiplexados el pool de Chrome completos no aporta
+        if ws_manager.multiplexer.enabled:
+            ws_manager.start_context_sampling()
+        else:
+            ws_manager.driver_pool.start()
+        ws_manager.snapshotter.start()
 
 if __name__ == '__main__':
-    # Iniciar tarea de limpieza en hilo separado
-    cleanup_thread = threading.Thread(target=cleanup_sessions)
-    cleanup_thread.daemon = True
-    cleanup_thread.start()
+    start_background_tasks()
     
     logger.info(f"Iniciando servidor WebSocket REAL en {WS_HOST}:{WS_PORT}")
     logger.info(f"Debug: {DEBUG}")
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Planificador central de tareas periódicas por sesión
+Un hilo despachador con un heap de deadlines y un pool acotado de workers
+ejecutan los ticks de monitoreo y heartbeat de todas las sesiones, en
+lugar de un hilo dormido por sesión
+"""
+
+import os
+import time
+import heapq
+import logging
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from stats_utils import percentile
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', 8))
+
+
+class ScheduledTask:
+    """Tarea de una sesión; `generation` invalida las entradas viejas del heap"""
+
+    __slots__ = ('session_id', 'name', 'callback', 'due', 'generation', 'running', 'wake', 'cancelled')
+
+    def __init__(self, session_id, name, callback):
+        self.session_id = session_id
+        self.name = name
+        self.callback = callback
+        self.due = None
+        self.generation = 0
+        self.running = False
+        self.wake = False
+        self.cancelled = False
+
+
+class SessionScheduler:
+    """
+    Heap de tareas identificadas por (session_id, nombre).
+
+    El callback de una tarea retorna los segundos hasta su próximo tick, o
+    None para terminar. Una tarea nunca corre dos veces a la vez: `wake`
+    sobre una tarea en ejecución la adelanta al terminar el tick actual.
+
+    Los ticks bloquean un worker mientras dura su round trip a
+    chromedriver: la capacidad es workers / duración del tick, y al
+    superarla el jitter crece (ver benchmark_scheduler.py).
+    """
+
+    def __init__(self, workers=SCHEDULER_WORKERS):
+        self.workers = max(1, workers)
+        self.heap = []
+        self.tasks = {}  # (session_id, nombre) -> ScheduledTask
+        self.by_session = {}  # session_id -> {nombre}
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.executor = None
+        self.running = False
+
+        # Métricas
+        self.executed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.jitter = deque(maxlen=1000)
+
+    def start(self):
+        """Arrancar el despachador (idempotente; schedule lo llama si hace falta)"""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scheduler')
+        thread = threading.Thread(target=self._run, name="session-scheduler")
+        thread.daemon = True
+        thread.start()
+        logger.info(f"⏱️ Planificador de sesiones iniciado ({self.workers} workers)")
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _push(self, task, delay):
+        task.generation += 1
+        task.due = time.monotonic() + max(0.0, delay)
+        heapq.heappush(self.heap, (task.due, next(self.sequence), task, task.generation))
+        self.condition.notify()
+
+    def _discard(self, task):
+        key = (task.session_id, task.name)
+        if self.tasks.get(key) is task:
+            del self.tasks[key]
+            names = self.by_session.get(task.session_id)
+            if names is not None:
+                names.discard(task.name)
+                if not names:
+                    del self.by_session[task.session_id]
+
+    def schedule(self, session_id, name, delay, callback):
+        """Programar callback() dentro de `delay` segundos; reemplaza la tarea del mismo nombre"""
+        if not self.running:
+            self.start()
+        with self.condition:
+            previous = self.tasks.get((session_id, name))
+            if previous is not None:
+                previous.cancelled = True
+            task = ScheduledTask(session_id, name, callback)
+            self.tasks[(session_id, name)] = task
+            self.by_session.setdefault(session_id, set()).add(name)
+            self._push(task, delay)
+        return task
+
+    def wake(self, session_id, name):
+        """Adelantar el próximo tick de una tarea a ahora"""
+        with self.condition:
+            task = self.tasks.get((session_id, name))
+            if task is None:
+                return False
+            if task.running:
+                task.wake = True
+            else:
+                self._push(task, 0)
+            return True
+
+    def cancel(self, session_id, name=None):
+        """Cancelar una tarea, o todas las de la sesión si no se indica nombre"""
+        with self.condition:
+            names = [name] if name else list(self.by_session.get(session_id, ()))
+            count = 0
+            for task_name in names:
+                task = self.tasks.get((session_id, task_name))
+                if task is None:
+                    continue
+                task.cancelled = True
+                self._discard(task)
+                count += 1
+            self.cancelled += count
+            return count
+
+    def is_scheduled(self, session_id, name):
+        with self.condition:
+            return (session_id, name) in self.tasks
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running:
+                    # Descartar entradas obsoletas (reprogramadas o canceladas)
+                    while self.heap and (self.heap[0][2].cancelled or self.heap[0][3] != self.heap[0][2].generation):
+                        heapq.heappop(self.heap)
+                    if not self.heap:
+                        self.condition.wait()
+                        continue
+                    wait = self.heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self.condition.wait(wait)
+                if not self.running:
+                    return
+                due, _, task, _ = heapq.heappop(self.heap)
+                task.running = True
+            try:
+                self.executor.submit(self._execute, task, due)
+            except RuntimeError:
+                # Executor cerrado por stop()
+                return
+
+    def _execute(self, task, due):
+        started = time.monotonic()
+        delay = None
+        failed = False
+        try:
+            delay = task.callback()
+        except Exception as e:
+            failed = True
+            logger.error(f"Error en tarea {task.name} de sesión {task.session_id}: {e}")
+
+        with self.condition:
+            self.jitter.append(started - due)
+            if failed:
+                self.failed += 1
+            else:
+                self.executed += 1
+            task.running = False
+            if task.cancelled:
+                return
+            if task.wake:
+                task.wake = False
+                delay = 0 if delay is not None else None
+            if delay is None:
+                self._discard(task)
+            else:
+                self._push(task, delay)
+
+    def stats(self):
+        with self.condition:
+            jitter = list(self.jitter)
+            by_name = {}
+            for _, name in self.tasks:
+                by_name[name] = by_name.get(name, 0) + 1
+            return {
+                'workers': self.workers,
+                'sessions': len(self.by_session),
+                'tasks': by_name,
+                'heap_size': len(self.heap),
+                'executed': self.executed,
+                'failed': self.failed,
+                'cancelled': self.cancelled,
+                'jitter_p50': percentile(jitter, 50),
+                'jitter_p99': percentile(jitter, 99)
+            }
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Registro de selectores con estadísticas de aciertos
+Cada grupo de selectores (interfaz principal, QR, menú...) se prueba en el
+orden de mayor tasa de aciertos observada; las estadísticas se guardan en
+disco para sobrevivir reinicios y exponen los selectores que dejaron de
+coincidir cuando WhatsApp Web cambia su DOM
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+from file_utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+SELECTOR_STATS_PATH = os.getenv('SELECTOR_STATS_PATH', '/tmp/whatsapp_selectors.json')
+SELECTOR_STATS_INTERVAL = float(os.getenv('SELECTOR_STATS_INTERVAL', 60))
+SELECTOR_STATS_WINDOW = int(os.getenv('SELECTOR_STATS_WINDOW', 1000))
+SELECTOR_STALE_PROBES = int(os.getenv('SELECTOR_STALE_PROBES', 200))
+SELECTOR_FULL_SCAN_EVERY = int(os.getenv('SELECTOR_FULL_SCAN_EVERY', 20))  # 0 = nunca
+
+SELECTOR_STATS_VERSION = 1
+
+
+class SelectorStats:
+    """Contadores de un selector; al llegar a la ventana se reducen a la mitad para olvidar lo antiguo"""
+
+    __slots__ = ('probes', 'hits', 'total_ms', 'last_hit_at')
+
+    def __init__(self, probes=0, hits=0, total_ms=0.0, last_hit_at=None):
+        self.probes = probes
+        self.hits = hits
+        self.total_ms = total_ms
+        self.last_hit_at = last_hit_at
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def add(self, hit, ms, window):
+        self.probes += 1
+        self.total_ms += ms
+        if hit:
+            self.hits += 1
+            self.last_hit_at = time.time()
+        if self.probes >= window:
+            self.probes //= 2
+            self.hits //= 2
+            self.total_ms /= 2
+
+    def report(self):
+        """Vista para la API: contadores, tasa de aciertos y latencia media"""
+        return {
+            'probes': self.probes,
+            'hits': self.hits,
+            'hit_rate': round(self.hit_rate, 4),
+            'avg_ms': round(self.total_ms / self.probes, 4) if self.probes else None,
+            'last_hit_at': self.last_hit_at
+        }
+
+    def to_dict(self):
+        return {
+            'probes': self.probes,
+            'hits': self.hits,
+            'total_ms': round(self.total_ms, 3),
+            'last_hit_at': self.last_hit_at
+        }
+
+
+class SelectorRegistry:
+    """
+    Grupos de selectores ordenados por tasa de aciertos.
+
+    `ordered(group)` da el orden vigente (empates en el orden original);
+    `record(selectors, probes)` recibe las listas enviadas a la página y
+    el resultado de sondearlas: por grupo, el índice del primero que
+    coincidió (-1 si ninguno), los índices de todos los que coincidieron y
+    los milisegundos de cada querySelector evaluado.
+
+    El clasificador se detiene en el primer acierto, así que un selector
+    que coincide siempre detrás de otro nunca sumaría aciertos: cada
+    `full_scan_every` sondeos evalúa la lista completa y acredita a todos.
+    """
+
+    def __init__(self, groups, path=SELECTOR_STATS_PATH, interval=SELECTOR_STATS_INTERVAL,
+                 window=SELECTOR_STATS_WINDOW, full_scan_every=SELECTOR_FULL_SCAN_EVERY):
+        self.groups = {name: tuple(selectors) for name, selectors in groups.items()}
+        self.path = path
+        self.interval = interval
+        self.window = max(2, window)
+        self.full_scan_every = max(0, full_scan_every)
+        self.lock = threading.Lock()
+        self.running = False
+        self.dirty = False
+        self.order = dict(self.groups)
+        self.stats_by_group = {
+            name: {selector: SelectorStats() for selector in selectors}
+            for name, selectors in self.groups.items()
+        }
+
+        # Métricas
+        self.records = 0
+        self.reorders = 0
+        self.writes = 0
+        self.loaded = 0
+
+    def ordered(self, group):
+        """Selectores del grupo, los de mayor tasa de aciertos primero"""
+        return list(self.order[group])
+
+    def _reorder(self, group):
+        defaults = self.groups[group]
+        stats = self.stats_by_group[group]
+        order = tuple(sorted(defaults, key=lambda s: -stats[s].hit_rate))
+        if order != self.order[group]:
+            self.order[group] = order
+            self.reorders += 1
+            logger.info(f"🔀 Selectores '{group}' reordenados: {order[0]} primero")
+
+    def record(self, selectors, probes):
+        """Registrar el resultado de un sondeo de classifyPage"""
+        if not probes:
+            return
+        with self.lock:
+            self.records += 1
+            for group, probe in probes.items():
+                stats = self.stats_by_group.get(group)
+                sent = selectors.get(group)
+                if stats is None or not sent:
+                    continue
+                hits = set(probe.get('hits') or (probe.get('hit', -1),))
+                for index, ms in enumerate(probe.get('ms', ())):
+                    if index >= len(sent):
+                        break
+                    # Selectores personalizados (fuera del registro) no se contabilizan
+                    stat = stats.get(sent[index])
+                    if stat is not None:
+                        stat.add(index in hits, ms, self.window)
+                self._reorder(group)
+            self.dirty = True
+
+    def start(self):
+        """Cargar las estadísticas guardadas y luego guardarlas periódicamente, en un hilo propio"""
+        if self.running:
+            return
+        self.load()
+        self.running = True
+        thread = threading.Thread(target=self._run, name="selector-registry")
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        while self.running:
+            time.sleep(self.interval)
+            try:
+                self.save()
+            except Exception as e:
+                logger.error(f"Error guardando estadísticas de selectores: {e}")
+
+    def load(self):
+        """Cargar estadísticas de disco; los selectores que ya no existen se descartan"""
+        try:
+            with open(self.path, 'rb') as f:
+                payload = json.loads(f.read())
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Estadísticas de selectores ilegibles ({self.path}): {e}")
+            return 0
+        if payload.get('version') != SELECTOR_STATS_VERSION:
+            logger.warning(f"⚠️ Versión de estadísticas de selectores no soportada: {payload.get('version')}")
+            return 0
+
+        loaded = 0
+        with self.lock:
+            for group, saved in payload.get('groups', {}).items():
+                stats = self.stats_by_group.get(group)
+                if stats is None:
+                    continue
+                for selector, values in saved.items():
+                    if selector in stats:
+                        stats[selector] = SelectorStats(**values)
+                        loaded += 1
+                self._reorder(group)
+            self.loaded = loaded
+        logger.info(f"📂 Estadísticas de {loaded} selectores cargadas desde {self.path}")
+        return loaded
+
+    def save(self):
+        """Escribir las estadísticas si cambiaron desde la última vez"""
+        with self.lock:
+            if not self.dirty:
+                return False
+            groups = {
+                group: {selector: stat.to_dict() for selector, stat in stats.items()}
+                for group, stats in self.stats_by_group.items()
+            }
+            self.dirty = False
+        payload = {'version': SELECTOR_STATS_VERSION, 'written_at': round(time.time(), 3), 'groups': groups}
+        atomic_write(self.path, json.dumps(payload, separators=(',', ':')).encode())
+        self.writes += 1
+        return True
+
+    def stale(self):
+        """Selectores sondeados al menos SELECTOR_STALE_PROBES veces sin ningún acierto"""
+        with self.lock:
+            return [
+                f"{group}:{selector}"
+                for group, stats in self.stats_by_group.items()
+                for selector, stat in stats.items()
+                if stat.probes >= SELECTOR_STALE_PROBES and not stat.hits
+            ]
+
+    def stats(self):
+        """Estadísticas por selector, en el orden vigente de cada grupo"""
+        with self.lock:
+            groups = {}
+            for group, order in self.order.items():
+                stats = self.stats_by_group[group]
+                groups[group] = [{'selector': selector, **stats[selector].report()} for selector in order]
+        return {
+            'path': self.path,
+            'records': self.records,
+            'reorders': self.reorders,
+            'writes': self.writes,
+            'loaded': self.loaded,
+            'stale': self.stale(),
+            'groups': groups
+        }
+
+    def summary(self):
+        """Resumen para /api/stats (sin el detalle por selector)"""
+        with self.lock:
+            records, reorders, writes = self.records, self.reorders, self.writes
+        return {
+            'records': records,
+            'reorders': reorders,
+            'writes': writes,
+            'stale': self.stale()
+        }
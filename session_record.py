@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Registro compacto de sesión de WhatsApp Web
+Session con __slots__, estados como enteros y timestamps monotónicos
+"""
+
+import time
+from enum import IntEnum
+from datetime import datetime
+
+# Desfase entre el reloj monotónico y el reloj de pared, para mostrar fechas
+_WALL_OFFSET = time.time() - time.monotonic()
+
+
+def monotonic_to_wall(timestamp):
+    """Convertir un timestamp de time.monotonic() a segundos epoch"""
+    return timestamp + _WALL_OFFSET
+
+
+def wall_to_monotonic(timestamp):
+    """Convertir segundos epoch (p. ej. de otro proceso) a time.monotonic() local"""
+    return timestamp - _WALL_OFFSET
+
+
+def monotonic_to_datetime(timestamp):
+    """Convertir un timestamp de time.monotonic() a datetime local"""
+    return datetime.fromtimestamp(monotonic_to_wall(timestamp))
+
+
+class SessionStatus(IntEnum):
+    """Estados de una sesión"""
+
+    PENDING = 0
+    CONNECTING = 1
+    QR_READY = 2
+    AUTHENTICATED = 3
+    QR_EXPIRED = 4
+    DISCONNECTED = 5
+
+    @property
+    def label(self):
+        """Nombre del estado tal como lo reciben los clientes ('qr_ready', ...)"""
+        return self.name.lower()
+
+
+class Session:
+    """Sesión de WhatsApp Web; los campos son fijos, no se aceptan claves libres"""
+
+    __slots__ = (
+        'session_id',
+        'client_id',
+        'tenant',
+        'status',
+        'created_at',
+        'last_activity',
+        'authenticated',
+        'qr_code',
+        'qr_data',
+        'qr_updated_at',
+        'qr_rotations',
+        'driver',
+        'user_data_dir',
+        'debug_port',
+        'watcher',
+        'page_state',
+        'phone_number',
+        'auth_selector',
+        'auth_detection_time'
+    )
+
+    def __init__(self, session_id, client_id, status=SessionStatus.PENDING, tenant=None):
+        now = time.monotonic()
+        self.session_id = session_id
+        self.client_id = client_id
+        self.tenant = tenant
+        self.status = status
+        self.created_at = now
+        self.last_activity = now
+        self.authenticated = False
+        self.qr_code = None
+        self.qr_data = None
+        self.qr_updated_at = None
+        self.qr_rotations = 0
+        self.driver = None
+        self.user_data_dir = None
+        self.debug_port = None
+        self.watcher = None
+        self.page_state = None
+        self.phone_number = None
+        self.auth_selector = None
+        self.auth_detection_time = None
+
+    def update(self, **fields):
+        """Asignar campos; un nombre desconocido lanza AttributeError"""
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def touch(self):
+        """Marcar actividad"""
+        self.last_activity = time.monotonic()
+
+    def idle_seconds(self, now=None):
+        """Segundos desde la última actividad"""
+        return (now if now is not None else time.monotonic()) - self.last_activity
+
+    @property
+    def created_datetime(self):
+        return monotonic_to_datetime(self.created_at)
+
+    @property
+    def last_activity_datetime(self):
+        return monotonic_to_datetime(self.last_activity)
+
+    def to_dict(self):
+        """Representación serializable (sin driver ni watcher) para eventos y APIs"""
+        return {
+            'session_id': self.session_id,
+            'client_id': self.client_id,
+            'tenant': self.tenant,
+            'status': self.status.label,
+            'authenticated': self.authenticated,
+            'phone_number': self.phone_number,
+            'page_state': self.page_state,
+            'created_at': self.created_datetime.isoformat(),
+            'last_activity': self.last_activity_datetime.isoformat()
+        }
+
+    def __repr__(self):
+        return f"<Session {self.session_id} {self.status.label}>"
+
+
+def count_by_status(sessions):
+    """Contar sesiones por estado en una sola pasada (comparaciones enteras)"""
+    counts = [0] * len(SessionStatus)
+    authenticated = 0
+    for session in sessions:
+        counts[session.status] += 1
+        if session.authenticated:
+            authenticated += 1
+    return counts, authenticated
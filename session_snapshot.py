@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Snapshot de sesiones para reinicio rápido
+Guarda periódicamente las sesiones autenticadas y su directorio de perfil
+de Chrome; al arrancar relanza Chrome sobre esos perfiles en paralelo
+"""
+
+import os
+import json
+import time
+import signal
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from driver_reaper import find_processes_with_arg
+from file_utils import atomic_write
+from session_record import SessionStatus, monotonic_to_wall
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', '/tmp/whatsapp_sessions.snapshot')
+SNAPSHOT_INTERVAL = float(os.getenv('SNAPSHOT_INTERVAL', 15))
+SNAPSHOT_RESTORE_WORKERS = int(os.getenv('SNAPSHOT_RESTORE_WORKERS', 4))
+SNAPSHOT_RESTORE_RETRY = float(os.getenv('SNAPSHOT_RESTORE_RETRY', 1.0))  # Espera si la cola de admisión está llena
+
+SNAPSHOT_VERSION = 1
+
+# Archivos de bloqueo que deja un Chrome que no cerró limpio
+PROFILE_LOCK_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie')
+
+
+def snapshot_entry(session):
+    """Datos necesarios para reanudar una sesión, o None si no se puede reanudar"""
+    if session.status != SessionStatus.AUTHENTICATED or not session.user_data_dir:
+        return None
+    return {
+        'session_id': session.session_id,
+        'client_id': session.client_id,
+        'tenant': session.tenant,
+        'phone_number': session.phone_number,
+        'user_data_dir': session.user_data_dir,
+        'created_at': round(monotonic_to_wall(session.created_at), 3)
+    }
+
+
+def encode_snapshot(entries):
+    """Serializar el snapshot en JSON compacto"""
+    payload = {'version': SNAPSHOT_VERSION, 'written_at': round(time.time(), 3), 'sessions': entries}
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+def read_snapshot(path):
+    """Leer las entradas de un snapshot; lista vacía si no existe o es inválido"""
+    try:
+        with open(path, 'rb') as f:
+            payload = json.loads(f.read())
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as e:
+        logger.error(f"❌ Snapshot de sesiones ilegible ({path}): {e}")
+        return []
+    if payload.get('version') != SNAPSHOT_VERSION:
+        logger.warning(f"⚠️ Versión de snapshot no soportada: {payload.get('version')}")
+        return []
+    return payload.get('sessions', [])
+
+
+def release_profile(user_data_dir):
+    """Matar procesos que aún usan el perfil y quitar sus archivos de bloqueo"""
+    for pid in find_processes_with_arg(f"--user-data-dir={user_data_dir}"):
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    for name in PROFILE_LOCK_FILES:
+        try:
+            os.unlink(os.path.join(user_data_dir, name))
+        except OSError:
+            pass
+
+
+class SessionSnapshotter:
+    """
+    Restaura el snapshot anterior al arrancar y luego lo reescribe cada
+    `interval` segundos, solo cuando cambió el conjunto de sesiones.
+
+    `restore_session(entry)` relanza Chrome sobre el perfil de la entrada y
+    retorna True si la sesión volvió autenticada. Con un AdmissionController
+    cada relanzamiento pasa por su cola, como cualquier otro Chrome.
+    """
+
+    def __init__(self, table, restore_session, path=SNAPSHOT_PATH,
+                 interval=SNAPSHOT_INTERVAL, workers=SNAPSHOT_RESTORE_WORKERS, admission=None):
+        self.table = table
+        self.restore_session = restore_session
+        self.admission = admission
+        self.path = path
+        self.interval = interval
+        self.workers = max(1, workers)
+        self.running = False
+        self.last_data = None
+
+        # Métricas
+        self.writes = 0
+        self.last_write_entries = 0
+        self.last_write_time = None
+        self.restore_stats = None
+
+    def start(self):
+        """Restaurar y luego guardar periódicamente, en un hilo propio"""
+        if self.running:
+            return
+        self.running = True
+        thread = threading.Thread(target=self._run, name="session-snapshot")
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        # Restaurar antes de la primera escritura para no pisar el snapshot previo
+        try:
+            self.restore()
+        except Exception as e:
+            logger.error(f"Error restaurando snapshot de sesiones: {e}")
+
+        while self.running:
+            time.sleep(self.interval)
+            try:
+                self.write()
+            except Exception as e:
+                logger.error(f"Error escribiendo snapshot de sesiones: {e}")
+
+    def write(self):
+        """Escribir el snapshot si cambió desde la última vez"""
+        entries = [entry for entry in map(snapshot_entry, self.table.values()) if entry]
+        entries.sort(key=lambda entry: entry['session_id'])
+        # Comparar sin la marca de tiempo de escritura
+        content = json.dumps(entries, separators=(',', ':'))
+        if content == self.last_data:
+            return False
+
+        started = time.monotonic()
+        data = encode_snapshot(entries)
+        atomic_write(self.path, data)
+        self.last_data = content
+        self.writes += 1
+        self.last_write_entries = len(entries)
+        self.last_write_time = round(time.monotonic() - started, 4)
+        logger.info(f"💾 Snapshot guardado: {len(entries)} sesiones ({len(data)} bytes)")
+        return True
+
+    def restore(self):
+        """Relanzar en paralelo las sesiones del snapshot anterior"""
+        entries = [entry for entry in read_snapshot(self.path)
+                   if entry.get('user_data_dir') and os.path.isdir(entry['user_data_dir'])]
+        if not entries:
+            self.restore_stats = {'attempted': 0, 'restored': 0, 'failed': 0, 'recovery_time': 0.0}
+            return self.restore_stats
+
+        logger.info(f"♻️ Restaurando {len(entries)} sesiones desde {self.path}")
+        started = time.monotonic()
+        durations = []
+
+        def relaunch(entry):
+            entry_started = time.monotonic()
+            try:
+                release_profile(entry['user_data_dir'])
+                restored = bool(self.restore_session(entry))
+            except Exception as e:
+                logger.error(f"Error restaurando sesión {entry.get('session_id')}: {e}")
+                restored = False
+            durations.append(time.monotonic() - entry_started)
+            return restored
+
+        def restore_one(entry):
+            if self.admission is None:
+                return relaunch(entry)
+            future = Future()
+            # Cola llena (o cupo del cliente agotado): reintentar hasta entrar
+            while self.admission.submit(
+                f"restore-{entry['session_id']}", 'session-restore',
+                lambda: future.set_result(relaunch(entry))
+            ) is None:
+                time.sleep(SNAPSHOT_RESTORE_RETRY)
+            return future.result()
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(entries))) as executor:
+            results = list(executor.map(restore_one, entries))
+
+        restored = sum(results)
+        self.restore_stats = {
+            'attempted': len(entries),
+            'restored': restored,
+            'failed': len(entries) - restored,
+            'recovery_time': round(time.monotonic() - started, 3),
+            'slowest_session': round(max(durations), 3) if durations else None
+        }
+        logger.info(
+            f"✅ Restauración completada: {restored}/{len(entries)} sesiones "
+            f"en {self.restore_stats['recovery_time']}s"
+        )
+        return self.restore_stats
+
+    def stats(self):
+        """Métricas de snapshot y de la última restauración"""
+        return {
+            'path': self.path,
+            'writes': self.writes,
+            'last_write_entries': self.last_write_entries,
+            'last_write_time': self.last_write_time,
+            'restore': self.restore_stats
+        }
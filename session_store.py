@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Almacén de sesiones compartido entre procesos
+InMemorySessionStore para un solo worker y RedisSessionStore para varios,
+con caché local de lectura invalidada por pub/sub
+"""
+
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from collections import OrderedDict
+
+from session_record import monotonic_to_wall
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+SESSION_STORE = os.getenv('SESSION_STORE', 'memory').lower()
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+SESSION_CACHE_SIZE = int(os.getenv('SESSION_CACHE_SIZE', 10000))
+STATS_PUBLISH_INTERVAL = float(os.getenv('STATS_PUBLISH_INTERVAL', 5))
+SESSION_STORE_WRITE_INTERVAL = float(os.getenv('SESSION_STORE_WRITE_INTERVAL', 10))  # Escrituras de solo actividad
+
+# Identificador de este proceso dentro del cluster
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def serialize_session(session, owner=WORKER_ID):
+    """Vista compartible de una sesión (sin driver ni objetos locales)"""
+    record = session.to_dict()
+    record['qr_data'] = session.qr_data
+    record['qr_updated_at'] = monotonic_to_wall(session.qr_updated_at) if session.qr_updated_at else None
+    record['qr_rotations'] = session.qr_rotations
+    record['owner'] = owner
+    return record
+
+
+def _content(record):
+    """Contenido de un registro sin la última actividad, para detectar escrituras de solo heartbeat"""
+    return json.dumps({k: v for k, v in record.items() if k != 'last_activity'}, sort_keys=True)
+
+
+def sum_stats(stats_list):
+    """Sumar los contadores numéricos de varias estadísticas"""
+    total = {}
+    for stats in stats_list:
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                total[key] = total.get(key, 0) + value
+    return total
+
+
+class InMemorySessionStore:
+    """Almacén local: la tabla de sesiones del proceso es la fuente de verdad"""
+
+    backend = 'memory'
+
+    def __init__(self, table, worker_id=WORKER_ID):
+        self.table = table
+        self.worker_id = worker_id
+
+    def start(self, stats_provider=None):
+        pass
+
+    def save(self, session):
+        pass
+
+    def delete(self, session_id):
+        pass
+
+    def flush(self):
+        return 0
+
+    def load(self, session_id):
+        session = self.table.get(session_id)
+        return serialize_session(session, self.worker_id) if session is not None else None
+
+    def cluster_stats(self, local_stats):
+        return local_stats
+
+    def stats(self):
+        return {'backend': self.backend, 'worker_id': self.worker_id}
+
+
+class RedisSessionStore:
+    """
+    Sesiones serializadas como JSON en Redis, con caché local de lectura.
+
+    Cada escritura publica el session_id en un canal; los demás procesos lo
+    quitan de su caché. Mientras la suscripción no está activa no se cachea
+    nada, así nunca se sirve un dato que no se pueda invalidar. Una lectura
+    que coincide con una invalidación de la misma sesión no se cachea.
+
+    Una escritura que solo cambia la última actividad (p. ej. un heartbeat)
+    se difiere: se escribe como mucho una vez cada `write_interval`, junto
+    con las demás pendientes. Cualquier otro cambio se escribe de inmediato.
+    """
+
+    backend = 'redis'
+
+    def __init__(self, client, ttl, prefix='whatsapp:', cache_size=SESSION_CACHE_SIZE,
+                 stats_interval=STATS_PUBLISH_INTERVAL, worker_id=WORKER_ID,
+                 write_interval=SESSION_STORE_WRITE_INTERVAL):
+        self.client = client
+        self.worker_id = worker_id
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self.channel = f"{prefix}invalidate"
+        self.workers_key = f"{prefix}workers"
+        self.cache_size = cache_size
+        self.stats_interval = stats_interval
+        self.write_interval = write_interval
+
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.reads = {}  # session_id -> [lecturas en curso, invalidaciones durante ellas]
+        self.written = {}  # session_id -> (contenido sin last_activity, momento de la escritura)
+        self.pending = {}  # session_id -> registro diferido
+        self.write_lock = threading.Lock()  # Un registro diferido no pisa uno más nuevo
+        self.subscribed = threading.Event()
+        self.running = False
+        self.stats_provider = None
+        self.cluster_cache = (0.0, {})
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.writes = 0
+        self.coalesced = 0
+
+    def _key(self, session_id):
+        return f"{self.prefix}session:{session_id}"
+
+    def start(self, stats_provider=None):
+        """Iniciar suscripción de invalidaciones y publicación de estadísticas"""
+        if self.running:
+            return
+        self.running = True
+        self.stats_provider = stats_provider
+        for target in (self._listen, self._publish_stats, self._flush_pending):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+        logger.info(f"🗄️ Almacén de sesiones Redis iniciado (worker {self.worker_id})")
+
+    def stop(self):
+        """Detener los hilos y escribir lo que quedó diferido"""
+        self.running = False
+        self.flush()
+
+    def save(self, session):
+        """
+        Escribir la sesión y avisar a los demás procesos. Retorna False si
+        se difirió (solo cambió la última actividad y se escribió hace poco).
+        """
+        record = serialize_session(session, self.worker_id)
+        session_id = session.session_id
+        content = _content(record)
+        now = time.monotonic()
+        with self.write_lock:
+            with self.lock:
+                last = self.written.get(session_id)
+                if last is not None and last[0] == content and now - last[1] < self.write_interval:
+                    self.pending[session_id] = record
+                    self.coalesced += 1
+                    return False
+                self.pending.pop(session_id, None)
+                self.written[session_id] = (content, now)
+            self._write({session_id: record})
+        return True
+
+    def flush(self):
+        """Escribir las sesiones diferidas; retorna cuántas"""
+        with self.write_lock:
+            with self.lock:
+                records, self.pending = self.pending, {}
+                now = time.monotonic()
+                for session_id, record in records.items():
+                    content = _content(record)
+                    self.written[session_id] = (content, now)
+            if records:
+                self._write(records)
+        return len(records)
+
+    def _write(self, records):
+        """SET + aviso de invalidación de varias sesiones en un solo round trip"""
+        with self.lock:
+            generations = {session_id: self._begin_read(session_id) for session_id in records}
+        try:
+            pipe = self.client.pipeline()
+            for session_id, record in records.items():
+                pipe.set(self._key(session_id), json.dumps(record), ex=self.ttl)
+                pipe.publish(self.channel, f"{self.worker_id} {session_id}")
+            pipe.execute()
+        except Exception:
+            with self.lock:
+                for session_id in records:
+                    self._end_read(session_id)
+            raise
+        with self.lock:
+            self.writes += len(records)
+            for session_id, record in records.items():
+                self._cache_put(session_id, record, generations[session_id])
+
+    def delete(self, session_id):
+        """Eliminar la sesión y avisar a los demás procesos"""
+        with self.write_lock:
+            with self.lock:
+                self.pending.pop(session_id, None)
+                self.written.pop(session_id, None)
+            pipe = self.client.pipeline()
+            pipe.delete(self._key(session_id))
+            pipe.publish(self.channel, f"{self.worker_id} {session_id}")
+            pipe.execute()
+        with self.lock:
+            self.cache.pop(session_id, None)
+
+    def load(self, session_id):
+        """Leer una sesión: caché local primero, Redis en caso de fallo"""
+        with self.lock:
+            record = self.cache.get(session_id)
+            if record is not None:
+                self.cache.move_to_end(session_id)
+                self.hits += 1
+                return record
+            self.misses += 1
+            generation = self._begin_read(session_id)
+
+        try:
+            raw = self.client.get(self._key(session_id))
+        except Exception:
+            with self.lock:
+                self._end_read(session_id)
+            raise
+        record = json.loads(raw) if raw is not None else None
+        with self.lock:
+            self._cache_put(session_id, record, generation)
+        return record
+
+    def _begin_read(self, session_id):
+        """Registrar una lectura de Redis en curso; retorna la generación de la sesión (con lock)"""
+        entry = self.reads.get(session_id)
+        if entry is None:
+            entry = self.reads[session_id] = [0, 0]
+        entry[0] += 1
+        return entry[1]
+
+    def _end_read(self, session_id):
+        """Cerrar una lectura; retorna la generación actual (con lock)"""
+        entry = self.reads[session_id]
+        entry[0] -= 1
+        if not entry[0]:
+            del self.reads[session_id]
+        return entry[1]
+
+    def _cache_put(self, session_id, record, generation):
+        """Cachear lo leído o escrito, salvo que la sesión se invalidara entretanto (con lock)"""
+        if self._end_read(session_id) != generation or record is None:
+            return
+        if not self.subscribed.is_set():
+            return
+        self.cache[session_id] = record
+        self.cache.move_to_end(session_id)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _invalidate(self, session_id=None):
+        """Quitar una sesión de la caché (o todas) y descartar sus lecturas en curso (con lock)"""
+        if session_id is None:
+            self.cache.clear()
+            entries = self.reads.values()
+        else:
+            self.cache.pop(session_id, None)
+            entry = self.reads.get(session_id)
+            entries = (entry,) if entry is not None else ()
+        for entry in entries:
+            entry[1] += 1
+
+    def _listen(self):
+        """Recibir invalidaciones; si la conexión cae, vaciar la caché y reintentar"""
+        while self.running:
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self.subscribed.set()
+                while self.running:
+                    message = pubsub.get_message(timeout=1.0)
+                    if not message:
+                        continue
+                    data = message['data']
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    origin, _, session_id = data.partition(' ')
+                    if origin == self.worker_id:
+                        continue
+                    with self.lock:
+                        self._invalidate(session_id)
+                        self.invalidations += 1
+            except Exception as e:
+                logger.error(f"Error en suscripción de invalidaciones: {e}")
+            finally:
+                # Sin suscripción se pudieron perder avisos: nada cacheado es confiable
+                self.subscribed.clear()
+                with self.lock:
+                    self._invalidate()
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            if self.running:
+                time.sleep(1)
+
+    def _flush_pending(self):
+        """Escribir periódicamente las sesiones diferidas"""
+        while self.running:
+            time.sleep(self.write_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error escribiendo sesiones diferidas: {e}")
+
+    def _publish_stats(self):
+        """Publicar periódicamente las estadísticas locales de este worker"""
+        while self.running:
+            try:
+                if self.stats_provider is not None:
+                    payload = json.dumps({'ts': time.time(), 'stats': self.stats_provider()})
+                    self.client.hset(self.workers_key, self.worker_id, payload)
+            except Exception as e:
+                logger.error(f"Error publicando estadísticas del worker: {e}")
+            time.sleep(self.stats_interval)
+
+    def cluster_stats(self, local_stats):
+        """Estadísticas sumadas de todos los workers vivos (cacheadas brevemente)"""
+        now = time.time()
+        fetched_at, workers = self.cluster_cache
+        if now - fetched_at > 1.0:
+            try:
+                workers = {}
+                for worker_id, raw in self.client.hgetall(self.workers_key).items():
+                    if isinstance(worker_id, bytes):
+                        worker_id = worker_id.decode()
+                    entry = json.loads(raw)
+                    # Ignorar workers que dejaron de publicar
+                    if now - entry['ts'] <= 3 * self.stats_interval:
+                        workers[worker_id] = entry['stats']
+                self.cluster_cache = (now, workers)
+            except Exception as e:
+                logger.error(f"Error leyendo estadísticas del cluster: {e}")
+                return local_stats
+
+        workers = dict(workers)
+        workers[self.worker_id] = local_stats
+        total = sum_stats(workers.values())
+        total['workers'] = len(workers)
+        return total
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.backend,
+                'worker_id': self.worker_id,
+                'cached': len(self.cache),
+                'cache_hits': self.hits,
+                'cache_misses': self.misses,
+                'cache_hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'invalidations': self.invalidations,
+                'writes': self.writes,
+                'coalesced': self.coalesced,
+                'pending': len(self.pending),
+                'subscribed': self.subscribed.is_set()
+            }
+
+
+def create_session_store(table, ttl):
+    """Crear el almacén configurado por SESSION_STORE ('memory' o 'redis')"""
+    if SESSION_STORE == 'redis':
+        if not REDIS_AVAILABLE:
+            logger.warning("⚠️ redis no instalado, usando almacén de sesiones en memoria")
+        else:
+            return RedisSessionStore(redis.Redis.from_url(REDIS_URL), ttl)
+    return InMemorySessionStore(table)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Tabla de sesiones particionada (lock striping)
+Cada shard tiene su propio lock, índice por cliente y contadores por estado
+"""
+
+import os
+import threading
+
+# Configuración
+SESSION_SHARDS = int(os.getenv('SESSION_SHARDS', 16))
+
+
+class _Shard:
+    """Partición de la tabla: sesiones + contadores, protegidos por un lock"""
+
+    __slots__ = ('lock', 'sessions', 'status_counts', 'authenticated')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.status_counts = {}
+        self.authenticated = 0
+
+    def count_status(self, status, delta):
+        """Ajustar el contador de un estado (llamar con el lock tomado)"""
+        count = self.status_counts.get(status, 0) + delta
+        if count:
+            self.status_counts[status] = count
+        else:
+            self.status_counts.pop(status, None)
+
+
+class _ClientShard:
+    """Partición del índice client_id -> set(session_id)"""
+
+    __slots__ = ('lock', 'index')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = {}
+
+
+class ShardedSessionTable:
+    """
+    Tabla de sesiones con locks por shard.
+
+    Las lecturas puntuales (get, len, in) no toman lock: dict.get es atómico
+    en CPython y las sesiones solo se insertan/eliminan bajo el lock del shard.
+    Orden de locks: shard de sesión -> shard de cliente.
+    """
+
+    def __init__(self, num_shards=SESSION_SHARDS):
+        self.num_shards = max(1, num_shards)
+        self.shards = [_Shard() for _ in range(self.num_shards)]
+        self.client_shards = [_ClientShard() for _ in range(self.num_shards)]
+
+    def _shard(self, session_id):
+        return self.shards[hash(session_id) % self.num_shards]
+
+    def _client_shard(self, client_id):
+        return self.client_shards[hash(client_id) % self.num_shards]
+
+    def insert(self, session):
+        """Agregar una sesión nueva (registro Session)"""
+        session_id = session.session_id
+        shard = self._shard(session_id)
+        client_id = session.client_id
+        with shard.lock:
+            shard.sessions[session_id] = session
+            shard.count_status(session.status, 1)
+            if session.authenticated:
+                shard.authenticated += 1
+            client_shard = self._client_shard(client_id)
+            with client_shard.lock:
+                client_shard.index.setdefault(client_id, set()).add(session_id)
+
+    def get(self, session_id):
+        """Obtener sesión por ID (sin lock)"""
+        return self._shard(session_id).sessions.get(session_id)
+
+    def update(self, session_id, status, **fields):
+        """
+        Cambiar el estado y los campos de una sesión.
+        Retorna el estado anterior, o None si la sesión no existe.
+        """
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = shard.sessions.get(session_id)
+            if session is None:
+                return None
+            old_status = session.status
+            was_authenticated = session.authenticated
+            # Los campos primero: un nombre inválido falla antes de tocar contadores
+            session.update(**fields)
+            session.status = status
+
+            if status != old_status:
+                shard.count_status(old_status, -1)
+                shard.count_status(status, 1)
+            if session.authenticated != was_authenticated:
+                shard.authenticated += 1 if not was_authenticated else -1
+            return old_status
+
+    def pop(self, session_id):
+        """Quitar una sesión de la tabla y retornarla (o None)"""
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = shard.sessions.pop(session_id, None)
+            if session is None:
+                return None
+            shard.count_status(session.status, -1)
+            if session.authenticated:
+                shard.authenticated -= 1
+
+            client_id = session.client_id
+            client_shard = self._client_shard(client_id)
+            with client_shard.lock:
+                client_sessions = client_shard.index.get(client_id)
+                if client_sessions is not None:
+                    client_sessions.discard(session_id)
+                    if not client_sessions:
+                        del client_shard.index[client_id]
+            return session
+
+    def reassign(self, session_id, client_id):
+        """
+        Cambiar el cliente dueño de una sesión y su entrada en el índice.
+        Retorna el cliente anterior, o None si la sesión no existe.
+        """
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = shard.sessions.get(session_id)
+            if session is None:
+                return None
+            old_client_id = session.client_id
+            if old_client_id == client_id:
+                return old_client_id
+            session.client_id = client_id
+
+            old_client_shard = self._client_shard(old_client_id)
+            with old_client_shard.lock:
+                client_sessions = old_client_shard.index.get(old_client_id)
+                if client_sessions is not None:
+                    client_sessions.discard(session_id)
+                    if not client_sessions:
+                        del old_client_shard.index[old_client_id]
+            client_shard = self._client_shard(client_id)
+            with client_shard.lock:
+                client_shard.index.setdefault(client_id, set()).add(session_id)
+            return old_client_id
+
+    def client_session_ids(self, client_id):
+        """IDs de sesión de un cliente"""
+        client_shard = self._client_shard(client_id)
+        with client_shard.lock:
+            return list(client_shard.index.get(client_id, ()))
+
+    def session_ids(self):
+        """Copia de todos los IDs de sesión (un shard a la vez)"""
+        ids = []
+        for shard in self.shards:
+            with shard.lock:
+                ids.extend(shard.sessions.keys())
+        return ids
+
+    def stats(self):
+        """Sumar los contadores de todos los shards: O(shards)"""
+        total = 0
+        authenticated = 0
+        status_counts = {}
+        for shard in self.shards:
+            with shard.lock:
+                total += len(shard.sessions)
+                authenticated += shard.authenticated
+                for status, count in shard.status_counts.items():
+                    status_counts[status] = status_counts.get(status, 0) + count
+        return {
+            'total_sessions': total,
+            'authenticated': authenticated,
+            'status_counts': status_counts
+        }
+
+    def values(self):
+        """Copia de todas las sesiones (un shard a la vez)"""
+        sessions = []
+        for shard in self.shards:
+            with shard.lock:
+                sessions.extend(shard.sessions.values())
+        return sessions
+
+    def __len__(self):
+        return sum(len(shard.sessions) for shard in self.shards)
+
+    def __contains__(self, session_id):
+        return session_id in self._shard(session_id).sessions
@@ -8,6 +8,8 @@ import sys
 import signal
 import subprocess
 
+from browser_env import discover_browser_env
+
 def setup_railway_environment():
     """Configurar entorno para Railway"""
     # Variables de entorno para Railway
@@ -23,25 +25,12 @@ def setup_railway_environment():
     print(f"   Host: {os.environ.get('WS_HOST')}")
 
 def check_chrome_railway():
-    """Verificar Chrome en Railway"""
-    chrome_paths = [
-        '/usr/bin/google-chrome',
-        '/usr/bin/chromium-browser', 
-        '/usr/bin/chromium',
-        '/usr/bin/chrome',
-        '/usr/bin/google-chrome-stable'
-    ]
-    
-    for path in chrome_paths:
-        try:
-            result = subprocess.run([path, '--version'], 
-                                  capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                print(f"✅ Chrome encontrado en {path}: {result.stdout.strip()}")
-                os.environ['CHROME_PATH'] = path
-                return True
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            continue
+    """Verificar Chrome en Railway (descubrimiento en paralelo y cacheado)"""
+    chrome = discover_browser_env()['chrome']
+    if chrome:
+        print(f"✅ Chrome encontrado en {chrome['path']}: {chrome['version']}")
+        os.environ['CHROME_PATH'] = chrome['path']
+        return True
     
     # Si no encontramos Chrome, intentar instalarlo
     print("⚠️  Chrome no encontrado, intentando configurar...")
@@ -107,7 +96,10 @@ def main():
     
     # Importar y ejecutar servidor
     try:
-        from real_websocket_server import app, socketio
+        from real_websocket_server import app, socketio, start_background_tasks
+        
+        # Expiración de sesiones, pool de drivers calientes y restauración del snapshot
+        start_background_tasks()
         
         print("🎯 Servidor WebSocket REAL iniciado")
         print("📱 Conectando con WhatsApp Web usando Selenium")
@@ -5,9 +5,10 @@ Script de inicio alternativo para Railway con mejor manejo de errores
 
 import os
 import sys
-import subprocess
 import logging
 
+from browser_env import discover_browser_env
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -25,19 +26,11 @@ def setup_environment():
 
 def find_chrome():
     """Buscar Chrome en el sistema"""
-    chrome_paths = [
-        '/usr/bin/google-chrome',
-        '/usr/bin/google-chrome-stable',
-        '/usr/bin/chromium-browser',
-        '/usr/bin/chromium',
-        '/usr/bin/chrome'
-    ]
-    
-    for path in chrome_paths:
-        if os.path.exists(path):
-            logger.info(f"✅ Chrome encontrado en: {path}")
-            os.environ['CHROME_PATH'] = path
-            return path
+    chrome = discover_browser_env()['chrome']
+    if chrome:
+        logger.info(f"✅ Chrome encontrado en: {chrome['path']} ({chrome['version']})")
+        os.environ['CHROME_PATH'] = chrome['path']
+        return chrome['path']
     
     logger.warning("⚠️ Chrome no encontrado - continuando en modo API")
     os.environ['NO_CHROME_MODE'] = 'true'
@@ -45,15 +38,10 @@ def find_chrome():
 
 def find_chromedriver():
     """Buscar ChromeDriver en el sistema"""
-    driver_paths = [
-        '/usr/local/bin/chromedriver',
-        '/usr/bin/chromedriver'
-    ]
-    
-    for path in driver_paths:
-        if os.path.exists(path):
-            logger.info(f"✅ ChromeDriver encontrado en: {path}")
-            return path
+    chromedriver = discover_browser_env()['chromedriver']
+    if chromedriver:
+        logger.info(f"✅ ChromeDriver encontrado en: {chromedriver['path']} ({chromedriver['version']})")
+        return chromedriver['path']
     
     logger.warning("⚠️ ChromeDriver no encontrado")
     return None
@@ -64,7 +52,10 @@ def start_server():
         logger.info("🚀 Iniciando servidor WebSocket...")
         
         # Importar y ejecutar servidor
-        from real_websocket_server import app, socketio
+        from real_websocket_server import app, socketio, start_background_tasks
+        
+        # Expiración de sesiones, pool de drivers calientes y restauración del snapshot
+        start_background_tasks()
         
         logger.info("🎯 Servidor WebSocket iniciado exitosamente")
         logger.info("📱 Endpoints disponibles:")
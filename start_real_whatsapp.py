@@ -56,7 +56,10 @@ def start_real_server():
     
     try:
         # Iniciar servidor
-        from real_websocket_server import socketio, app, logger
+        from real_websocket_server import socketio, app, logger, start_background_tasks
+        
+        # Expiración de sesiones, pool de drivers calientes y restauración del snapshot
+        start_background_tasks()
         
         logger.info("🎯 Servidor WebSocket REAL iniciado")
         logger.info("📱 Conectando con WhatsApp Web usando Selenium")
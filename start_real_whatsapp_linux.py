@@ -111,7 +111,10 @@ def start_real_server():
     try:
         # Iniciar servidor
         print("🔄 Importando módulos...")
-        from real_websocket_server import socketio, app, logger
+        from real_websocket_server import socketio, app, logger, start_background_tasks
+        
+        # Expiración de sesiones, pool de drivers calientes y restauración del snapshot
+        start_background_tasks()
         
         logger.info("🎯 Servidor WebSocket REAL iniciado")
         logger.info("📱 Conectando con WhatsApp Web usando Selenium")
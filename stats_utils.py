@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+Utilidades de estadística para las métricas del servidor y los benchmarks
+"""
+
+
+def percentile(values, pct):
+    """Percentil simple sobre una lista de valores"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return round(ordered[index], 3)
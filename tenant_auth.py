@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tokens firmados de tenant
+El panel de Nora, que ya autenticó al usuario, firma el nombre del tenant
+con un secreto compartido; el servidor solo usa el perfil persistente de
+un tenant (y su vinculación de WhatsApp) si el token es válido
+"""
+
+import os
+import hmac
+import time
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+TENANT_TOKEN_SECRET = os.getenv('TENANT_TOKEN_SECRET', '')
+TENANT_TOKEN_TTL = int(os.getenv('TENANT_TOKEN_TTL', 3600))
+
+
+def _signature(secret, tenant, expires_at):
+    message = f"{tenant}:{expires_at}".encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def sign_tenant_token(tenant, secret=TENANT_TOKEN_SECRET, ttl=TENANT_TOKEN_TTL):
+    """Token '<tenant>:<vence epoch>:<hmac-sha256>' válido por `ttl` segundos"""
+    if not secret:
+        raise ValueError("TENANT_TOKEN_SECRET no configurado")
+    expires_at = int(time.time()) + ttl
+    return f"{tenant}:{expires_at}:{_signature(secret, tenant, expires_at)}"
+
+
+def verify_tenant_token(token, secret=TENANT_TOKEN_SECRET):
+    """Tenant del token si la firma es válida y no venció; None en otro caso"""
+    if not token or not secret or not isinstance(token, str):
+        return None
+    try:
+        tenant, expires_at, signature = token.rsplit(':', 2)
+        expires_at = int(expires_at)
+    except ValueError:
+        return None
+    if not tenant or expires_at < time.time():
+        return None
+    if not hmac.compare_digest(signature, _signature(secret, tenant, expires_at)):
+        logger.warning(f"🔐 Firma inválida en token de tenant {tenant}")
+        return None
+    return tenant
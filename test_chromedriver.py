@@ -9,6 +9,8 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 
+from launch_profiles import apply_launch_profile
+
 def test_chromedriver():
     print("🧪 PROBANDO CHROMEDRIVER")
     print("=" * 50)
@@ -16,12 +18,9 @@ def test_chromedriver():
     try:
         # Configurar opciones de Chrome
         chrome_options = Options()
+        apply_launch_profile(chrome_options, 'debug')
         chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
         chrome_options.add_argument('--remote-debugging-port=9222')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36')
         
         print("✅ Opciones de Chrome configuradas")
         
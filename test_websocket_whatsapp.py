@@ -28,7 +28,7 @@ def test_websocket_server():
     # Prueba 2: Obtener sesión
     print("\n📋 Prueba 2: Obtener sesión")
     session = manager.get_session(session_id)
-    print(f"✅ Sesión obtenida: {session['status']}")
+    print(f"✅ Sesión obtenida: {session.status.name}")
     
     # Prueba 3: Generar QR
     print("\n📋 Prueba 3: Generar código QR")
@@ -38,8 +38,8 @@ def test_websocket_server():
     # Prueba 4: Verificar estado
     print("\n📋 Prueba 4: Verificar estado después de QR")
     session = manager.get_session(session_id)
-    print(f"✅ Estado: {session['status']}")
-    print(f"✅ QR disponible: {'qr_code' in session}")
+    print(f"✅ Estado: {session.status.name}")
+    print(f"✅ QR disponible: {session.qr_code is not None}")
     
     # Prueba 5: Estadísticas
     print("\n📋 Prueba 5: Estadísticas")
@@ -53,8 +53,8 @@ def test_websocket_server():
     # Prueba 6: Verificar autenticación
     print("\n📋 Prueba 6: Verificar autenticación")
     session = manager.get_session(session_id)
-    print(f"✅ Estado final: {session['status']}")
-    print(f"✅ Autenticado: {session.get('authenticated', False)}")
+    print(f"✅ Estado final: {session.status.name}")
+    print(f"✅ Autenticado: {session.authenticated}")
     
     # Prueba 7: Limpieza
     print("\n📋 Prueba 7: Limpieza")
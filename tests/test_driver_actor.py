@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from driver_actor import DriverActorPool
+
+
+@pytest.fixture
+def pool():
+    pool = DriverActorPool(workers=4, timeout=5)
+    yield pool
+    pool.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def test_commands_of_a_session_run_in_order(pool):
+    calls = []
+
+    def command(index):
+        time.sleep(0.001)
+        calls.append(index)
+        return index
+
+    futures = [pool.submit('s1', command, index) for index in range(50)]
+
+    assert [future.result(5) for future in futures] == list(range(50))
+    assert calls == list(range(50))
+
+
+def test_commands_of_a_session_never_overlap(pool):
+    active = {'s1': 0, 's2': 0}
+    overlaps = []
+    lock = threading.Lock()
+
+    def command(session_id):
+        with lock:
+            active[session_id] += 1
+            if active[session_id] > 1:
+                overlaps.append(session_id)
+        time.sleep(0.002)
+        with lock:
+            active[session_id] -= 1
+
+    futures = [pool.submit(session_id, command, session_id)
+               for _ in range(20) for session_id in ('s1', 's2')]
+    for future in futures:
+        future.result(5)
+
+    assert not overlaps
+
+
+def test_sessions_do_not_block_each_other(pool):
+    release = threading.Event()
+    pool.submit('slow', release.wait, 5)
+
+    assert pool.call('fast', lambda: 'ok', timeout=1) == 'ok'
+    release.set()
+
+
+def test_call_times_out_and_queued_command_is_skipped(pool):
+    release = threading.Event()
+    ran = []
+    pool.submit('s1', release.wait, 5)
+
+    with pytest.raises(TimeoutError):
+        pool.call('s1', ran.append, 'late', timeout=0.1)
+    release.set()
+    pool.call('s1', lambda: None)
+
+    assert ran == []
+    assert pool.stats()['cancelled'] == 1
+
+
+def test_command_expired_in_queue_is_not_run(pool):
+    release = threading.Event()
+    ran = []
+    pool.submit('s1', release.wait, 5)
+    future = pool.submit('s1', ran.append, 'late', timeout=0.05)
+
+    time.sleep(0.1)
+    release.set()
+
+    with pytest.raises(TimeoutError):
+        future.result(5)
+    assert ran == []
+    assert pool.stats()['timed_out'] == 1
+
+
+def test_closed_session_rejects_commands_until_reopened(pool):
+    disposed = []
+    pool.call('s1', lambda: None)
+    pool.close('s1', disposed.append, 'driver').result(5)
+
+    assert disposed == ['driver']
+    with pytest.raises(RuntimeError):
+        pool.call('s1', lambda: None)
+
+    pool.open('s1')
+    assert pool.call('s1', lambda: 'ok') == 'ok'
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import SessionScheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = SessionScheduler(workers=2)
+    scheduler.start()
+    yield scheduler
+    scheduler.stop()
+
+
+def test_tasks_run_in_deadline_order(scheduler):
+    order = []
+    done = threading.Event()
+
+    def tick(name):
+        def callback():
+            order.append(name)
+            if len(order) == 3:
+                done.set()
+        return callback
+
+    scheduler.schedule('s1', 'late', 0.15, tick('late'))
+    scheduler.schedule('s2', 'early', 0.05, tick('early'))
+    scheduler.schedule('s3', 'middle', 0.10, tick('middle'))
+
+    assert done.wait(5)
+    assert order == ['early', 'middle', 'late']
+
+
+def test_callback_delay_reschedules_until_none(scheduler):
+    ticks = []
+    done = threading.Event()
+
+    def callback():
+        ticks.append(time.monotonic())
+        if len(ticks) == 3:
+            done.set()
+            return None
+        return 0.02
+
+    scheduler.schedule('s1', 'heartbeat', 0, callback)
+
+    assert done.wait(5)
+    time.sleep(0.1)
+    assert len(ticks) == 3
+    assert not scheduler.is_scheduled('s1', 'heartbeat')
+
+
+def test_cancel_removes_every_task_of_the_session(scheduler):
+    ran = []
+    scheduler.schedule('s1', 'monitor', 0.1, lambda: ran.append('monitor'))
+    scheduler.schedule('s1', 'heartbeat', 0.1, lambda: ran.append('heartbeat'))
+    scheduler.schedule('s2', 'monitor', 0.1, lambda: ran.append('other'))
+
+    assert scheduler.cancel('s1') == 2
+    time.sleep(0.3)
+
+    assert ran == ['other']
+
+
+def test_wake_on_running_task_runs_it_again(scheduler):
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def callback():
+        runs.append(time.monotonic())
+        if len(runs) == 1:
+            started.set()
+            release.wait(5)
+        return 60
+
+    scheduler.schedule('s1', 'monitor', 0, callback)
+    assert started.wait(5)
+    assert scheduler.wake('s1', 'monitor')
+    release.set()
+
+    deadline = time.monotonic() + 5
+    while len(runs) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(runs) == 2
+
+
+def test_task_never_runs_concurrently_with_itself(scheduler):
+    active = []
+    overlaps = []
+    done = threading.Event()
+    count = [0]
+
+    def callback():
+        if active:
+            overlaps.append(True)
+        active.append(True)
+        time.sleep(0.02)
+        active.pop()
+        count[0] += 1
+        if count[0] == 5:
+            done.set()
+            return None
+        scheduler.wake('s1', 'monitor')
+        return 0
+
+    scheduler.schedule('s1', 'monitor', 0, callback)
+
+    assert done.wait(5)
+    assert not overlaps
@@ -0,0 +1,40 @@
+from selector_registry import SelectorRegistry
+
+
+def make_registry(tmp_path):
+    return SelectorRegistry({'auth': ['#a', '#b', '#c']}, path=str(tmp_path / 'selectors.json'))
+
+
+def test_first_match_probe_only_counts_evaluated_selectors(tmp_path):
+    registry = make_registry(tmp_path)
+    selectors = {'auth': registry.ordered('auth')}
+
+    registry.record(selectors, {'auth': {'hit': 1, 'hits': [1], 'ms': [0.1, 0.1]}})
+
+    stats = {row['selector']: row for row in registry.stats()['groups']['auth']}
+    assert (stats['#a']['probes'], stats['#a']['hits']) == (1, 0)
+    assert (stats['#b']['probes'], stats['#b']['hits']) == (1, 1)
+    assert stats['#c']['probes'] == 0
+
+
+def test_full_scan_credits_every_matching_selector(tmp_path):
+    registry = make_registry(tmp_path)
+    selectors = {'auth': registry.ordered('auth')}
+
+    registry.record(selectors, {'auth': {'hit': 0, 'hits': [0, 2], 'ms': [0.1, 0.1, 0.1]}})
+
+    stats = {row['selector']: row for row in registry.stats()['groups']['auth']}
+    assert stats['#a']['hits'] == 1
+    assert (stats['#b']['probes'], stats['#b']['hits']) == (1, 0)
+    assert (stats['#c']['probes'], stats['#c']['hits']) == (1, 1)
+
+
+def test_saved_stats_survive_a_restart(tmp_path):
+    registry = make_registry(tmp_path)
+    selectors = {'auth': registry.ordered('auth')}
+    registry.record(selectors, {'auth': {'hit': 2, 'hits': [2], 'ms': [0.1, 0.1, 0.1]}})
+    assert registry.save()
+
+    restored = make_registry(tmp_path)
+    assert restored.load() == 3
+    assert restored.ordered('auth')[0] == '#c'
@@ -0,0 +1,146 @@
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from session_record import Session, SessionStatus
+from session_store import RedisSessionStore
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def make_store(server):
+    stores = []
+
+    def make(worker_id, start=True, **options):
+        store = RedisSessionStore(fakeredis.FakeRedis(server=server), ttl=60, worker_id=worker_id, **options)
+        if start:
+            store.start()
+            assert store.subscribed.wait(5)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.stop()
+
+
+def test_round_trip_between_instances(make_store):
+    a = make_store('a', start=False)
+    b = make_store('b', start=False)
+    session = Session('s1', 'client-1', SessionStatus.QR_READY, tenant='aura')
+    session.qr_data = 'qr-payload'
+
+    assert a.save(session)
+    record = b.load('s1')
+
+    assert record['session_id'] == 's1'
+    assert record['client_id'] == 'client-1'
+    assert record['tenant'] == 'aura'
+    assert record['status'] == 'qr_ready'
+    assert record['qr_data'] == 'qr-payload'
+    assert record['owner'] == 'a'
+    assert b.load('missing') is None
+
+
+def test_write_invalidates_other_instance_cache(make_store):
+    a = make_store('a')
+    b = make_store('b')
+    session = Session('s1', 'client-1', SessionStatus.QR_READY)
+    a.save(session)
+    assert wait_for(lambda: b.invalidations == 1)
+
+    assert b.load('s1')['status'] == 'qr_ready'
+    assert 's1' in b.cache
+
+    session.update(status=SessionStatus.AUTHENTICATED, authenticated=True)
+    a.save(session)
+    assert wait_for(lambda: b.invalidations == 2)
+
+    assert 's1' not in b.cache
+    assert b.load('s1')['status'] == 'authenticated'
+
+
+def test_invalidation_only_drops_the_changed_key(make_store):
+    a = make_store('a')
+    b = make_store('b')
+    first = Session('s1', 'client-1', SessionStatus.QR_READY)
+    second = Session('s2', 'client-2', SessionStatus.QR_READY)
+    a.save(first)
+    a.save(second)
+    assert wait_for(lambda: b.invalidations == 2)
+    b.load('s1')
+    b.load('s2')
+
+    first.update(status=SessionStatus.AUTHENTICATED)
+    a.save(first)
+    assert wait_for(lambda: b.invalidations == 3)
+
+    assert 's1' not in b.cache
+    hits = b.hits
+    assert b.load('s2')['status'] == 'qr_ready'
+    assert b.hits == hits + 1
+
+
+def test_read_racing_an_invalidation_is_not_cached(make_store):
+    b = make_store('b')
+    with b.lock:
+        generation = b._begin_read('s1')
+        other = b._begin_read('s2')
+        b._invalidate('s1')
+        b._cache_put('s1', {'status': 'qr_ready'}, generation)
+        b._cache_put('s2', {'status': 'qr_ready'}, other)
+
+    assert 's1' not in b.cache
+    assert 's2' in b.cache
+    assert not b.reads
+
+
+def test_activity_only_writes_are_coalesced(make_store, server):
+    a = make_store('a', start=False, write_interval=60)
+    reader = fakeredis.FakeRedis(server=server)
+    session = Session('s1', 'client-1', SessionStatus.QR_READY)
+    assert a.save(session)
+    written = reader.get('whatsapp:session:s1')
+
+    session.last_activity += 5
+    assert not a.save(session)
+    session.last_activity += 5
+    assert not a.save(session)
+    assert reader.get('whatsapp:session:s1') == written
+    assert a.stats()['coalesced'] == 2
+
+    assert a.flush() == 1
+    assert reader.get('whatsapp:session:s1') != written
+    assert a.flush() == 0
+
+    session.update(status=SessionStatus.AUTHENTICATED)
+    assert a.save(session)
+    assert a.load('s1')['status'] == 'authenticated'
+
+
+def test_status_change_drops_pending_activity_write(make_store):
+    a = make_store('a', start=False, write_interval=60)
+    session = Session('s1', 'client-1', SessionStatus.QR_READY)
+    a.save(session)
+    session.last_activity += 5
+    a.save(session)
+
+    session.update(status=SessionStatus.DISCONNECTED)
+    assert a.save(session)
+    assert a.flush() == 0
+    assert a.load('s1')['status'] == 'disconnected'
@@ -0,0 +1,64 @@
+from timer_wheel import TimerWheel
+
+
+def drain(wheel, until, step=0.5):
+    """Avanzar la rueda de a `step` y retornar (instante, clave) de cada expiración"""
+    expired = []
+    now = 0.0
+    while now <= until:
+        expired.extend((now, key) for key in wheel.advance(now))
+        now += step
+    return expired
+
+
+def test_keys_expire_in_deadline_order():
+    wheel = TimerWheel(tick=1.0)
+    deadlines = {'c': 7.0, 'a': 2.0, 'd': 9.5, 'b': 4.0}
+    for key, deadline in deadlines.items():
+        wheel.schedule(key, deadline)
+
+    expired = drain(wheel, 12)
+
+    assert [key for _, key in expired] == ['a', 'b', 'c', 'd']
+    for now, key in expired:
+        assert deadlines[key] <= now < deadlines[key] + 1.0
+    assert len(wheel) == 0
+
+
+def test_nothing_expires_before_its_deadline():
+    wheel = TimerWheel(tick=1.0)
+    wheel.schedule('a', 5.0)
+
+    assert wheel.advance(4.9) == []
+    assert wheel.advance(5.0) == ['a']
+    assert wheel.advance(20.0) == []
+
+
+def test_postponed_key_expires_at_new_deadline():
+    wheel = TimerWheel(tick=1.0)
+    wheel.schedule('a', 2.0)
+    wheel.schedule('b', 3.0)
+    wheel.schedule('a', 6.0)  # Heartbeat
+
+    assert wheel.deadline('a') == 6.0
+    assert [key for _, key in drain(wheel, 10)] == ['b', 'a']
+
+
+def test_brought_forward_key_expires_once():
+    wheel = TimerWheel(tick=1.0)
+    wheel.schedule('a', 8.0)
+    wheel.schedule('a', 2.0)
+
+    expired = drain(wheel, 12)
+
+    assert expired == [(2.0, 'a')]
+
+
+def test_cancelled_key_never_expires():
+    wheel = TimerWheel(tick=1.0)
+    wheel.schedule('a', 2.0)
+    wheel.schedule('b', 3.0)
+    wheel.cancel('a')
+
+    assert [key for _, key in drain(wheel, 10)] == ['b']
+    assert wheel.deadline('a') is None
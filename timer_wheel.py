@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Rueda de tiempo para expiración de sesiones
+Programar, reprogramar y cancelar cuestan O(1); cada expiración se procesa una sola vez
+"""
+
+import math
+import threading
+
+
+class _Entry:
+    """Deadline vigente de una clave y el tick de la ranura donde está encolada"""
+
+    __slots__ = ('deadline', 'tick')
+
+    def __init__(self, deadline, tick):
+        self.deadline = deadline
+        self.tick = tick
+
+
+class TimerWheel:
+    """
+    Rueda de tiempo con ranuras por tick absoluto.
+
+    Reprogramar a un deadline posterior (el caso de cada heartbeat) solo
+    actualiza el deadline; la entrada se mueve de ranura perezosamente cuando
+    su tick vence. Las entradas obsoletas se descartan al vaciar la ranura.
+    """
+
+    def __init__(self, tick=1.0):
+        self.tick = tick
+        self.buckets = {}  # tick -> [claves]
+        self.entries = {}  # clave -> _Entry
+        self.current_tick = None
+        self.lock = threading.Lock()
+
+    def _tick_for(self, deadline):
+        tick = int(math.ceil(deadline / self.tick))
+        if self.current_tick is not None and tick <= self.current_tick:
+            tick = self.current_tick + 1
+        return tick
+
+    def _enqueue(self, key, tick):
+        self.buckets.setdefault(tick, []).append(key)
+
+    def schedule(self, key, deadline):
+        """Programar (o reprogramar) la expiración de una clave"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and deadline >= entry.tick * self.tick:
+                # Deadline posterior: se moverá de ranura cuando venza la actual
+                entry.deadline = deadline
+                return
+
+            tick = self._tick_for(deadline)
+            if entry is None:
+                self.entries[key] = _Entry(deadline, tick)
+            else:
+                entry.deadline = deadline
+                entry.tick = tick
+            self._enqueue(key, tick)
+
+    def cancel(self, key):
+        """Cancelar la expiración de una clave"""
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def deadline(self, key):
+        """Deadline vigente de una clave (o None)"""
+        entry = self.entries.get(key)
+        return entry.deadline if entry is not None else None
+
+    def advance(self, now):
+        """Avanzar la rueda hasta `now` y retornar las claves expiradas"""
+        expired = []
+        target_tick = int(math.floor(now / self.tick))
+        with self.lock:
+            if self.current_tick is None:
+                self.current_tick = min(self.buckets, default=target_tick + 1) - 1
+                self.current_tick = min(self.current_tick, target_tick)
+
+            while self.current_tick < target_tick:
+                self.current_tick += 1
+                for key in self.buckets.pop(self.current_tick, ()):
+                    entry = self.entries.get(key)
+                    if entry is None or entry.tick != self.current_tick:
+                        continue  # Cancelada o reprogramada a una ranura anterior
+                    if entry.deadline <= now:
+                        del self.entries[key]
+                        expired.append(key)
+                    else:
+                        entry.tick = self._tick_for(entry.deadline)
+                        self._enqueue(key, entry.tick)
+
+                if not self.buckets:
+                    self.current_tick = target_tick
+        return expired
+
+    def __len__(self):
+        return len(self.entries)
@@ -5,9 +5,10 @@ Script de verificación para Railway - Probar Chrome y dependencias
 
 import os
 import sys
-import subprocess
 import logging
 
+from browser_env import discover_browser_env
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -15,27 +16,12 @@ def check_chrome_installation():
     """Verificar instalación de Chrome"""
     logger.info("🔍 Verificando Chrome...")
     
-    chrome_paths = [
-        '/usr/bin/google-chrome',
-        '/usr/bin/chromium-browser',
-        '/usr/bin/chromium',
-        '/usr/bin/chrome',
-        '/usr/bin/google-chrome-stable'
-    ]
-    
-    for path in chrome_paths:
-        if os.path.exists(path):
-            try:
-                result = subprocess.run([path, '--version'], 
-                                      capture_output=True, text=True, timeout=10)
-                if result.returncode == 0:
-                    logger.info(f"✅ Chrome encontrado: {path}")
-                    logger.info(f"   Versión: {result.stdout.strip()}")
-                    return True
-            except subprocess.TimeoutExpired:
-                logger.warning(f"⚠️  Timeout verificando {path}")
-            except Exception as e:
-                logger.error(f"❌ Error verificando {path}: {e}")
+    # La verificación siempre sondea los binarios, sin usar la caché
+    chrome = discover_browser_env(refresh=True)['chrome']
+    if chrome:
+        logger.info(f"✅ Chrome encontrado: {chrome['path']}")
+        logger.info(f"   Versión: {chrome['version']}")
+        return True
     
     logger.error("❌ Chrome no encontrado en ninguna ruta")
     return False
@@ -44,24 +30,14 @@ def check_chromedriver():
     """Verificar ChromeDriver"""
     logger.info("🔍 Verificando ChromeDriver...")
     
-    driver_paths = [
-        '/usr/bin/chromedriver',
-        '/usr/local/bin/chromedriver'
-    ]
-    
-    for path in driver_paths:
-        if os.path.exists(path):
-            try:
-                result = subprocess.run([path, '--version'], 
-                                      capture_output=True, text=True, timeout=10)
-                if result.returncode == 0:
-                    logger.info(f"✅ ChromeDriver encontrado: {path}")
-                    logger.info(f"   Versión: {result.stdout.strip()}")
-                    return True
-            except subprocess.TimeoutExpired:
-                logger.warning(f"⚠️  Timeout verificando {path}")
-            except Exception as e:
-                logger.error(f"❌ Error verificando {path}: {e}")
+    browser_env = discover_browser_env()
+    chromedriver = browser_env['chromedriver']
+    if chromedriver:
+        logger.info(f"✅ ChromeDriver encontrado: {chromedriver['path']}")
+        logger.info(f"   Versión: {chromedriver['version']}")
+        if browser_env['chrome'] and not browser_env['capabilities']['versions_match']:
+            logger.warning("⚠️  La versión de ChromeDriver no coincide con la de Chrome")
+        return True
     
     logger.error("❌ ChromeDriver no encontrado")
     return False
@@ -125,42 +101,20 @@ def test_selenium_basic():
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--disable-gpu")
         
-        # Buscar Chrome
-        chrome_paths = [
-            '/usr/bin/google-chrome',
-            '/usr/bin/chromium-browser',
-            '/usr/bin/chromium'
-        ]
-        
-        chrome_path = None
-        for path in chrome_paths:
-            if os.path.exists(path):
-                chrome_path = path
-                break
+        # Binarios ya descubiertos en las verificaciones anteriores
+        browser_env = discover_browser_env()
         
-        if not chrome_path:
+        if not browser_env['chrome']:
             logger.error("❌ Chrome no encontrado para prueba")
             return False
         
-        chrome_options.binary_location = chrome_path
-        
-        # Buscar ChromeDriver
-        driver_paths = [
-            '/usr/bin/chromedriver',
-            '/usr/local/bin/chromedriver'
-        ]
-        
-        driver_path = None
-        for path in driver_paths:
-            if os.path.exists(path):
-                driver_path = path
-                break
+        chrome_options.binary_location = browser_env['chrome']['path']
         
-        if not driver_path:
+        if not browser_env['chromedriver']:
             logger.error("❌ ChromeDriver no encontrado para prueba")
             return False
         
-        service = Service(driver_path)
+        service = Service(browser_env['chromedriver']['path'])
         
         # Crear driver
         driver = webdriver.Chrome(service=service, options=chrome_options)
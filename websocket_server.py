@@ -10,15 +10,15 @@ import json
 import uuid
 import time
 import threading
-import qrcode
-import io
-import base64
 from datetime import datetime
 import logging
 from flask import Flask, request
 from flask_socketio import SocketIO, emit, disconnect, join_room, leave_room
 from flask_cors import CORS
 
+from qr_render import render_qr
+from session_record import Session, SessionStatus, count_by_status
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -44,14 +44,7 @@ class WhatsAppWebSocketManager:
         """Crear nueva sesión de WhatsApp Web"""
         with self.lock:
             session_id = str(uuid.uuid4())
-            self.sessions[session_id] = {
-                'client_id': client_id,
-                'status': 'pending',
-                'created_at': datetime.now(),
-                'qr_code': None,
-                'authenticated': False,
-                'last_activity': datetime.now()
-            }
+            self.sessions[session_id] = Session(session_id, client_id)
             logger.info(f"Sesión creada: {session_id} para cliente {client_id}")
             return session_id
         
@@ -64,10 +57,11 @@ class WhatsAppWebSocketManager:
         """Actualizar estado de sesión"""
         with self.lock:
             if session_id in self.sessions:
-                self.sessions[session_id]['status'] = status
-                self.sessions[session_id]['last_activity'] = datetime.now()
-                self.sessions[session_id].update(kwargs)
-                logger.info(f"Sesión {session_id} actualizada a estado: {status}")
+                session = self.sessions[session_id]
+                session.status = status
+                session.touch()
+                session.update(**kwargs)
+                logger.info(f"Sesión {session_id} actualizada a estado: {status.label}")
                 
     def remove_session(self, session_id):
         """Eliminar sesión"""
@@ -86,25 +80,11 @@ class WhatsAppWebSocketManager:
             timestamp = int(time.time())
             qr_data = f"1@{session_id},{timestamp},whatsapp-web-demo"
             
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Convertir a base64
-            img_buffer = io.BytesIO()
-            img.save(img_buffer, format='PNG')
-            img_buffer.seek(0)
-            img_base64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
+            # PNG en bytes (se envía como adjunto binario, sin base64)
+            qr_image = render_qr(qr_data)
             
             # Actualizar sesión
-            self.update_session_status(session_id, 'qr_ready', qr_code=img_base64)
+            self.update_session_status(session_id, SessionStatus.QR_READY, qr_code=qr_image)
             
             # Simular autenticación automática después de 15 segundos
             self.simulate_authentication(session_id)
@@ -123,9 +103,9 @@ class WhatsAppWebSocketManager:
                 time.sleep(15)
                 
                 session = self.get_session(session_id)
-                if session and session['status'] == 'qr_ready':
+                if session and session.status == SessionStatus.QR_READY:
                     # Actualizar estado a autenticado
-                    self.update_session_status(session_id, 'authenticated', authenticated=True)
+                    self.update_session_status(session_id, SessionStatus.AUTHENTICATED, authenticated=True)
                     
                     # Emitir evento de autenticación
                     socketio.emit('authenticated', {
@@ -154,11 +134,11 @@ class WhatsAppWebSocketManager:
             while True:
                 try:
                     session = self.get_session(session_id)
-                    if not session or session.get('status') != 'authenticated':
+                    if not session or session.status != SessionStatus.AUTHENTICATED:
                         break
                         
                     # Actualizar última actividad
-                    self.update_session_status(session_id, 'authenticated')
+                    self.update_session_status(session_id, SessionStatus.AUTHENTICATED)
                     
                     # Emitir heartbeat cada 30 segundos
                     socketio.emit('heartbeat', {
@@ -180,11 +160,13 @@ class WhatsAppWebSocketManager:
     def get_active_sessions(self):
         """Obtener estadísticas de sesiones activas"""
         with self.lock:
+            # Una sola pasada con comparaciones enteras
+            counts, authenticated = count_by_status(self.sessions.values())
             return {
                 'total_sessions': len(self.sessions),
-                'authenticated': sum(1 for s in self.sessions.values() if s.get('authenticated', False)),
-                'pending': sum(1 for s in self.sessions.values() if s.get('status') == 'pending'),
-                'qr_ready': sum(1 for s in self.sessions.values() if s.get('status') == 'qr_ready')
+                'authenticated': authenticated,
+                'pending': counts[SessionStatus.PENDING],
+                'qr_ready': counts[SessionStatus.QR_READY]
             }
 
 # Instancia global del manager
@@ -228,8 +210,8 @@ def handle_disconnect():
     
     # Limpiar sesiones del cliente
     sessions_to_remove = []
-    for session_id, session in ws_manager.sessions.items():
-        if session.get('client_id') == client_id:
+    for session_id, session in list(ws_manager.sessions.items()):
+        if session.client_id == client_id:
             sessions_to_remove.append(session_id)
     
     for session_id in sessions_to_remove:
@@ -257,6 +239,7 @@ def handle_get_qr(data):
                 'type': 'qr_code',
                 'session_id': session_id,
                 'qr_data': qr_data,
+                'qr_image': ws_manager.get_session(session_id).qr_code,
                 'message': 'Código QR generado'
             })
         else:
@@ -291,10 +274,10 @@ def handle_get_status(data):
             emit('status', {
                 'type': 'status',
                 'session_id': session_id,
-                'status': session['status'],
-                'authenticated': session.get('authenticated', False),
-                'created_at': session['created_at'].isoformat(),
-                'message': f"Estado: {session['status']}"
+                'status': session.status.label,
+                'authenticated': session.authenticated,
+                'created_at': session.created_datetime.isoformat(),
+                'message': f"Estado: {session.status.label}"
             })
         else:
             emit('error', {
@@ -332,7 +315,7 @@ def handle_test_whatsapp(data):
             })
             return
             
-        if not session.get('authenticated', False):
+        if not session.authenticated:
             emit('error', {
                 'type': 'error',
                 'message': 'WhatsApp no está autenticado'
@@ -371,10 +354,10 @@ def handle_test_whatsapp(data):
                 'success': True,
                 'message': 'Conexión WhatsApp verificada',
                 'details': {
-                    'status': session['status'],
-                    'authenticated': session.get('authenticated', False),
-                    'created_at': session['created_at'].isoformat(),
-                    'last_activity': session['last_activity'].isoformat()
+                    'status': session.status.label,
+                    'authenticated': session.authenticated,
+                    'created_at': session.created_datetime.isoformat(),
+                    'last_activity': session.last_activity_datetime.isoformat()
                 }
             })
             
@@ -400,7 +383,7 @@ def handle_disconnect_whatsapp(data):
         if session_id:
             session = ws_manager.get_session(session_id)
             if session:
-                ws_manager.update_session_status(session_id, 'disconnected', authenticated=False)
+                ws_manager.update_session_status(session_id, SessionStatus.DISCONNECTED, authenticated=False)
                 
                 emit('disconnected', {
                     'type': 'disconnected',
@@ -449,13 +432,12 @@ def cleanup_sessions():
         try:
             time.sleep(300)  # Ejecutar cada 5 minutos
             
-            current_time = datetime.now()
-            sessions_to_remove = []
-            
-            for session_id, session in ws_manager.sessions.items():
-                # Eliminar sesiones inactivas por más de 1 hora
-                if (current_time - session['last_activity']).total_seconds() > 3600:
-                    sessions_to_remove.append(session_id)
+            # Eliminar sesiones inactivas por más de 1 hora (comparación de floats monotónicos)
+            cutoff = time.monotonic() - 3600
+            sessions_to_remove = [
+                session_id for session_id, session in list(ws_manager.sessions.items())
+                if session.last_activity < cutoff
+            ]
             
             for session_id in sessions_to_remove:
                 ws_manager.remove_session(session_id)
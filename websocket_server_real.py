@@ -19,6 +19,9 @@ from flask import Flask, request
 from flask_socketio import SocketIO, emit, disconnect, join_room, leave_room
 from flask_cors import CORS
 
+from session_record import Session, SessionStatus, count_by_status
+from launch_profiles import apply_launch_profile, BLOCK_IMAGES_PREFS
+
 # Importar Selenium para WhatsApp Web real
 try:
     from selenium import webdriver
@@ -44,6 +47,7 @@ logger = logging.getLogger(__name__)
 WS_PORT = int(os.getenv('WS_PORT', 5001))
 WS_HOST = os.getenv('WS_HOST', '0.0.0.0')
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+WINDOWS_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 
 class RealWhatsAppWebManager:
     """Gestor REAL de WhatsApp Web usando Selenium"""
@@ -57,16 +61,7 @@ class RealWhatsAppWebManager:
         """Crear nueva sesión real de WhatsApp Web"""
         with self.lock:
             session_id = str(uuid.uuid4())
-            self.sessions[session_id] = {
-                'client_id': client_id,
-                'status': 'pending',
-                'created_at': datetime.now(),
-                'qr_code': None,
-                'authenticated': False,
-                'last_activity': datetime.now(),
-                'driver': None,
-                'phone_number': None
-            }
+            self.sessions[session_id] = Session(session_id, client_id)
             logger.info(f"Sesión REAL creada: {session_id} para cliente {client_id}")
             return session_id
     
@@ -77,21 +72,14 @@ class RealWhatsAppWebManager:
             
         try:
             chrome_options = Options()
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
             chrome_options.add_argument('--window-size=1920,1080')
             
-            # Configurar para WhatsApp Web
-            chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-            
-            # Desactivar notificaciones
-            prefs = {
-                "profile.default_content_setting_values.notifications": 2,
-                "profile.default_content_settings.popups": 0,
-                "profile.managed_default_content_settings.images": 2
-            }
-            chrome_options.add_experimental_option("prefs", prefs)
+            # Flags por defecto más el bloqueo de imágenes y el user agent de
+            # escritorio Windows que siempre tuvo este servidor
+            apply_launch_profile(
+                chrome_options, 'default',
+                user_agent=WINDOWS_USER_AGENT, extra_prefs=BLOCK_IMAGES_PREFS
+            )
             
             # Instalar ChromeDriver automáticamente
             service = Service(ChromeDriverManager().install())
@@ -120,14 +108,14 @@ class RealWhatsAppWebManager:
                 return False
                 
             self.active_drivers[session_id] = driver
-            session['driver'] = driver
+            session.driver = driver
             
             # Navegar a WhatsApp Web
             logger.info(f"🌐 Navegando a WhatsApp Web para sesión {session_id}")
             driver.get("https://web.whatsapp.com")
             
             # Actualizar estado
-            self.update_session_status(session_id, 'connecting')
+            self.update_session_status(session_id, SessionStatus.CONNECTING)
             
             # Monitorear QR code en hilo separado
             qr_thread = threading.Thread(target=self.monitor_qr_code, args=(session_id,))
@@ -144,7 +132,7 @@ class RealWhatsAppWebManager:
         """Monitorear código QR y autenticación"""
         try:
             session = self.get_session(session_id)
-            driver = session.get('driver')
+            driver = session.driver
             
             if not driver:
                 return
@@ -165,7 +153,7 @@ class RealWhatsAppWebManager:
                     logger.info(f"📱 QR Code obtenido para sesión {session_id}")
                     
                     # Actualizar sesión con QR real
-                    self.update_session_status(session_id, 'qr_ready', qr_code=qr_data)
+                    self.update_session_status(session_id, SessionStatus.QR_READY, qr_code=qr_data)
                     
                     # Emitir QR al cliente
                     socketio.emit('qr_code', {
@@ -190,7 +178,7 @@ class RealWhatsAppWebManager:
         """Monitorear autenticación en WhatsApp Web"""
         try:
             session = self.get_session(session_id)
-            driver = session.get('driver')
+            driver = session.driver
             
             if not driver:
                 return
@@ -212,7 +200,7 @@ class RealWhatsAppWebManager:
                     logger.info(f"🎉 Autenticación REAL exitosa para sesión {session_id}")
                     
                     # Actualizar estado
-                    self.update_session_status(session_id, 'authenticated', authenticated=True)
+                    self.update_session_status(session_id, SessionStatus.AUTHENTICATED, authenticated=True)
                     
                     # Emitir autenticación exitosa
                     socketio.emit('authenticated', {
@@ -242,7 +230,7 @@ class RealWhatsAppWebManager:
         qr_data = f"2@{session_id},{timestamp},whatsapp-web-real-fallback"
         
         # Actualizar estado
-        self.update_session_status(session_id, 'qr_ready', qr_code=qr_data)
+        self.update_session_status(session_id, SessionStatus.QR_READY, qr_code=qr_data)
         
         # Emitir QR simulado
         socketio.emit('qr_code', {
@@ -256,7 +244,7 @@ class RealWhatsAppWebManager:
         # Simular autenticación después de 20 segundos
         def delayed_auth():
             time.sleep(20)
-            self.update_session_status(session_id, 'authenticated', authenticated=True)
+            self.update_session_status(session_id, SessionStatus.AUTHENTICATED, authenticated=True)
             socketio.emit('authenticated', {
                 'type': 'authenticated',
                 'session_id': session_id,
@@ -280,7 +268,7 @@ class RealWhatsAppWebManager:
         """Regenerar código QR"""
         try:
             session = self.get_session(session_id)
-            driver = session.get('driver')
+            driver = session.driver
             
             if driver:
                 # Recargar página para obtener nuevo QR
@@ -303,9 +291,9 @@ class RealWhatsAppWebManager:
         """Enviar mensaje de prueba real"""
         try:
             session = self.get_session(session_id)
-            driver = session.get('driver')
+            driver = session.driver
             
-            if not driver or not session.get('authenticated'):
+            if not driver or not session.authenticated:
                 return False
                 
             # Buscar chat o crear nuevo
@@ -329,10 +317,11 @@ class RealWhatsAppWebManager:
         """Actualizar estado de sesión"""
         with self.lock:
             if session_id in self.sessions:
-                self.sessions[session_id]['status'] = status
-                self.sessions[session_id]['last_activity'] = datetime.now()
-                self.sessions[session_id].update(kwargs)
-                logger.info(f"Sesión {session_id} actualizada a estado: {status}")
+                session = self.sessions[session_id]
+                session.status = status
+                session.touch()
+                session.update(**kwargs)
+                logger.info(f"Sesión {session_id} actualizada a estado: {status.label}")
                 
     def remove_session(self, session_id):
         """Eliminar sesión y limpiar driver"""
@@ -355,11 +344,11 @@ class RealWhatsAppWebManager:
             while True:
                 try:
                     session = self.get_session(session_id)
-                    if not session or session.get('status') != 'authenticated':
+                    if not session or session.status != SessionStatus.AUTHENTICATED:
                         break
                         
                     # Verificar que el driver siga activo
-                    driver = session.get('driver')
+                    driver = session.driver
                     if driver:
                         try:
                             # Ping simple al driver
@@ -369,7 +358,7 @@ class RealWhatsAppWebManager:
                             break
                     
                     # Actualizar última actividad
-                    self.update_session_status(session_id, 'authenticated')
+                    self.update_session_status(session_id, SessionStatus.AUTHENTICATED)
                     
                     # Emitir heartbeat
                     socketio.emit('heartbeat', {
@@ -392,11 +381,13 @@ class RealWhatsAppWebManager:
     def get_active_sessions(self):
         """Obtener estadísticas de sesiones activas"""
         with self.lock:
+            # Una sola pasada con comparaciones enteras
+            counts, authenticated = count_by_status(self.sessions.values())
             return {
                 'total_sessions': len(self.sessions),
-                'authenticated': sum(1 for s in self.sessions.values() if s.get('authenticated', False)),
-                'pending': sum(1 for s in self.sessions.values() if s.get('status') == 'pending'),
-                'qr_ready': sum(1 for s in self.sessions.values() if s.get('status') == 'qr_ready'),
+                'authenticated': authenticated,
+                'pending': counts[SessionStatus.PENDING],
+                'qr_ready': counts[SessionStatus.QR_READY],
                 'selenium_available': SELENIUM_AVAILABLE,
                 'active_drivers': len(self.active_drivers)
             }
@@ -477,7 +468,7 @@ def handle_test_whatsapp(data):
         
         session = ws_manager.get_session(session_id)
         
-        if not session or not session.get('authenticated', False):
+        if not session or not session.authenticated:
             emit('test_result', {
                 'type': 'test_result',
                 'session_id': session_id,
@@ -500,7 +491,7 @@ def handle_test_whatsapp(data):
                 'details': {
                     'method': 'Selenium WebDriver' if SELENIUM_AVAILABLE else 'Simulación',
                     'timestamp': datetime.now().isoformat(),
-                    'real_connection': session.get('driver') is not None
+                    'real_connection': session.driver is not None
                 }
             })
             